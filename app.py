@@ -7,13 +7,14 @@ from boto3 import client, session
 from cdk.catalog.stack import ServiceStack
 from cdk.catalog.utils import get_stack_name
 
-account = client('sts').get_caller_identity()['Account']
-region = session.Session().region_name
+# the caller identity is looked up only when the account isn't set, synth then needs no credentials
+account = os.environ.get('AWS_DEFAULT_ACCOUNT') or client('sts').get_caller_identity()['Account']
+region = os.environ.get('AWS_DEFAULT_REGION') or session.Session().region_name
 app = App()
 my_stack = ServiceStack(
     scope=app,
     id=get_stack_name(),
-    env=Environment(account=os.environ.get('AWS_DEFAULT_ACCOUNT', account), region=os.environ.get('AWS_DEFAULT_REGION', region)),
+    env=Environment(account=account, region=region),
 )
 
 app.synth()
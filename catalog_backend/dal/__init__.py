@@ -1,9 +1,15 @@
 from functools import lru_cache
 
-from catalog_backend.dal.db_handler import DalHandler
-from catalog_backend.dal.dynamo_dal_handler import DynamoDalHandler
+from catalog_backend.dal.db_handler import DalBackend, DalHandler
 
 
 @lru_cache
-def get_dal_handler(table_name: str) -> DalHandler:
-    return DynamoDalHandler(table_name)
+def get_dal_handler(table_name: str, portfolio_shards: int = 1, backend: DalBackend = 'dynamodb') -> DalHandler:
+    if backend == 'memory':
+        from catalog_backend.dal.memory_dal_handler import InMemoryDalHandler
+
+        return InMemoryDalHandler(table_name, portfolio_shards)
+    # imported on first use, the DynamoDB implementation pulls boto3 which isn't needed to initialize the handler
+    from catalog_backend.dal.dynamo_dal_handler import DynamoDalHandler
+
+    return DynamoDalHandler(table_name, portfolio_shards)
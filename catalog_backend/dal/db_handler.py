@@ -1,17 +1,53 @@
+import inspect
+import threading
 from abc import ABC, ABCMeta, abstractmethod
+from typing import Collection, Iterator, Literal, Optional
+
+from catalog_backend.dal.models.db import ProductEntry
 
 
 class _SingletonMeta(ABCMeta):
+    """One instance per class and constructor arguments, a handler of another table is another instance"""
+
     _instances: dict = {}
+    _lock = threading.Lock()
 
     def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super(_SingletonMeta, cls).__call__(*args, **kwargs)
-        return cls._instances[cls]
+        # bind to the signature so positional, keyword and default arguments of the same call map to the same instance
+        bound = inspect.signature(cls.__init__).bind(None, *args, **kwargs)
+        bound.apply_defaults()
+        key = (cls, tuple(bound.arguments.items())[1:])  # without self
+        with _SingletonMeta._lock:
+            if key not in cls._instances:
+                cls._instances[key] = super(_SingletonMeta, cls).__call__(*args, **kwargs)
+            return cls._instances[key]
+
+
+DalBackend = Literal['dynamodb', 'memory']  # the memory backend keeps deployments in the process, for local runs and tests
+DEFAULT_PAGE_SIZE = 100
+IDEMPOTENCY_CACHE_SIZE = 1000  # request ids
+IDEMPOTENCY_CACHE_TTL = 3600  # seconds, CloudFormation waits up to an hour for a custom resource response
+TOMBSTONE_TTL = 7 * 24 * 3600  # seconds, longer than a request can wait in the queue and its dead letter queue
+# product arguments of the handler to their stored attributes
+PRODUCT_ATTRIBUTES = {
+    'product_name': 'name',
+    'product_version': 'version',
+    'account_id': 'account_id',
+    'consumer_name': 'consumer_name',
+    'region': 'region',
+}
 
 
 # data access handler / integration later adapter class
 class DalHandler(ABC, metaclass=_SingletonMeta):
+    """
+    Writes of a product deployment may carry the event_time of their request, the epoch milliseconds it was sent at.
+    A write whose event_time is older than the event_time of the entry is stale and skipped, so a redelivered or delayed
+    request can't undo a newer one. Writes without an event_time always apply.
+    A delete with an event_time leaves a tombstone with it for TOMBSTONE_TTL, so a late create or update of a deleted stack
+    is skipped too. Tombstones are never returned by reads.
+    """
+
     @abstractmethod
     def add_product_deployment(
         self,
@@ -22,6 +58,8 @@ class DalHandler(ABC, metaclass=_SingletonMeta):
         account_id: str,
         consumer_name: str,
         region: str,
+        request_id: str,
+        event_time: Optional[int] = None,
     ) -> None: ...  # pragma: no cover
 
     @abstractmethod
@@ -29,6 +67,8 @@ class DalHandler(ABC, metaclass=_SingletonMeta):
         self,
         portfolio_id: str,
         product_stack_id: str,
+        request_id: str,
+        event_time: Optional[int] = None,
     ) -> None: ...  # pragma: no cover
 
     @abstractmethod
@@ -41,4 +81,51 @@ class DalHandler(ABC, metaclass=_SingletonMeta):
         account_id: str,
         consumer_name: str,
         region: str,
+        request_id: str,
+        changed_properties: Optional[Collection[str]] = None,
+        event_time: Optional[int] = None,
+    ) -> None:
+        """
+        Writes only the changed_properties, named like the product arguments, and sets updated_at. None writes all of them.
+        An entry that doesn't exist yet is written whole.
+        """
+        ...  # pragma: no cover
+
+    @abstractmethod
+    def add_product_deployments(self, entries: list[ProductEntry]) -> None: ...  # pragma: no cover
+
+    @abstractmethod
+    def delete_product_deployments(
+        self,
+        portfolio_id: str,
+        product_stack_ids: list[str],
     ) -> None: ...  # pragma: no cover
+
+    @abstractmethod
+    def get_product_deployment(self, portfolio_id: str, product_stack_id: str) -> Optional[ProductEntry]: ...  # pragma: no cover
+
+    @abstractmethod
+    def list_deployments_by_portfolio(self, portfolio_id: str, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[ProductEntry]: ...  # pragma: no cover
+
+    @abstractmethod
+    def list_deployments_by_account(self, account_id: str, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[ProductEntry]: ...  # pragma: no cover
+
+    @abstractmethod
+    def list_deployments_by_consumer(self, consumer_name: str, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[ProductEntry]: ...  # pragma: no cover
+
+    @abstractmethod
+    def list_deployments_by_product(
+        self,
+        product_name: str,
+        product_version: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[ProductEntry]: ...  # pragma: no cover
+
+    @abstractmethod
+    def scan_deployments(
+        self,
+        segment: int,
+        total_segments: int,
+        exclusive_start_key: Optional[dict] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[tuple[list[ProductEntry], Optional[dict]]]: ...  # pragma: no cover
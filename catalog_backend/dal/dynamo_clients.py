@@ -0,0 +1,81 @@
+import threading
+from typing import TYPE_CHECKING, Optional
+
+from catalog_backend.handlers.utils.observability import logger
+
+if TYPE_CHECKING:
+    from boto3.session import Session
+    from botocore.config import Config
+    from mypy_boto3_dynamodb import DynamoDBServiceResource
+    from mypy_boto3_dynamodb.service_resource import Table
+
+# sized for the concurrent workers that share a client: batch record workers and shard queries
+MAX_POOL_CONNECTIONS = 25
+MAX_ATTEMPTS = 5  # including the first attempt
+CONNECT_TIMEOUT = 1.0  # seconds
+READ_TIMEOUT = 2.0  # seconds, single item calls take single digit milliseconds, a stuck call is retried instead of waited on
+
+_lock = threading.Lock()
+_session: Optional['Session'] = None
+_resources: dict[Optional[str], 'DynamoDBServiceResource'] = {}
+# boto3 resources aren't thread safe, every thread gets its own table resources on top of the shared, thread safe client
+_local = threading.local()
+_generation = 0  # bumped by clear(), table resources of an older generation are built again
+
+
+def _build_config() -> 'Config':
+    from botocore.config import Config
+
+    return Config(
+        tcp_keepalive=True,
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        # adaptive mode adds client side rate limiting on top of the standard retries when DynamoDB throttles
+        retries={'mode': 'adaptive', 'max_attempts': MAX_ATTEMPTS},
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+    )
+
+
+def get_table(table_name: str, region: Optional[str] = None) -> 'Table':
+    """
+    Returns the DynamoDB table resource for a table and region, built once per thread of the execution environment.
+    The table resources of a region share one low level client and its connection pool. A None region is the environment default region.
+    """
+    if getattr(_local, 'generation', None) != _generation:
+        _local.tables, _local.generation = {}, _generation
+    key = (table_name, region)
+    table = _local.tables.get(key)
+    if table is None:
+        shared = _get_shared_resource(region)
+        # a resource of the same class on the shared client, building it doesn't create another client
+        table = _local.tables[key] = type(shared)(client=shared.meta.client).Table(table_name)
+    return table
+
+
+def _get_shared_resource(region: Optional[str]) -> 'DynamoDBServiceResource':
+    resource = _resources.get(region)
+    if resource is not None:
+        return resource
+    # boto3 sessions aren't thread safe, clients are built under the lock and shared afterwards
+    with _lock:
+        return _get_resource(region)
+
+
+def _get_resource(region: Optional[str]) -> 'DynamoDBServiceResource':
+    # must be called with the lock held
+    global _session
+    if region not in _resources:
+        import boto3  # deferred to the first database call, keeps it out of the cold start import graph
+
+        logger.info('creating dynamodb client', region=region)
+        if _session is None:
+            _session = boto3.session.Session()
+        _resources[region] = _session.resource('dynamodb', region_name=region, config=_build_config())
+    return _resources[region]
+
+
+def clear() -> None:
+    global _generation
+    with _lock:
+        _resources.clear()
+        _generation += 1
@@ -1,29 +1,192 @@
-from datetime import datetime, timezone
+import heapq
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Collection, Iterator, Optional
 
-import boto3
-from cachetools import TTLCache, cached
-from mypy_boto3_dynamodb import DynamoDBServiceResource
-from mypy_boto3_dynamodb.service_resource import Table
-from pydantic import ValidationError
+from cachetools import TTLCache
 
-from catalog_backend.dal.db_handler import DalHandler
+from catalog_backend.dal.db_handler import (
+    DEFAULT_PAGE_SIZE,
+    IDEMPOTENCY_CACHE_SIZE,
+    IDEMPOTENCY_CACHE_TTL,
+    PRODUCT_ATTRIBUTES,
+    TOMBSTONE_TTL,
+    DalHandler,
+)
+from catalog_backend.dal.dynamo_clients import get_table
 from catalog_backend.dal.models.db import ProductEntry
 from catalog_backend.handlers.utils.observability import logger, tracer
 
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.service_resource import Table
+
+BATCH_WRITE_MAX_ITEMS = 25  # BatchWriteItem limit per request
+BATCH_WRITE_MAX_ATTEMPTS = 5
+BATCH_WRITE_BASE_DELAY = 0.05  # seconds
+# global secondary indexes, must match the CDK table definition
+ACCOUNT_ID_INDEX = 'account_id-index'
+CONSUMER_NAME_INDEX = 'consumer_name-index'
+PRODUCT_INDEX = 'name-version-index'
+SCATTER_MAX_WORKERS = 10  # concurrent shard queries
+SHARD_SEPARATOR = '#'
+# a write is skipped when the entry was written by a request that CloudFormation sent later, equal times are written
+EVENT_TIME_CONDITION = '(attribute_not_exists(event_time) OR event_time <= :event_time)'
+# a delete leaves an item with only the key, its request, event time and these attributes, must match the CDK table TTL attribute
+DELETED_ATTRIBUTE = 'deleted'
+TTL_ATTRIBUTE = 'expires_at'
+# the key lengths the fast path still checks, the input model doesn't constrain them. Read from ProductEntry so they can't drift
+KEY_MAX_LENGTHS = {
+    field: next(constraint.max_length for constraint in ProductEntry.model_fields[field].metadata if hasattr(constraint, 'max_length'))
+    for field in ('portfolio_id', 'product_stack_id')
+}
+
+
+class UnprocessedItemsError(Exception):
+    pass
+
 
 class DynamoDalHandler(DalHandler):
-    def __init__(self, table_name: str):
+    """
+    Product deployments of a portfolio are written to `portfolio_shards` partitions.
+    With more than one shard the partition key is `<portfolio_id>#<shard>`, the shard is derived from the product stack id
+    so every write of a product lands on the same item. A single shard keeps the original `<portfolio_id>` partition key.
+    """
+
+    def __init__(self, table_name: str, portfolio_shards: int = 1, region: Optional[str] = None):
         self.table_name = table_name
+        self.portfolio_shards = portfolio_shards
+        self.region = region
+        # request ids of recently written events, SQS redeliveries of the same event skip the write
+        self._written_requests: TTLCache = TTLCache(maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_CACHE_TTL)
+        self._written_requests_lock = threading.Lock()  # records may be written by concurrent workers
+        # portfolios without entries under the unsharded key, nothing is written under it once the portfolio is sharded
+        self._migrated_portfolios: set[str] = set()
 
-    # cache dynamodb connection data for no longer than 5 minutes
-    @cached(cache=TTLCache(maxsize=1, ttl=300))
-    def _get_db_handler(self, table_name: str) -> Table:
-        logger.info('opening connection to dynamodb table', table_name=table_name)
-        dynamodb: DynamoDBServiceResource = boto3.resource('dynamodb')
-        return dynamodb.Table(table_name)
+    def _get_db_handler(self, table_name: str) -> 'Table':
+        # the client is kept for the lifetime of the execution environment, its pooled connections are reused across invocations
+        return get_table(table_name, self.region)
 
     def _get_unix_time(self) -> int:
-        return int(datetime.now(timezone.utc).timestamp())
+        return int(time.time())  # seconds since the epoch are timezone independent
+
+    def _partition_key(self, portfolio_id: str, product_stack_id: str) -> str:
+        if self.portfolio_shards == 1:
+            return portfolio_id
+        # crc32 is stable across processes, unlike hash() which is salted per interpreter
+        shard = zlib.crc32(product_stack_id.encode()) % self.portfolio_shards
+        return f'{portfolio_id}{SHARD_SEPARATOR}{shard}'
+
+    def _key(self, portfolio_id: str, product_stack_id: str) -> dict[str, str]:
+        return {'portfolio_id': self._partition_key(portfolio_id, product_stack_id), 'product_stack_id': product_stack_id}
+
+    def _stored_keys(self, portfolio_id: str, product_stack_id: str) -> list[dict[str, str]]:
+        # an entry that wasn't migrated yet still lives under the unsharded key, a delete removes both
+        if self.portfolio_shards == 1:
+            return [self._key(portfolio_id, product_stack_id)]
+        return [self._key(portfolio_id, product_stack_id), {'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id}]
+
+    def _to_item(self, entry: ProductEntry, **dump_kwargs: Any) -> dict[str, Any]:
+        item = entry.model_dump(**dump_kwargs)
+        item['portfolio_id'] = self._partition_key(entry.portfolio_id, entry.product_stack_id)
+        return item
+
+    def _build_item(
+        self,
+        portfolio_id: str,
+        product_stack_id: str,
+        product_name: str,
+        product_version: str,
+        account_id: str,
+        consumer_name: str,
+        region: str,
+        request_id: str,
+        event_time: Optional[int] = None,
+    ) -> dict[str, Any]:
+        # trusted fast path: the values were already validated by the input ProductModel with the same constraints as ProductEntry,
+        # so the item is built directly instead of validating them again and dumping a model. Must match the ProductEntry schema.
+        for field, value in (('portfolio_id', portfolio_id), ('product_stack_id', product_stack_id)):
+            if not 0 < len(value) <= KEY_MAX_LENGTHS[field]:
+                raise ValueError(f'{field} must be 1-{KEY_MAX_LENGTHS[field]} characters, got {len(value)}')
+        item = {
+            'portfolio_id': self._partition_key(portfolio_id, product_stack_id),
+            'product_stack_id': product_stack_id,
+            'name': product_name,
+            'version': product_version,
+            'account_id': account_id,
+            'consumer_name': consumer_name,
+            'region': region,
+            'created_at': self._get_unix_time(),
+            'request_id': request_id,
+        }
+        if event_time is not None:
+            item['event_time'] = event_time
+        return item
+
+    def _tombstone(self, portfolio_id: str, product_stack_id: str, request_id: str, event_time: int) -> dict[str, Any]:
+        # without the index attributes the tombstone isn't in the global secondary indexes
+        return {
+            **self._key(portfolio_id, product_stack_id),
+            DELETED_ATTRIBUTE: True,
+            'request_id': request_id,
+            'event_time': event_time,
+            TTL_ATTRIBUTE: self._get_unix_time() + TOMBSTONE_TTL,
+        }
+
+    @staticmethod
+    def _is_tombstone(item: Any) -> bool:
+        # read items and the low level item of a failed condition both have the attribute
+        return item is not None and DELETED_ATTRIBUTE in item
+
+    @staticmethod
+    def _from_item(item: dict[str, Any]) -> ProductEntry:
+        # items of both layouts are returned with the logical portfolio id
+        return ProductEntry.model_validate({**item, 'portfolio_id': str(item['portfolio_id']).split(SHARD_SEPARATOR, 1)[0]})
+
+    def _is_written(self, request_id: str) -> bool:
+        with self._written_requests_lock:
+            is_written = request_id in self._written_requests
+        if is_written:
+            logger.info('request was already written, skipping duplicate', request_id=request_id)
+            return True
+        return False
+
+    def _mark_written(self, request_id: str) -> None:
+        with self._written_requests_lock:
+            self._written_requests[request_id] = True
+
+    @staticmethod
+    def _write_condition(event_time: Optional[int]) -> tuple[str, dict[str, Any]]:
+        # an item that was written by the same request is not written again, other requests overwrite it unless they are older
+        condition = '(attribute_not_exists(request_id) OR request_id <> :request_id)'
+        if event_time is None:
+            return condition, {}
+        return f'{condition} AND {EVENT_TIME_CONDITION}', {':event_time': event_time}
+
+    @staticmethod
+    def _log_skipped_write(request_id: str, existing: Any) -> None:
+        # the item of a failed condition is returned in the low level attribute value format
+        entry_request_id = (existing or {}).get('request_id', {}).get('S')
+        if existing is not None and entry_request_id != request_id:
+            logger.info('entry was written by a newer request, skipping stale write', request_id=request_id, entry_request_id=entry_request_id)
+        else:
+            logger.info('request was already written by a previous delivery, skipping duplicate', request_id=request_id)
+
+    def _put_once(self, item: dict[str, Any]) -> None:
+        table: Table = self._get_db_handler(self.table_name)
+        condition, values = self._write_condition(item.get('event_time'))
+        try:
+            table.put_item(
+                Item=item,
+                ConditionExpression=condition,
+                ExpressionAttributeValues={':request_id': item['request_id'], **values},
+                ReturnValuesOnConditionCheckFailure='ALL_OLD',
+            )
+        except table.meta.client.exceptions.ConditionalCheckFailedException as exc:
+            self._log_skipped_write(item['request_id'], exc.response.get('Item'))
+        self._mark_written(item['request_id'])
 
     @tracer.capture_method(capture_response=False)
     def add_product_deployment(
@@ -35,25 +198,15 @@ class DynamoDalHandler(DalHandler):
         account_id: str,
         consumer_name: str,
         region: str,
+        request_id: str,
+        event_time: Optional[int] = None,
     ) -> None:
         logger.info('trying to save product deployment')
-        try:
-            entry = ProductEntry(
-                portfolio_id=portfolio_id,
-                product_stack_id=product_stack_id,
-                name=product_name,
-                version=product_version,
-                account_id=account_id,
-                consumer_name=consumer_name,
-                region=region,
-                created_at=self._get_unix_time(),
-            )
-            table: Table = self._get_db_handler(self.table_name)
-            table.put_item(Item=entry.model_dump())
-        except ValidationError as exc:  # pragma: no cover
-            logger.exception('failed to create product deployment')
-            raise exc
-
+        if self._is_written(request_id):
+            return
+        self._put_once(
+            self._build_item(portfolio_id, product_stack_id, product_name, product_version, account_id, consumer_name, region, request_id, event_time)
+        )
         logger.info('finished create product deployment successfully')
 
     @tracer.capture_method(capture_response=False)
@@ -61,16 +214,35 @@ class DynamoDalHandler(DalHandler):
         self,
         portfolio_id: str,
         product_stack_id: str,
+        request_id: str,
+        event_time: Optional[int] = None,
     ) -> None:
         logger.info('trying to delete product deployment')
+        if self._is_written(request_id):
+            return
         try:
             table: Table = self._get_db_handler(self.table_name)
-            table.delete_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
+            if event_time is not None:
+                self._delete_with_tombstone(table, portfolio_id, product_stack_id, request_id, event_time)
+            elif self.portfolio_shards == 1:
+                table.delete_item(Key=self._key(portfolio_id, product_stack_id))
+            else:
+                # both keys are removed in one request
+                self._batch_write([{'DeleteRequest': {'Key': key}} for key in self._stored_keys(portfolio_id, product_stack_id)])
         except Exception as exc:
             logger.exception('failed to delete product deployment')
             raise exc
+        self._mark_written(request_id)
         logger.info('finished delete product deployment successfully')
 
+    def _delete_with_tombstone(self, table: 'Table', portfolio_id: str, product_stack_id: str, request_id: str, event_time: int) -> None:
+        # the entry is replaced by a tombstone that keeps the event time of the delete, a late create or update of the stack is older
+        # and skipped instead of bringing the deployment back. A newer write replaces the tombstone, an unused one expires by its TTL
+        self._put_once(self._tombstone(portfolio_id, product_stack_id, request_id, event_time))
+        if self.portfolio_shards > 1:
+            # entries under the unsharded key predate event times, there is nothing to compare
+            table.delete_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
+
     @tracer.capture_method(capture_response=False)
     def update_product_deployment(
         self,
@@ -81,23 +253,235 @@ class DynamoDalHandler(DalHandler):
         account_id: str,
         consumer_name: str,
         region: str,
+        request_id: str,
+        changed_properties: Optional[Collection[str]] = None,
+        event_time: Optional[int] = None,
     ) -> None:
-        logger.info('trying to update product deployment')
-        try:
-            entry = ProductEntry(
-                portfolio_id=portfolio_id,
-                product_stack_id=product_stack_id,
-                name=product_name,
-                version=product_version,
-                account_id=account_id,
-                consumer_name=consumer_name,
-                region=region,
-                created_at=self._get_unix_time(),
+        logger.info('trying to update product deployment', changed_properties=changed_properties)
+        if self._is_written(request_id):
+            return
+        properties = {
+            'product_name': product_name,
+            'product_version': product_version,
+            'account_id': account_id,
+            'consumer_name': consumer_name,
+            'region': region,
+        }
+        changed = {PRODUCT_ATTRIBUTES[name]: properties[name] for name in (properties if changed_properties is None else changed_properties)}
+        if not self._update_once(portfolio_id, product_stack_id, changed, request_id, event_time):
+            # the entry doesn't exist, an update can't leave an item without its other attributes
+            self._put_once(
+                self._build_item(
+                    portfolio_id, product_stack_id, product_name, product_version, account_id, consumer_name, region, request_id, event_time
+                )
             )
-            table: Table = self._get_db_handler(self.table_name)
-            # overwrite the entry if it exists
-            table.put_item(Item=entry.model_dump())
-        except ValidationError as exc:
-            logger.exception('failed to update product deployment')
-            raise exc
         logger.info('finished update product deployment successfully')
+
+    def _update_once(
+        self, portfolio_id: str, product_stack_id: str, changed: dict[str, str], request_id: str, event_time: Optional[int] = None
+    ) -> bool:
+        # only the changed attributes are written, created_at is kept. Returns False if there is no entry to update
+        table: Table = self._get_db_handler(self.table_name)
+        values: dict[str, Any] = {**changed, 'updated_at': self._get_unix_time(), 'request_id': request_id}
+        if event_time is not None:
+            values['event_time'] = event_time
+        condition, _ = self._write_condition(event_time)
+        try:
+            table.update_item(
+                Key=self._key(portfolio_id, product_stack_id),
+                UpdateExpression='SET ' + ', '.join(f'#{attribute} = :{attribute}' for attribute in values),
+                ConditionExpression=f'attribute_exists(product_stack_id) AND attribute_not_exists({DELETED_ATTRIBUTE}) AND {condition}',
+                ExpressionAttributeNames={f'#{attribute}': attribute for attribute in values},
+                ExpressionAttributeValues={f':{attribute}': value for attribute, value in values.items()},
+                ReturnValuesOnConditionCheckFailure='ALL_OLD',
+            )
+        except table.meta.client.exceptions.ConditionalCheckFailedException as exc:
+            existing = exc.response.get('Item')
+            if existing is None or self._is_tombstone(existing):
+                # the whole entry is written instead, the put is skipped if the tombstone is newer
+                return False
+            self._log_skipped_write(request_id, existing)
+        self._mark_written(request_id)
+        return True
+
+    @tracer.capture_method(capture_response=False)
+    def add_product_deployments(self, entries: list[ProductEntry]) -> None:
+        logger.info('trying to save product deployments in bulk', count=len(entries))
+        # a batch can't hold two requests for the same key, the last entry of a key wins
+        unique_entries = {(entry.portfolio_id, entry.product_stack_id): entry for entry in entries}
+        self._batch_write([{'PutRequest': {'Item': self._to_item(entry, exclude_none=True)}} for entry in unique_entries.values()])
+        logger.info('finished bulk save of product deployments successfully', count=len(unique_entries))
+
+    @tracer.capture_method(capture_response=False)
+    def delete_product_deployments(
+        self,
+        portfolio_id: str,
+        product_stack_ids: list[str],
+    ) -> None:
+        logger.info('trying to delete product deployments in bulk', count=len(product_stack_ids))
+        unique_ids = dict.fromkeys(product_stack_ids)  # keeps the original order
+        self._batch_write(
+            [{'DeleteRequest': {'Key': key}} for product_stack_id in unique_ids for key in self._stored_keys(portfolio_id, product_stack_id)]
+        )
+        logger.info('finished bulk delete of product deployments successfully', count=len(unique_ids))
+
+    def _batch_write(self, requests: list[dict[str, Any]]) -> None:
+        table: Table = self._get_db_handler(self.table_name)
+        for start in range(0, len(requests), BATCH_WRITE_MAX_ITEMS):
+            pending: Any = {table.name: requests[start : start + BATCH_WRITE_MAX_ITEMS]}
+            attempt = 1
+            while True:
+                response = table.meta.client.batch_write_item(RequestItems=pending)
+                pending = response.get('UnprocessedItems')
+                if not pending:
+                    break
+                if attempt == BATCH_WRITE_MAX_ATTEMPTS:
+                    logger.error('failed to write product deployments batch', unprocessed=len(pending[table.name]))
+                    raise UnprocessedItemsError(f'{len(pending[table.name])} items were not processed after {attempt} attempts')
+                # exponential backoff with full jitter, unprocessed items are usually the result of throttling
+                time.sleep(random.uniform(0, BATCH_WRITE_BASE_DELAY * 2**attempt))
+                attempt += 1
+
+    @tracer.capture_method(capture_response=False)
+    def get_product_deployment(self, portfolio_id: str, product_stack_id: str) -> Optional[ProductEntry]:
+        table: Table = self._get_db_handler(self.table_name)
+        item = table.get_item(Key=self._key(portfolio_id, product_stack_id)).get('Item')
+        if item is None and self.portfolio_shards > 1:
+            # the entry may not have been migrated to the sharded layout yet
+            item = table.get_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id}).get('Item')
+        return self._from_item(item) if item and not self._is_tombstone(item) else None
+
+    def list_deployments_by_portfolio(self, portfolio_id: str, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[ProductEntry]:
+        from boto3.dynamodb.conditions import Key
+
+        if self.portfolio_shards == 1:
+            return self._query(None, Key('portfolio_id').eq(portfolio_id), page_size)
+        # scatter-gather: the first page of every shard partition is read concurrently, a later page only when the merge reaches it.
+        # Entries that weren't migrated yet are read from the unsharded partition, it is merged last so a sharded copy of a stack wins
+        partition_keys = [f'{portfolio_id}{SHARD_SEPARATOR}{shard}' for shard in range(self.portfolio_shards)]
+        if portfolio_id not in self._migrated_portfolios:
+            partition_keys.append(portfolio_id)
+        pages = [self._query_pages(None, Key('portfolio_id').eq(partition_key), page_size) for partition_key in partition_keys]
+        with ThreadPoolExecutor(max_workers=min(len(pages), SCATTER_MAX_WORKERS)) as executor:
+            first_pages: list[Future[list[ProductEntry]]] = [executor.submit(next, partition_pages, []) for partition_pages in pages]
+        partitions = [self._partition_entries(first_page, partition_pages) for first_page, partition_pages in zip(first_pages, pages, strict=True)]
+        if portfolio_id not in self._migrated_portfolios:
+            partitions[-1] = self._legacy_entries(portfolio_id, partitions[-1])
+        # each partition is sorted by the stack id so the merge is sorted too
+        return self._first_per_stack(heapq.merge(*partitions, key=lambda entry: entry.product_stack_id))
+
+    @staticmethod
+    def _partition_entries(first_page: 'Future[list[ProductEntry]]', pages: Iterator[list[ProductEntry]]) -> Iterator[ProductEntry]:
+        yield from first_page.result()
+        for page in pages:
+            yield from page
+
+    @staticmethod
+    def _first_per_stack(entries: Iterator[ProductEntry]) -> Iterator[ProductEntry]:
+        # a stack that is still in the unsharded partition while it is migrated is returned once, from its shard
+        previous_stack_id = None
+        for entry in entries:
+            if entry.product_stack_id != previous_stack_id:
+                yield entry
+            previous_stack_id = entry.product_stack_id
+
+    def _legacy_entries(self, portfolio_id: str, entries: Iterator[ProductEntry]) -> Iterator[ProductEntry]:
+        is_empty = True
+        for entry in entries:
+            is_empty = False
+            yield entry
+        if is_empty:
+            # migrated, the unsharded partition isn't read for this portfolio again
+            self._migrated_portfolios.add(portfolio_id)
+
+    def list_deployments_by_account(self, account_id: str, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[ProductEntry]:
+        from boto3.dynamodb.conditions import Key
+
+        return self._query(ACCOUNT_ID_INDEX, Key('account_id').eq(account_id), page_size)
+
+    def list_deployments_by_consumer(self, consumer_name: str, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[ProductEntry]:
+        from boto3.dynamodb.conditions import Key
+
+        return self._query(CONSUMER_NAME_INDEX, Key('consumer_name').eq(consumer_name), page_size)
+
+    def list_deployments_by_product(
+        self,
+        product_name: str,
+        product_version: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[ProductEntry]:
+        from boto3.dynamodb.conditions import ConditionBase, Key
+
+        key_condition: ConditionBase = Key('name').eq(product_name)
+        if product_version is not None:
+            key_condition = key_condition & Key('version').eq(product_version)
+        return self._query(PRODUCT_INDEX, key_condition, page_size)
+
+    def scan_deployments(
+        self,
+        segment: int,
+        total_segments: int,
+        exclusive_start_key: Optional[dict] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[tuple[list[ProductEntry], Optional[dict]]]:
+        """
+        Reads one segment of a parallel scan page by page. Yields each page with the key to resume the scan after it,
+        the key is None for the last page of the segment.
+        """
+        table: Table = self._get_db_handler(self.table_name)
+        scan_kwargs: dict[str, Any] = {'Segment': segment, 'TotalSegments': total_segments, 'Limit': page_size}
+        if exclusive_start_key is not None:
+            scan_kwargs['ExclusiveStartKey'] = exclusive_start_key
+        while True:
+            response = table.scan(**scan_kwargs)
+            last_evaluated_key = response.get('LastEvaluatedKey')
+            yield [self._from_item(item) for item in response['Items'] if not self._is_tombstone(item)], last_evaluated_key
+            if last_evaluated_key is None:
+                return
+            scan_kwargs['ExclusiveStartKey'] = last_evaluated_key
+
+    def _query(self, index_name: Optional[str], key_condition: Any, page_size: int) -> Iterator[ProductEntry]:
+        # pages are fetched lazily, the next page is read only when the caller iterates past the current one
+        for page in self._query_pages(index_name, key_condition, page_size):
+            yield from page
+
+    def _query_pages(self, index_name: Optional[str], key_condition: Any, page_size: int) -> Iterator[list[ProductEntry]]:
+        table: Table = self._get_db_handler(self.table_name)
+        query_kwargs: dict[str, Any] = {'KeyConditionExpression': key_condition, 'Limit': page_size}
+        if index_name is not None:
+            query_kwargs['IndexName'] = index_name
+        while True:
+            logger.debug('querying product deployments page', index_name=index_name)
+            response = table.query(**query_kwargs)
+            yield [self._from_item(item) for item in response['Items'] if not self._is_tombstone(item)]
+            if 'LastEvaluatedKey' not in response:
+                return
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    @tracer.capture_method(capture_response=False)
+    def migrate_to_sharded_keys(self, portfolio_id: str, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+        """
+        Moves the entries of a portfolio from the unsharded `<portfolio_id>` partition to their shard partitions.
+        Safe to run while the handler is live and to run again: an entry that was already written under its sharded key
+        by a newer event is not overwritten, the unsharded copy is removed either way. Returns the number of moved entries.
+        """
+        from boto3.dynamodb.conditions import Key
+
+        if self.portfolio_shards == 1:
+            return 0
+        logger.info('migrating product deployments to sharded keys', portfolio_id=portfolio_id, shards=self.portfolio_shards)
+        table: Table = self._get_db_handler(self.table_name)
+        legacy_entries = list(self._query(None, Key('portfolio_id').eq(portfolio_id), page_size))
+        moved = 0
+        for entry in legacy_entries:
+            try:
+                table.put_item(Item=self._to_item(entry, exclude_none=True), ConditionExpression='attribute_not_exists(product_stack_id)')
+                moved += 1
+            except table.meta.client.exceptions.ConditionalCheckFailedException:
+                logger.info('sharded entry already exists, dropping unsharded copy', product_stack_id=entry.product_stack_id)
+        self._batch_write(
+            [{'DeleteRequest': {'Key': {'portfolio_id': portfolio_id, 'product_stack_id': entry.product_stack_id}}} for entry in legacy_entries]
+        )
+        self._migrated_portfolios.add(portfolio_id)
+        logger.info('finished migrating product deployments to sharded keys', moved=moved, total=len(legacy_entries))
+        return moved
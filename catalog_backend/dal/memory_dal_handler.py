@@ -0,0 +1,255 @@
+import threading
+import time
+import zlib
+from collections import defaultdict
+from typing import Collection, Iterator, NamedTuple, Optional
+
+from cachetools import TTLCache
+
+from catalog_backend.dal.db_handler import (
+    DEFAULT_PAGE_SIZE,
+    IDEMPOTENCY_CACHE_SIZE,
+    IDEMPOTENCY_CACHE_TTL,
+    PRODUCT_ATTRIBUTES,
+    TOMBSTONE_TTL,
+    DalHandler,
+)
+from catalog_backend.dal.models.db import ProductEntry
+from catalog_backend.handlers.utils.observability import logger
+
+# attributes the deployments are looked up by, the same lookups the table key and its global secondary indexes serve
+INDEXED_ATTRIBUTES = ('portfolio_id', 'account_id', 'consumer_name', 'name')
+
+_Key = tuple[str, str]  # (portfolio_id, product_stack_id)
+_Version = tuple[Optional[str], Optional[int]]  # (request_id, event_time) of the last write of a key
+
+
+class _Tombstone(NamedTuple):
+    request_id: str
+    event_time: int
+    expires_at: float  # epoch seconds
+
+
+class InMemoryDalHandler(DalHandler):
+    """
+    Keeps the product deployments of a table in the memory of the process, for local runs, load simulations and tests.
+    Entries are stored by their primary key and indexed by the attributes of the table global secondary indexes,
+    so lookups cost the same as their DynamoDB queries and not a scan. Results are ordered like their DynamoDB queries.
+    Sharding only spreads DynamoDB partitions, portfolio_shards is accepted for a compatible signature and ignored.
+    """
+
+    def __init__(self, table_name: str, portfolio_shards: int = 1):
+        self.table_name = table_name
+        self.portfolio_shards = portfolio_shards
+        self._entries: dict[_Key, ProductEntry] = {}
+        self._indexes: dict[str, defaultdict[str, set[_Key]]] = {attribute: defaultdict(set) for attribute in INDEXED_ATTRIBUTES}
+        self._tombstones: dict[_Key, _Tombstone] = {}  # deletes with an event time, kept apart so reads never see them
+        self._written_requests: TTLCache = TTLCache(maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_CACHE_TTL)
+        self._lock = threading.Lock()  # records may be written by concurrent workers
+
+    def _put(self, entry: ProductEntry) -> None:
+        # must be called with the lock held
+        key = (entry.portfolio_id, entry.product_stack_id)
+        self._remove(key)
+        self._tombstones.pop(key, None)
+        self._entries[key] = entry
+        for attribute in INDEXED_ATTRIBUTES:
+            self._indexes[attribute][getattr(entry, attribute)].add(key)
+
+    def _remove(self, key: _Key) -> None:
+        # must be called with the lock held
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for attribute in INDEXED_ATTRIBUTES:
+            index = self._indexes[attribute]
+            value = getattr(entry, attribute)
+            index[value].discard(key)
+            if not index[value]:
+                del index[value]
+
+    def _version(self, key: _Key) -> _Version:
+        # must be called with the lock held. The last write of a deleted entry is its tombstone until the tombstone expires
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry.request_id, entry.event_time
+        tombstone = self._tombstones.get(key)
+        if tombstone is None or tombstone.expires_at < time.time():
+            self._tombstones.pop(key, None)
+            return None, None
+        return tombstone.request_id, tombstone.event_time
+
+    @staticmethod
+    def _is_newer(version: _Version, request_id: Optional[str], event_time: Optional[int]) -> bool:
+        # the key was written by a request that CloudFormation sent later, equal times are written
+        entry_request_id, entry_event_time = version
+        if entry_event_time is None or event_time is None or entry_event_time <= event_time:
+            return False
+        logger.info('entry was written by a newer request, skipping stale write', request_id=request_id, entry_request_id=entry_request_id)
+        return True
+
+    def _put_once(self, entry: ProductEntry) -> None:
+        with self._lock:
+            if entry.request_id in self._written_requests:
+                logger.info('request was already written, skipping duplicate', request_id=entry.request_id)
+                return
+            version = self._version((entry.portfolio_id, entry.product_stack_id))
+            # an entry that was written by the same request is not written again, other requests overwrite it unless they are older
+            if version[0] != entry.request_id and not self._is_newer(version, entry.request_id, entry.event_time):
+                self._put(entry)
+            self._written_requests[entry.request_id] = True
+
+    def add_product_deployment(
+        self,
+        portfolio_id: str,
+        product_stack_id: str,
+        product_name: str,
+        product_version: str,
+        account_id: str,
+        consumer_name: str,
+        region: str,
+        request_id: str,
+        event_time: Optional[int] = None,
+    ) -> None:
+        self._put_once(
+            ProductEntry(
+                portfolio_id=portfolio_id,
+                product_stack_id=product_stack_id,
+                name=product_name,
+                version=product_version,
+                account_id=account_id,
+                consumer_name=consumer_name,
+                region=region,
+                created_at=int(time.time()),
+                request_id=request_id,
+                event_time=event_time,
+            )
+        )
+
+    def delete_product_deployment(
+        self,
+        portfolio_id: str,
+        product_stack_id: str,
+        request_id: str,
+        event_time: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            if request_id in self._written_requests:
+                logger.info('request was already written, skipping duplicate', request_id=request_id)
+                return
+            key = (portfolio_id, product_stack_id)
+            version = self._version(key)
+            if version[0] != request_id and not self._is_newer(version, request_id, event_time):
+                self._remove(key)
+                if event_time is None:
+                    self._tombstones.pop(key, None)
+                else:
+                    # a late create or update of the stack is older than the tombstone and skipped
+                    self._tombstones[key] = _Tombstone(request_id, event_time, time.time() + TOMBSTONE_TTL)
+            self._written_requests[request_id] = True
+
+    def update_product_deployment(
+        self,
+        portfolio_id: str,
+        product_stack_id: str,
+        product_name: str,
+        product_version: str,
+        account_id: str,
+        consumer_name: str,
+        region: str,
+        request_id: str,
+        changed_properties: Optional[Collection[str]] = None,
+        event_time: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            existing = self._entries.get((portfolio_id, product_stack_id))
+            if existing is not None and request_id not in self._written_requests and existing.request_id != request_id:
+                if self._is_newer((existing.request_id, existing.event_time), request_id, event_time):
+                    self._written_requests[request_id] = True
+                    return
+                properties = {
+                    'product_name': product_name,
+                    'product_version': product_version,
+                    'account_id': account_id,
+                    'consumer_name': consumer_name,
+                    'region': region,
+                }
+                names = properties if changed_properties is None else changed_properties
+                changed = {PRODUCT_ATTRIBUTES[name]: properties[name] for name in names}
+                # only the changed attributes are replaced, created_at is kept
+                update = {**changed, 'updated_at': int(time.time()), 'request_id': request_id}
+                if event_time is not None:
+                    update['event_time'] = event_time
+                self._put(existing.model_copy(update=update))
+                self._written_requests[request_id] = True
+                return
+        # a duplicate is skipped and a missing or deleted entry is written whole, like an add
+        self.add_product_deployment(
+            portfolio_id, product_stack_id, product_name, product_version, account_id, consumer_name, region, request_id, event_time
+        )
+
+    def add_product_deployments(self, entries: list[ProductEntry]) -> None:
+        with self._lock:
+            for entry in entries:
+                self._put(entry)  # the last entry of a key wins
+
+    def delete_product_deployments(
+        self,
+        portfolio_id: str,
+        product_stack_ids: list[str],
+    ) -> None:
+        with self._lock:
+            for product_stack_id in product_stack_ids:
+                self._remove((portfolio_id, product_stack_id))
+                self._tombstones.pop((portfolio_id, product_stack_id), None)
+
+    def get_product_deployment(self, portfolio_id: str, product_stack_id: str) -> Optional[ProductEntry]:
+        with self._lock:
+            return self._entries.get((portfolio_id, product_stack_id))
+
+    def list_deployments_by_portfolio(self, portfolio_id: str, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[ProductEntry]:
+        return self._lookup('portfolio_id', portfolio_id)
+
+    def list_deployments_by_account(self, account_id: str, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[ProductEntry]:
+        return self._lookup('account_id', account_id)
+
+    def list_deployments_by_consumer(self, consumer_name: str, page_size: int = DEFAULT_PAGE_SIZE) -> Iterator[ProductEntry]:
+        return self._lookup('consumer_name', consumer_name)
+
+    def list_deployments_by_product(
+        self,
+        product_name: str,
+        product_version: Optional[str] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[ProductEntry]:
+        entries = self._lookup('name', product_name)
+        if product_version is not None:
+            entries = (entry for entry in entries if entry.version == product_version)
+        # the product index is sorted by version
+        return iter(sorted(entries, key=lambda entry: entry.version))
+
+    def scan_deployments(
+        self,
+        segment: int,
+        total_segments: int,
+        exclusive_start_key: Optional[dict] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> Iterator[tuple[list[ProductEntry], Optional[dict]]]:
+        with self._lock:
+            keys = sorted(key for key in self._entries if zlib.crc32(key[1].encode()) % total_segments == segment)
+        if exclusive_start_key is not None:
+            start_key = (exclusive_start_key['portfolio_id'], exclusive_start_key['product_stack_id'])
+            keys = [key for key in keys if key > start_key]
+        for start in range(0, max(len(keys), 1), page_size):
+            page_keys = keys[start : start + page_size]
+            with self._lock:
+                entries = [self._entries[key] for key in page_keys if key in self._entries]
+            is_last_page = start + page_size >= len(keys)
+            last_evaluated_key = None if is_last_page else {'portfolio_id': page_keys[-1][0], 'product_stack_id': page_keys[-1][1]}
+            yield entries, last_evaluated_key
+
+    def _lookup(self, attribute: str, value: str) -> Iterator[ProductEntry]:
+        # a snapshot of the matching entries sorted by the stack id like the table and index sort keys, later writes don't change it
+        with self._lock:
+            entries = [self._entries[key] for key in self._indexes[attribute].get(value, ())]
+        return iter(sorted(entries, key=lambda entry: entry.product_stack_id))
@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import Annotated, Optional
 
 from pydantic import BaseModel, Field, PositiveInt
 
@@ -12,3 +12,6 @@ class ProductEntry(BaseModel):
     consumer_name: Annotated[str, Field(min_length=1, max_length=40)]
     region: Annotated[str, Field(min_length=1, max_length=20)]
     created_at: PositiveInt
+    updated_at: Optional[PositiveInt] = None  # set by updates, an entry that was never updated has none
+    request_id: Optional[Annotated[str, Field(min_length=1, max_length=100)]] = None  # CloudFormation request that wrote the entry
+    event_time: Optional[PositiveInt] = None  # epoch ms the request that wrote the entry was sent at, older requests don't overwrite it
@@ -2,6 +2,8 @@ from typing import Annotated, Literal
 
 from pydantic import BaseModel, Field
 
+from catalog_backend.dal.db_handler import DalBackend
+
 
 class Observability(BaseModel):
     POWERTOOLS_SERVICE_NAME: Annotated[str, Field(min_length=1)]
@@ -12,3 +14,13 @@ class Observability(BaseModel):
 class VisibilityEnvVars(Observability):
     TABLE_NAME: Annotated[str, Field(min_length=1)]
     PORTFOLIO_ID: Annotated[str, Field(min_length=1)]
+    PORTFOLIO_SHARDS: Annotated[int, Field(ge=1, le=100)] = 1  # partitions the portfolio deployments are spread over
+    RECORD_WORKERS: Annotated[int, Field(ge=1, le=50)] = 1  # records of a batch processed concurrently, 1 processes them in order
+    DAL_BACKEND: DalBackend = 'dynamodb'  # 'memory' keeps deployments in the execution environment, for local load simulations
+    # every Nth invocation is profiled by a sampling profiler, 0 turns profiling off
+    PROFILE_EVERY_N: Annotated[int, Field(ge=0, le=1_000_000)] = 0
+    PROFILE_INTERVAL_MS: Annotated[int, Field(ge=1, le=1000)] = 5  # time between stack samples of a profiled invocation
+    PROFILE_TOP_N: Annotated[int, Field(ge=1, le=100)] = 15  # hot functions logged for a profiled invocation
+    # share of invocations whose raw payloads are logged at INFO, payloads are otherwise logged only at DEBUG
+    LOG_PAYLOAD_SAMPLE_RATE: Annotated[float, Field(ge=0, le=1)] = 0.0
+    LOG_PAYLOAD_MAX_CHARS: Annotated[int, Field(ge=256, le=256_000)] = 2048  # logged payloads are cut to this length
@@ -1,105 +1,259 @@
 # pylint: disable=no-value-for-parameter,unused-argument
+import gc
 import json
-from typing import Any, Dict
+import time
+from functools import lru_cache
+from typing import Any, Callable, Dict, Literal, Optional
 
 from aws_lambda_env_modeler import get_environment_variables, init_environment_variables
-from aws_lambda_powertools.metrics import MetricUnit
-from aws_lambda_powertools.utilities.parser.models import SqsModel
+from aws_lambda_powertools.utilities.batch import EventType
+from aws_lambda_powertools.utilities.batch.types import PartialItemFailureResponse
+from aws_lambda_powertools.utilities.parser.models import CloudFormationCustomResourceBaseModel, SqsRecordModel
 from aws_lambda_powertools.utilities.typing import LambdaContext
-from crhelper import CfnResource
+from pydantic import ValidationError
 
 from catalog_backend.handlers.models.env_vars import VisibilityEnvVars
-from catalog_backend.handlers.utils.observability import logger, metrics, tracer
-from catalog_backend.logic.product_lifecycle import delete_product, provision_product, update_product
-from catalog_backend.models.input import ProductCreateEventModel, ProductDeleteEventModel, ProductUpdateEventModel
+from catalog_backend.handlers.utils.batch import OrderedConcurrentBatchProcessor
+from catalog_backend.handlers.utils.cfn_response import CfnResponseSender
+from catalog_backend.handlers.utils.observability import (
+    UNKNOWN_PRODUCT,
+    add_metric,
+    append_record_keys,
+    clear_record_keys,
+    latencies,
+    logger,
+    metrics,
+    payloads,
+    tracer,
+)
+from catalog_backend.handlers.utils.profiler import InvocationProfiler
+from catalog_backend.logic.product_lifecycle import WriteBehindBuffer, delete_product, provision_product, update_product
+from catalog_backend.models.input import PRODUCT_EVENT_ADAPTER, ProductCreateEventModel, ProductDeleteEventModel, ProductUpdateEventModel
+from catalog_backend.models.output import CfnResponseModel
 
-CFN_RESOURCE = CfnResource(json_logging=False, log_level='INFO', boto_level='CRITICAL', sleep_on_delete=0)
+RESPONSE_SENDER = CfnResponseSender()
+PROFILER = InvocationProfiler()
+RecordResult = tuple[str, CfnResponseModel, str]  # response url, response and product name of an answerable request
+
+
+def _stack_id(record: Dict[str, Any]) -> Optional[str]:
+    # requests of the same CloudFormation stack are processed in order, a malformed record is independent of all others
+    try:
+        return json.loads(record['body']).get('StackId')
+    except Exception:
+        return None
+
+
+@lru_cache
+def _get_processor(max_workers: int) -> OrderedConcurrentBatchProcessor:
+    return OrderedConcurrentBatchProcessor(event_type=EventType.SQS, group_key=_stack_id, max_workers=max_workers, model=SqsRecordModel)
+
+
+@lru_cache
+def _get_write_buffer(max_workers: int) -> WriteBehindBuffer:
+    return WriteBehindBuffer(max_workers=max_workers)
 
 
 @init_environment_variables(model=VisibilityEnvVars)
 @logger.inject_lambda_context()
 @metrics.log_metrics
 @tracer.capture_lambda_handler(capture_response=False)
-def handle_product_event(event: Dict[str, Any], context: LambdaContext) -> None:
-    logger.info('processing product SQS event', event=event)
+def handle_product_event(event: Dict[str, Any], context: LambdaContext) -> PartialItemFailureResponse:
+    env_vars = get_environment_variables(model=VisibilityEnvVars)
+    payloads.start_invocation(env_vars.LOG_PAYLOAD_SAMPLE_RATE, env_vars.LOG_PAYLOAD_MAX_CHARS)
+    logger.info('processing product SQS event', records=len(event['Records']))
+    payloads.log('product SQS event', event=event)
+    try:
+        with PROFILER.sampled(env_vars.PROFILE_EVERY_N, env_vars.PROFILE_INTERVAL_MS, env_vars.PROFILE_TOP_N, context.aws_request_id):
+            return _process_batch(event, context, env_vars)
+    finally:
+        # stage latencies are published once per invocation, like the counters
+        latencies.flush()
+
+
+def _process_batch(event: Dict[str, Any], context: LambdaContext, env_vars: VisibilityEnvVars) -> PartialItemFailureResponse:
+    # each record is processed independently, only failed records are reported back to SQS for redelivery
+    processor = _get_processor(env_vars.RECORD_WORKERS)
+    write_buffer = _get_write_buffer(env_vars.RECORD_WORKERS)
+    write_buffer.clear()  # writes left over by an invocation that didn't finish belong to records that are redelivered
+    with processor(records=event['Records'], handler=record_handler, lambda_context=context):
+        processed_records = processor.process()
+    # the product flows only buffer their writes, every product of the batch is written once
+    failed_writes = write_buffer.flush()
+
+    # answer CloudFormation for the whole batch at once, a record whose response wasn't delivered is redelivered
+    answered = [
+        (record, _with_write_result(result, failed_writes))
+        for status, result, record in processed_records
+        if status == 'success' and result is not None
+    ]
+    sent = RESPONSE_SENDER.send_timed([(response_url, cfn_response) for _, (response_url, cfn_response, _) in answered])
+    batch_response = processor.response()
+    for (record, (_, _, product_name)), (is_delivered, seconds) in zip(answered, sent, strict=True):
+        latencies.record('Callback', seconds, product_name)
+        if not is_delivered:
+            batch_response['batchItemFailures'].append({'itemIdentifier': record['messageId']})
+    return batch_response
+
 
+def _with_write_result(result: RecordResult, failed_writes: dict[str, Exception]) -> RecordResult:
+    # a request is answered with SUCCESS only once its buffered write succeeded
+    response_url, cfn_response, product_name = result
+    error = failed_writes.get(cfn_response.request_id)
+    if error is None or cfn_response.status == 'FAILED':
+        return result
+    add_metric(name='FailedProductWrites')
+    return response_url, cfn_response.model_copy(update={'status': 'FAILED', 'reason': str(error)}), product_name
+
+
+def record_handler(record: SqsRecordModel, lambda_context: LambdaContext) -> Optional[RecordResult]:
+    """
+    Processes a single SQS record that holds a custom resource request and returns the response to send to CloudFormation
+    with the url to send it to and the product name its latencies are published under.
+    Returns None for a redelivered request that was already answered.
+    Raising marks the record as a batch item failure. A request that can't be parsed can't be answered,
+    so it is redelivered until it reaches the DLQ. Failures in the product flows are answered with a FAILED response.
+    """
+    try:
+        return _handle_record(record)
+    finally:
+        clear_record_keys()
+
+
+def _handle_record(record: SqsRecordModel) -> Optional[RecordResult]:
+    append_record_keys(message_id=record.messageId)
+    payloads.log('processing product SQS body', record_body=record.body)
+    status: Literal['SUCCESS', 'FAILED'] = 'SUCCESS'
+    reason = ''
+    cfn_request: CloudFormationCustomResourceBaseModel
+    product_name = UNKNOWN_PRODUCT
+    parse_start = time.perf_counter()
     try:
-        parsed_envelope = SqsModel.model_validate(event)
-        # Batch size for the SQS integration is configured to size of 1 (CDK)
-        for record in parsed_envelope.Records:
-            record_body = json.loads(record.body)  # type: ignore
-            logger.info('processing product SQS body', record_body=record_body)
-            CFN_RESOURCE(record_body, context)
-    except Exception as ex:
-        logger.exception('failed to process product SQS event')
-        CFN_RESOURCE.init_failure(ex)
-
-
-@CFN_RESOURCE.create
-def create_event(event: Dict[str, Any], context: LambdaContext) -> str:
+        # single pass: the raw body is validated against the model its RequestType selects, without an intermediate dict
+        product_event = PRODUCT_EVENT_ADAPTER.validate_json(record.body)  # type: ignore[arg-type]
+        cfn_request, product_name = product_event, product_event.resource_properties.product_name
+    except ValidationError as exc:
+        # the response url and request identifiers are required to answer CloudFormation,
+        # a request without them can't be answered and raises
+        cfn_request = CloudFormationCustomResourceBaseModel.model_validate_json(record.body)  # type: ignore[arg-type]
+        logger.exception('failed to parse product request', request_type=cfn_request.request_type)
+        add_metric(name='InvalidProductRequests')
+        status, reason = 'FAILED', str(exc)
+    latencies.record('Parse', time.perf_counter() - parse_start, product_name)
+    if RESPONSE_SENDER.is_delivered(cfn_request.request_id):
+        logger.info('request was already answered, skipping redelivered record', request_id=cfn_request.request_id)
+        return None
+    physical_resource_id: Optional[str] = getattr(cfn_request, 'physical_resource_id', None)
+    if status == 'SUCCESS':
+        # the time SQS received the request orders the writes of a stack, a redelivered request keeps its original time
+        event_time = int(record.attributes.SentTimestamp.timestamp() * 1000)
+        try:
+            physical_resource_id = EVENT_HANDLERS[cfn_request.request_type](cfn_request, event_time) or physical_resource_id
+        except Exception as exc:
+            status, reason = 'FAILED', str(exc)
+
+    cfn_response = CfnResponseModel(
+        Status=status,
+        Reason=reason,
+        # a failed create has no physical id yet, CloudFormation still requires one
+        PhysicalResourceId=physical_resource_id or cfn_request.request_id,
+        StackId=cfn_request.stack_id,
+        RequestId=cfn_request.request_id,
+        LogicalResourceId=cfn_request.logical_resource_id,
+    )
+    return str(cfn_request.response_url), cfn_response, product_name
+
+
+def create_event(parsed_event: ProductCreateEventModel, event_time: Optional[int] = None) -> str:
     """
-    Parses a product create request and calls the handler.
+    Handles a parsed product create request.
     Return an id that will be used for the resource PhysicalResourceId
     """
-    logger.info('custom resource create flow', event=event)
+    logger.info('custom resource create flow')
     env_vars = get_environment_variables(model=VisibilityEnvVars)
 
-    # parse product input as a create custom resource  request
     try:
-        parsed_event = ProductCreateEventModel.model_validate(event)
-        logger.append_keys(stack_id=parsed_event.stack_id, product=parsed_event.resource_properties)
-        logger.info('parsed create product details')
-        resource_id = provision_product(product_details=parsed_event, table_name=env_vars.TABLE_NAME, portfolio_id=env_vars.PORTFOLIO_ID)
-        metrics.add_metric(name='CreatedProducts', unit=MetricUnit.Count, value=1)
+        append_record_keys(stack_id=parsed_event.stack_id, product=parsed_event.resource_properties)
+        resource_id = provision_product(
+            product_details=parsed_event,
+            table_name=env_vars.TABLE_NAME,
+            portfolio_id=env_vars.PORTFOLIO_ID,
+            portfolio_shards=env_vars.PORTFOLIO_SHARDS,
+            dal_backend=env_vars.DAL_BACKEND,
+            write_buffer=_get_write_buffer(env_vars.RECORD_WORKERS),
+            event_time=event_time,
+        )
+        add_metric(name='CreatedProducts')
         return resource_id
     except Exception:
         logger.exception('failed to process created product')
-        metrics.add_metric(name='FailedCreatedProducts', unit=MetricUnit.Count, value=1)
-        raise  # CFN_RESOURCE will fail the request
+        add_metric(name='FailedCreatedProducts')
+        raise  # the request is answered with a FAILED response
 
 
-@CFN_RESOURCE.update
-def update_event(event: Dict[str, Any], context: LambdaContext) -> None:
+def update_event(parsed_event: ProductUpdateEventModel, event_time: Optional[int] = None) -> None:
     """
-    Parses a product update request and calls the handler.
+    Handles a parsed product update request.
     Return an id for the new PhysicalResourceId. CloudFormation will send
     a delete event with the old PhysicalResourceId when stack update completes.
     If the old PhysicalResourceId is returned CloudFormation won't call a delete request after the update.
     """
-    logger.info('custom resource update flow', event=event)
+    logger.info('custom resource update flow')
     env_vars = get_environment_variables(model=VisibilityEnvVars)
 
     try:
-        # parse product input as a delete custom resource  request
-        parsed_event = ProductUpdateEventModel.model_validate(event)
-        logger.append_keys(stack_id=parsed_event.stack_id, product=parsed_event.resource_properties, old_product=parsed_event.old_resource_properties)
-        metrics.add_metric(name='UpdatedProducts', unit=MetricUnit.Count, value=1)
-        logger.info('parsed update product details')
-        update_product(product_details=parsed_event, table_name=env_vars.TABLE_NAME, portfolio_id=env_vars.PORTFOLIO_ID)
+        append_record_keys(stack_id=parsed_event.stack_id, product=parsed_event.resource_properties, old_product=parsed_event.old_resource_properties)
+        add_metric(name='UpdatedProducts')
+        is_written = update_product(
+            product_details=parsed_event,
+            table_name=env_vars.TABLE_NAME,
+            portfolio_id=env_vars.PORTFOLIO_ID,
+            portfolio_shards=env_vars.PORTFOLIO_SHARDS,
+            dal_backend=env_vars.DAL_BACKEND,
+            write_buffer=_get_write_buffer(env_vars.RECORD_WORKERS),
+            event_time=event_time,
+        )
+        if not is_written:
+            add_metric(name='UnchangedUpdatedProducts')
     except Exception:
         logger.exception('failed to process updated product')
-        metrics.add_metric(name='FailedUpdatedProducts', unit=MetricUnit.Count, value=1)
-        raise  # CFN_RESOURCE will fail the request
+        add_metric(name='FailedUpdatedProducts')
+        raise  # the request is answered with a FAILED response
 
 
-@CFN_RESOURCE.delete
-def delete_event(event: Dict[str, Any], context: LambdaContext) -> None:
+def delete_event(parsed_event: ProductDeleteEventModel, event_time: Optional[int] = None) -> None:
     """
-    Parses a product delete request and calls the handler.
+    Handles a parsed product delete request.
     Delete never returns anything. Should not fail if the underlying resources are already deleted. Desired state.
     """
-    logger.info('custom resource delete flow', event=event)
-    metrics.add_metric(name='DeletedProducts', unit=MetricUnit.Count, value=1)
+    logger.info('custom resource delete flow')
+    add_metric(name='DeletedProducts')
     env_vars = get_environment_variables(model=VisibilityEnvVars)
 
     try:
-        # parse product input as a delete custom resource  request
-        parsed_event = ProductDeleteEventModel.model_validate(event)
-        logger.append_keys(stack_id=parsed_event.stack_id, product=parsed_event.resource_properties)
-        metrics.add_metric(name='DeleteProduct', unit=MetricUnit.Count, value=1)
-        logger.info('parsed delete product details')
-        delete_product(product_details=parsed_event, table_name=env_vars.TABLE_NAME, portfolio_id=env_vars.PORTFOLIO_ID)
+        append_record_keys(stack_id=parsed_event.stack_id, product=parsed_event.resource_properties)
+        delete_product(
+            product_details=parsed_event,
+            table_name=env_vars.TABLE_NAME,
+            portfolio_id=env_vars.PORTFOLIO_ID,
+            portfolio_shards=env_vars.PORTFOLIO_SHARDS,
+            dal_backend=env_vars.DAL_BACKEND,
+            write_buffer=_get_write_buffer(env_vars.RECORD_WORKERS),
+            event_time=event_time,
+        )
     except Exception:
         logger.exception('failed to process deleted product')
-        metrics.add_metric(name='FailedDeletedProducts', unit=MetricUnit.Count, value=1)
-        raise  # CFN_RESOURCE will fail the request
+        add_metric(name='FailedDeletedProducts')
+        raise  # the request is answered with a FAILED response
+
+
+# custom resource request type to its product flow
+EVENT_HANDLERS: Dict[str, Callable[[Any, Optional[int]], Optional[str]]] = {
+    'Create': create_event,
+    'Update': update_event,
+    'Delete': delete_event,
+}
+
+# objects created during init live as long as the execution environment, moving them to the permanent generation
+# keeps the garbage collector from scanning them again on every invocation
+gc.freeze()
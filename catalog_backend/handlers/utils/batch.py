@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+
+from aws_lambda_powertools.utilities.batch import BatchProcessor, EventType
+from aws_lambda_powertools.utilities.batch.types import BatchTypeModels
+
+
+class OrderedConcurrentBatchProcessor(BatchProcessor):
+    """
+    Processes the records of a batch with a pool of worker threads.
+    Records with the same group key are processed one after another in their batch order, other records run in parallel.
+    A record without a group key is independent of all other records. A single worker processes the batch sequentially.
+    """
+
+    def __init__(
+        self,
+        event_type: EventType,
+        group_key: Callable[[dict], Optional[Hashable]],
+        max_workers: int = 1,
+        model: Optional['BatchTypeModels'] = None,
+    ) -> None:
+        super().__init__(event_type=event_type, model=model)
+        self.group_key = group_key
+        self.max_workers = max_workers
+        # kept for the lifetime of the execution environment, threads are reused across invocations
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='record') if max_workers > 1 else None
+
+    def process(self) -> list[tuple]:
+        if self._executor is None or len(self.records) < 2:
+            return super().process()
+        groups: dict[Hashable, list[int]] = {}
+        for index, record in enumerate(self.records):
+            key = self.group_key(record)
+            groups.setdefault(('record', index) if key is None else key, []).append(index)
+
+        results: list[Any] = [None] * len(self.records)
+
+        def process_group(indexes: list[int]) -> None:
+            for index in indexes:
+                # failures are caught and reported per record by _process_record
+                results[index] = self._process_record(self.records[index])
+
+        list(self._executor.map(process_group, groups.values()))
+        return results
@@ -0,0 +1,150 @@
+import random
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPSConnection
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import SplitResult, urlsplit
+
+from catalog_backend.handlers.utils.observability import logger
+from catalog_backend.models.output import CfnResponseModel
+
+if TYPE_CHECKING:
+    from cachetools import TTLCache
+
+SEND_MAX_WORKERS = 10
+SEND_MAX_ATTEMPTS = 3
+SEND_TIMEOUT = 5.0  # seconds
+SEND_BASE_DELAY = 0.1  # seconds
+SEND_IDLE_TIMEOUT = 4.0  # seconds, idle connections older than this are assumed closed by the endpoint
+DELIVERED_CACHE_SIZE = 1000  # request ids
+DELIVERED_CACHE_TTL = 3600  # seconds, CloudFormation waits up to an hour for a custom resource response
+# CloudFormation rejects response bodies over 4096 bytes, a longer reason is cut to its end like crhelper did
+REASON_MAX_LENGTH = 256
+REASON_TAIL_LENGTH = 240
+TRUNCATED_REASON_PREFIX = 'ERROR: (truncated) '
+
+
+class CfnResponseSender:
+    """
+    Sends custom resource responses to their presigned S3 ResponseURL.
+    Keep-alive connections are pooled per endpoint and reused across records and invocations,
+    so a batch pays for a TLS handshake per concurrent connection and not per response.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = SEND_MAX_WORKERS,
+        max_attempts: int = SEND_MAX_ATTEMPTS,
+        timeout: float = SEND_TIMEOUT,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self._ssl_context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+        self._idle_connections: dict[tuple[str, str], list[tuple[HTTPConnection, float]]] = {}
+        self._lock = threading.Lock()
+        # request ids of recently delivered responses, SQS redeliveries of an answered request are not answered again.
+        # Built on first use, the sender is created while the handler initializes and cachetools stays out of the cold start
+        self._delivered: Optional['TTLCache'] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='cfn-response')
+
+    def send(self, responses: list[tuple[str, CfnResponseModel]]) -> list[bool]:
+        """
+        Sends all (response_url, response) pairs concurrently.
+        Returns whether each response was delivered, in the order of the input.
+        """
+        return [is_delivered for is_delivered, _ in self.send_timed(responses)]
+
+    def send_timed(self, responses: list[tuple[str, CfnResponseModel]]) -> list[tuple[bool, float]]:
+        """Like send, also returns the seconds each response took, retries included"""
+        if len(responses) == 1:
+            return [self._timed_send(responses[0])]
+        return list(self._executor.map(self._timed_send, responses))
+
+    def _timed_send(self, response: tuple[str, CfnResponseModel]) -> tuple[bool, float]:
+        start = time.perf_counter()
+        is_delivered = self._send_with_retries(*response)
+        return is_delivered, time.perf_counter() - start
+
+    def is_delivered(self, request_id: str) -> bool:
+        with self._lock:
+            return request_id in self._delivered_requests()
+
+    def _delivered_requests(self) -> 'TTLCache':
+        # must be called with the lock held
+        if self._delivered is None:
+            from cachetools import TTLCache
+
+            self._delivered = TTLCache(maxsize=DELIVERED_CACHE_SIZE, ttl=DELIVERED_CACHE_TTL)
+        return self._delivered
+
+    def _send_with_retries(self, response_url: str, response: CfnResponseModel) -> bool:
+        url = urlsplit(response_url)
+        body = self._body(response)
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                status = self._put(url=url, body=body)
+            except Exception:
+                logger.exception('failed to send CloudFormation response', request_id=response.request_id, attempt=attempt)
+            else:
+                if 200 <= status < 300:
+                    logger.info('sent CloudFormation response', request_id=response.request_id, status=response.status)
+                    with self._lock:
+                        self._delivered_requests()[response.request_id] = True
+                    return True
+                logger.warning('CloudFormation response was rejected', request_id=response.request_id, http_status=status, attempt=attempt)
+                if status < 500 and status != 429:
+                    return False  # the presigned url is invalid or expired, retrying won't help
+            if attempt < self.max_attempts:
+                time.sleep(random.uniform(0, SEND_BASE_DELAY * 2**attempt))
+        logger.error('giving up on sending CloudFormation response', request_id=response.request_id)
+        return False
+
+    @staticmethod
+    def _body(response: CfnResponseModel) -> bytes:
+        if len(response.reason) > REASON_MAX_LENGTH:
+            # the full reason is only logged, a validation error can run to several KB
+            logger.warning('truncated CloudFormation response reason', request_id=response.request_id, reason=response.reason)
+            response = response.model_copy(update={'reason': f'{TRUNCATED_REASON_PREFIX}{response.reason[-REASON_TAIL_LENGTH:]}'})
+        return response.model_dump_json(by_alias=True).encode()
+
+    def _put(self, url: SplitResult, body: bytes) -> int:
+        endpoint = (url.scheme, url.netloc)
+        connection = self._acquire(endpoint)
+        try:
+            path = f'{url.path}?{url.query}' if url.query else url.path
+            # S3 presigned urls are signed without a content type
+            connection.request('PUT', path, body=body, headers={'content-type': '', 'content-length': str(len(body))})
+            http_response = connection.getresponse()
+            http_response.read()  # the response must be drained before the connection can be reused
+        except Exception:
+            connection.close()
+            raise
+        if http_response.will_close:
+            connection.close()
+        else:
+            self._release(endpoint, connection)
+        return http_response.status
+
+    def _acquire(self, endpoint: tuple[str, str]) -> HTTPConnection:
+        with self._lock:
+            idle = self._idle_connections.get(endpoint, [])
+            while idle:
+                connection, released_at = idle.pop()
+                if time.monotonic() - released_at < SEND_IDLE_TIMEOUT:
+                    return connection
+                connection.close()
+        scheme, netloc = endpoint
+        if scheme == 'https':
+            return HTTPSConnection(netloc, timeout=self.timeout, context=self._ssl_context)
+        return HTTPConnection(netloc, timeout=self.timeout)
+
+    def _release(self, endpoint: tuple[str, str], connection: HTTPConnection) -> None:
+        with self._lock:
+            idle = self._idle_connections.setdefault(endpoint, [])
+            if len(idle) < self.max_workers:
+                idle.append((connection, time.monotonic()))
+                return
+        connection.close()
@@ -1,5 +1,13 @@
+import json
+import logging
+import random
+import re
+import threading
+from collections import defaultdict
+from typing import Any
+
 from aws_lambda_powertools.logging import Logger
-from aws_lambda_powertools.metrics import Metrics
+from aws_lambda_powertools.metrics import EphemeralMetrics, Metrics, MetricUnit
 from aws_lambda_powertools.tracing import Tracer
 
 # JSON output format, service name can be set by environment variable "POWERTOOLS_SERVICE_NAME"
@@ -10,3 +18,117 @@ tracer: Tracer = Tracer()
 
 # namespace and service name are set by environment variable "POWERTOOLS_METRICS_NAMESPACE" and "POWERTOOLS_SERVICE_NAME" accordingly
 metrics = Metrics(service='Portfolio', namespace='PlatformEngineering')
+
+# records can be processed by concurrent workers, Metrics isn't thread safe and logger.append_keys is shared by all threads
+_metrics_lock = threading.Lock()
+_record_keys = threading.local()
+
+
+class _RecordKeysFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.__dict__.update(getattr(_record_keys, 'keys', {}))
+        return True
+
+
+logger.addFilter(_RecordKeysFilter())
+
+
+def append_record_keys(**keys: Any) -> None:
+    """Adds keys to the log lines of the current thread until clear_record_keys is called"""
+    _record_keys.keys = {**getattr(_record_keys, 'keys', {}), **keys}
+
+
+def clear_record_keys() -> None:
+    _record_keys.keys = {}
+
+
+def add_metric(name: str, unit: MetricUnit = MetricUnit.Count, value: float = 1) -> None:
+    with _metrics_lock:
+        metrics.add_metric(name=name, unit=unit, value=value)
+
+
+# the query string of a presigned url is a credential, the url without it still tells which request it answers
+PRESIGNED_QUERY = re.compile(r'(https://[^?"\\\s]+)\?[^"\\\s]*')
+DEFAULT_PAYLOAD_MAX_CHARS = 2048
+
+
+class TruncatedPayload:
+    """
+    A payload that is serialized only when its log line is emitted: the logger turns extra values it can't encode into str.
+    Presigned url signatures are redacted and the serialized payload is cut to max_chars.
+    """
+
+    def __init__(self, payload: Any, max_chars: int = DEFAULT_PAYLOAD_MAX_CHARS) -> None:
+        self.payload = payload
+        self.max_chars = max_chars
+
+    def __str__(self) -> str:
+        text = self.payload if isinstance(self.payload, str) else json.dumps(self.payload, default=str, separators=(',', ':'))
+        # cut before redacting, a signature cut in half is still matched from its url up to the cut
+        suffix = f'...<{len(text) - self.max_chars} more chars>' if len(text) > self.max_chars else ''
+        return PRESIGNED_QUERY.sub(r'\1?<redacted>', text[: self.max_chars]) + suffix
+
+
+class PayloadLogger:
+    """
+    Logs raw request payloads only when they are wanted: always at DEBUG and at INFO for a sampled share of the invocations.
+    Other invocations neither serialize nor ship them, a payload is several KB per record.
+    """
+
+    def __init__(self, payload_logger: Logger) -> None:
+        self.logger = payload_logger
+        self.is_sampled = False
+        self.max_chars = DEFAULT_PAYLOAD_MAX_CHARS
+
+    def start_invocation(self, sample_rate: float, max_chars: int = DEFAULT_PAYLOAD_MAX_CHARS) -> None:
+        # all records of an invocation are logged alike, a sampled invocation shows the whole batch
+        self.is_sampled = random.random() < sample_rate  # noqa: S311 not a security decision
+        self.max_chars = max_chars
+
+    def log(self, message: str, **payloads: Any) -> None:
+        if self.is_sampled:
+            log = self.logger.info
+        elif self.logger.log_level <= logging.DEBUG:
+            log = self.logger.debug
+        else:
+            return
+        truncated: dict[str, Any] = {name: TruncatedPayload(payload, self.max_chars) for name, payload in payloads.items()}
+        log(message, **truncated)
+
+
+payloads = PayloadLogger(logger)
+
+UNKNOWN_PRODUCT = 'unknown'  # product name dimension of requests that couldn't be parsed
+
+
+class LatencyRecorder:
+    """
+    Collects the latencies of the pipeline stages of an invocation in memory and publishes them once per invocation.
+    Every product name is published as its own EMF document with a product_name dimension and a <Stage>Latency metric per stage.
+    All values of a stage are published, not an average, so CloudWatch can compute p50/p99 per stage and product
+    for every request and not only the ones X-Ray samples.
+    """
+
+    def __init__(self) -> None:
+        self._latencies: defaultdict[str, defaultdict[str, list[float]]] = defaultdict(lambda: defaultdict(list))
+        self._lock = threading.Lock()  # stages are recorded by concurrent workers
+
+    def record(self, stage: str, seconds: float, product_name: str = UNKNOWN_PRODUCT) -> None:
+        with self._lock:
+            self._latencies[product_name][stage].append(seconds * 1000)
+
+    def flush(self) -> None:
+        with self._lock:
+            latencies, self._latencies = self._latencies, defaultdict(lambda: defaultdict(list))
+        for product_name, stages in latencies.items():
+            # same namespace and service as the counters, a metrics object has a single dimension set so each product gets its own
+            product_metrics = EphemeralMetrics(service='Portfolio', namespace='PlatformEngineering')
+            product_metrics.add_dimension(name='product_name', value=product_name)
+            for stage, values in stages.items():
+                for value in values:
+                    # EMF holds up to 100 values per metric, a document that reaches them is published and a new one started
+                    product_metrics.add_metric(name=f'{stage}Latency', unit=MetricUnit.Milliseconds, value=value)
+            product_metrics.flush_metrics()
+
+
+latencies = LatencyRecorder()
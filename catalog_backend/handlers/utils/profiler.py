@@ -0,0 +1,119 @@
+import contextlib
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+from typing import Iterator, Optional
+
+from catalog_backend.handlers.utils.observability import logger
+
+PROFILE_DIR = Path('/tmp')
+PROFILE_FILES_KEPT = 10  # /tmp is shared by all invocations of an execution environment, older profiles are removed
+MAX_STACK_DEPTH = 64  # deeper frames are cut off, bounds the time a sample holds the GIL
+
+
+def _frame_name(frame: FrameType) -> str:
+    # the module tells where the time goes: pydantic, botocore, the handler or the product flows
+    return f'{frame.f_globals.get("__name__", "?")}.{frame.f_code.co_qualname}'
+
+
+def _collapse(frame: Optional[FrameType]) -> str:
+    names: list[str] = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))  # collapsed stacks start at the root frame
+
+
+class SamplingProfiler:
+    """
+    A statistical profiler: a daemon thread samples the stacks of every other thread of the process at a fixed interval.
+    Unlike a deterministic profiler the profiled code runs at full speed, the overhead is bounded by the sampling interval.
+    Samples are counted by their collapsed stack, the input format of flame graph tools.
+    """
+
+    def __init__(self, interval_seconds: float) -> None:
+        self.interval_seconds = interval_seconds
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='profiler', daemon=True)
+
+    def _sample(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval_seconds):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.stacks[_collapse(frame)] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter[str]:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+
+def hot_functions(stacks: Counter[str], top_n: int) -> list[dict]:
+    """Returns the top_n functions by the samples they were running in (self) and the samples they were on the stack (total)"""
+    total_samples = sum(stacks.values()) or 1
+    self_samples: Counter[str] = Counter()
+    inclusive_samples: Counter[str] = Counter()
+    for stack, count in stacks.items():
+        names = stack.split(';')
+        self_samples[names[-1]] += count
+        for name in set(names):  # a recursive function is counted once per sample
+            inclusive_samples[name] += count
+    return [
+        {
+            'function': name,
+            'self_percent': round(100 * count / total_samples, 1),
+            'total_percent': round(100 * inclusive_samples[name] / total_samples, 1),
+        }
+        for name, count in self_samples.most_common(top_n)
+    ]
+
+
+def write_collapsed_stacks(stacks: Counter[str], path: Path) -> None:
+    path.write_text(''.join(f'{stack} {count}\n' for stack, count in stacks.most_common()))
+    for old_path in sorted(path.parent.glob('profile-*.folded'), key=lambda profile: profile.stat().st_mtime)[:-PROFILE_FILES_KEPT]:
+        old_path.unlink(missing_ok=True)
+
+
+class InvocationProfiler:
+    """
+    Profiles every Nth invocation of a handler, the other invocations only count.
+    A profiled invocation writes its collapsed stacks to /tmp/profile-<request id>.folded and logs its hot functions.
+    """
+
+    def __init__(self) -> None:
+        self.invocations = 0
+
+    @contextlib.contextmanager
+    def sampled(self, every_n: int, interval_ms: int, top_n: int, request_id: str) -> Iterator[None]:
+        # profiling is off when every_n is 0, the common case costs a comparison
+        if not every_n:
+            yield
+            return
+        self.invocations += 1
+        if self.invocations % every_n:
+            yield
+            return
+        profiler = SamplingProfiler(interval_seconds=interval_ms / 1000)
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            yield
+        finally:
+            stacks = profiler.stop()
+            path = PROFILE_DIR / f'profile-{request_id}.folded'
+            write_collapsed_stacks(stacks, path)
+            logger.info(
+                'profiled invocation',
+                profile_path=str(path),
+                samples=sum(stacks.values()),
+                duration_ms=round((time.perf_counter() - start) * 1000, 1),
+                hot_functions=hot_functions(stacks, top_n),
+            )
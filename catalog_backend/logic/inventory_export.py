@@ -0,0 +1,175 @@
+"""
+Exports the product deployment inventory of a deployments table to compressed JSONL or Parquet files.
+
+The table is read with a segmented parallel Scan, every segment is written by its own worker to its own files,
+one chunk of items at a time, so memory is bounded by the chunk size and not by the table size.
+The progress of every segment is checkpointed after each written chunk, running the same export again resumes where it stopped.
+
+Usage: python -m catalog_backend.logic.inventory_export --table-name <table> --output-dir <dir> [--format jsonl|parquet]
+"""
+
+import argparse
+import gzip
+import json
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterator, Literal, Optional
+
+from catalog_backend.dal import get_dal_handler
+from catalog_backend.dal.models.db import ProductEntry
+from catalog_backend.handlers.utils.observability import logger
+
+ExportFormat = Literal['jsonl', 'parquet']
+PoolType = Literal['thread', 'process']
+DEFAULT_SEGMENTS = 8
+DEFAULT_PAGE_SIZE = 1000  # items per Scan request
+DEFAULT_CHUNK_ITEMS = 10_000  # items a segment holds in memory before they are written and checkpointed
+CHECKPOINT_DIR = '.checkpoint'
+
+
+class CheckpointMismatchError(Exception):
+    pass
+
+
+def export_inventory(
+    table_name: str,
+    output_dir: Path,
+    export_format: ExportFormat = 'jsonl',
+    total_segments: int = DEFAULT_SEGMENTS,
+    pool: PoolType = 'thread',
+    max_workers: Optional[int] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    chunk_items: int = DEFAULT_CHUNK_ITEMS,
+) -> int:
+    """
+    Exports every deployment of the table to output_dir and returns the number of exported deployments.
+    Scans are network bound so threads are enough for most tables, processes also spread the serialization over CPUs.
+    """
+    (output_dir / CHECKPOINT_DIR).mkdir(parents=True, exist_ok=True)
+    logger.info('exporting product deployments inventory', table_name=table_name, export_format=export_format, total_segments=total_segments)
+    executor: Executor
+    if pool == 'process':
+        executor = ProcessPoolExecutor(max_workers=max_workers or total_segments)
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers or total_segments, thread_name_prefix='export')
+    with executor:
+        futures = [
+            executor.submit(_export_segment, table_name, output_dir, export_format, segment, total_segments, page_size, chunk_items)
+            for segment in range(total_segments)
+        ]
+        exported = sum(future.result() for future in futures)
+    logger.info('finished exporting product deployments inventory', table_name=table_name, exported=exported)
+    return exported
+
+
+def _export_segment(
+    table_name: str,
+    output_dir: Path,
+    export_format: ExportFormat,
+    segment: int,
+    total_segments: int,
+    page_size: int,
+    chunk_items: int,
+) -> int:
+    checkpoint_path = output_dir / CHECKPOINT_DIR / f'segment-{segment:04d}.json'
+    header = {'table_name': table_name, 'export_format': export_format, 'total_segments': total_segments}
+    progress = _load_progress(checkpoint_path, header)
+    if progress['done']:
+        return progress['items']
+
+    pages = get_dal_handler(table_name).scan_deployments(segment, total_segments, progress['exclusive_start_key'], page_size)
+    for entries, last_evaluated_key in _chunks(pages, chunk_items):
+        if not entries:
+            pass  # the last page of a segment can be empty
+        elif export_format == 'parquet':
+            _write_parquet(output_dir / f'inventory-{segment:04d}-{progress["chunks"]:06d}.parquet', entries)
+        else:
+            progress['offset'] = _append_jsonl(output_dir / f'inventory-{segment:04d}.jsonl.gz', progress['offset'], entries)
+        progress.update(
+            chunks=progress['chunks'] + 1,
+            items=progress['items'] + len(entries),
+            exclusive_start_key=last_evaluated_key,
+            done=last_evaluated_key is None,
+        )
+        _save_progress(checkpoint_path, header, progress)
+    logger.info('exported segment', segment=segment, items=progress['items'])
+    return progress['items']
+
+
+def _chunks(pages: Iterator[tuple[list[ProductEntry], Optional[dict]]], chunk_items: int) -> Iterator[tuple[list[ProductEntry], Optional[dict]]]:
+    # chunks end on page boundaries, the only places a scan can be resumed from
+    chunk: list[ProductEntry] = []
+    for entries, last_evaluated_key in pages:
+        chunk.extend(entries)
+        if len(chunk) >= chunk_items or last_evaluated_key is None:
+            yield chunk, last_evaluated_key
+            chunk = []
+
+
+def _append_jsonl(path: Path, offset: int, entries: list[ProductEntry]) -> int:
+    # every chunk is a complete gzip member, a file of concatenated members is a valid gzip file.
+    # a chunk that was written after the last checkpoint is cut off before writing it again
+    with open(path, 'r+b' if path.exists() else 'wb') as output:
+        output.truncate(offset)
+        output.seek(offset)
+        output.write(gzip.compress(''.join(f'{entry.model_dump_json()}\n' for entry in entries).encode()))
+        output.flush()
+        os.fsync(output.fileno())
+        return output.tell()
+
+
+def _write_parquet(path: Path, entries: list[ProductEntry]) -> None:
+    import pyarrow as pa  # only needed for parquet exports
+    import pyarrow.parquet as pq
+
+    schema = pa.schema(
+        [
+            ('portfolio_id', pa.string()),
+            ('product_stack_id', pa.string()),
+            ('name', pa.string()),
+            ('version', pa.string()),
+            ('account_id', pa.string()),
+            ('consumer_name', pa.string()),
+            ('region', pa.string()),
+            ('created_at', pa.int64()),
+            ('updated_at', pa.int64()),
+            ('request_id', pa.string()),
+            ('event_time', pa.int64()),
+        ]
+    )
+    # a file of an interrupted chunk is overwritten, it gets the same name when the chunk is written again
+    pq.write_table(pa.Table.from_pylist([entry.model_dump() for entry in entries], schema=schema), path, compression='zstd')
+
+
+def _load_progress(path: Path, header: dict[str, Any]) -> dict[str, Any]:
+    if not path.exists():
+        return {'exclusive_start_key': None, 'done': False, 'chunks': 0, 'items': 0, 'offset': 0}
+    checkpoint = json.loads(path.read_text())
+    if checkpoint['header'] != header:
+        raise CheckpointMismatchError(f'{path} belongs to another export {checkpoint["header"]}, use another output directory')
+    return checkpoint['progress']
+
+
+def _save_progress(path: Path, header: dict[str, Any], progress: dict[str, Any]) -> None:
+    # replaced atomically, an interrupted save leaves the previous checkpoint
+    temp_path = path.with_suffix('.tmp')
+    temp_path.write_text(json.dumps({'header': header, 'progress': progress}))
+    os.replace(temp_path, path)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Export the product deployments inventory')
+    parser.add_argument('--table-name', required=True)
+    parser.add_argument('--output-dir', required=True, type=Path)
+    parser.add_argument('--format', dest='export_format', choices=['jsonl', 'parquet'], default='jsonl')
+    parser.add_argument('--segments', dest='total_segments', type=int, default=DEFAULT_SEGMENTS)
+    parser.add_argument('--pool', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--workers', dest='max_workers', type=int, default=None)
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument('--chunk-items', type=int, default=DEFAULT_CHUNK_ITEMS)
+    export_inventory(**vars(parser.parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
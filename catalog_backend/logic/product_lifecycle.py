@@ -1,7 +1,159 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Literal, Optional
+
 from catalog_backend.dal import get_dal_handler
-from catalog_backend.dal.db_handler import DalHandler
-from catalog_backend.handlers.utils.observability import tracer
-from catalog_backend.models.input import ProductCreateEventModel, ProductDeleteEventModel, ProductUpdateEventModel
+from catalog_backend.dal.db_handler import DalBackend, DalHandler
+from catalog_backend.handlers.utils.observability import latencies, logger, tracer
+from catalog_backend.models.input import ProductCreateEventModel, ProductDeleteEventModel, ProductModel, ProductUpdateEventModel
+
+
+class _PendingWrite:
+    """The coalesced write of one product deployment, the last of its requests writes it"""
+
+    def __init__(self, dal_handler: DalHandler, portfolio_id: str, product_stack_id: str, product_name: str) -> None:
+        self.dal_handler = dal_handler
+        self.portfolio_id = portfolio_id
+        self.product_stack_id = product_stack_id
+        self.product_name = product_name
+        self.kind: Literal['add', 'update', 'delete'] = 'update'  # a first update has no earlier request to collapse into
+        self.product: Optional[ProductModel] = None
+        self.changed_properties: set[str] = set()
+        self.request_ids: list[str] = []
+        self.event_time: Optional[int] = None
+
+    def write(self) -> None:
+        request_id = self.request_ids[-1]
+        if self.kind == 'delete':
+            self.dal_handler.delete_product_deployment(self.portfolio_id, self.product_stack_id, request_id, self.event_time)
+            return
+        assert self.product is not None  # set by every create and update
+        product = {
+            'portfolio_id': self.portfolio_id,
+            'product_stack_id': self.product_stack_id,
+            'product_name': self.product.product_name,
+            'product_version': self.product.product_version,
+            'account_id': self.product.account_id,
+            'consumer_name': self.product.consumer_name,
+            'region': self.product.region,
+            'request_id': request_id,
+        }
+        if self.kind == 'add':
+            self.dal_handler.add_product_deployment(**product, event_time=self.event_time)
+        else:
+            self.dal_handler.update_product_deployment(**product, changed_properties=sorted(self.changed_properties), event_time=self.event_time)
+
+
+class WriteBehindBuffer:
+    """
+    Collects the product writes of a batch and writes every product deployment once when the batch is flushed.
+    Requests of the same product are collapsed by their lifecycle: a create followed by updates is a single create
+    with the latest properties, consecutive updates merge their changed properties and a delete replaces everything before it.
+    Requests of the same product must be buffered in their order, the batch processor keeps the records of a stack in order.
+    """
+
+    def __init__(self, max_workers: int = 1) -> None:
+        self.max_workers = max_workers
+        self._pending: dict[tuple[str, str], _PendingWrite] = {}
+        self._lock = threading.Lock()  # records may be buffered by concurrent workers
+        # kept for the lifetime of the execution environment, threads are reused across invocations
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='write') if max_workers > 1 else None
+
+    def _buffer(
+        self, dal_handler: DalHandler, portfolio_id: str, product_stack_id: str, product: ProductModel, request_id: str, event_time: Optional[int]
+    ) -> _PendingWrite:
+        # must be called with the lock held
+        pending = self._pending.get((portfolio_id, product_stack_id))
+        if pending is None:
+            pending = _PendingWrite(dal_handler, portfolio_id, product_stack_id, product.product_name)
+            self._pending[(portfolio_id, product_stack_id)] = pending
+        pending.product_name = product.product_name
+        pending.request_ids.append(request_id)
+        pending.event_time = event_time  # the coalesced write is as old as its last request
+        return pending
+
+    def add(
+        self,
+        dal_handler: DalHandler,
+        portfolio_id: str,
+        product_stack_id: str,
+        product: ProductModel,
+        request_id: str,
+        event_time: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            pending = self._buffer(dal_handler, portfolio_id, product_stack_id, product, request_id, event_time)
+            pending.kind, pending.product = 'add', product
+
+    def update(
+        self,
+        dal_handler: DalHandler,
+        portfolio_id: str,
+        product_stack_id: str,
+        product: ProductModel,
+        changed_properties: list[str],
+        request_id: str,
+        event_time: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            pending = self._buffer(dal_handler, portfolio_id, product_stack_id, product, request_id, event_time)
+            if pending.kind == 'delete':
+                pending.kind = 'add'  # the product was deleted earlier in the batch, it is written whole again
+            pending.product = product
+            pending.changed_properties.update(changed_properties)
+
+    def delete(
+        self,
+        dal_handler: DalHandler,
+        portfolio_id: str,
+        product_stack_id: str,
+        product: ProductModel,
+        request_id: str,
+        event_time: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            pending = self._buffer(dal_handler, portfolio_id, product_stack_id, product, request_id, event_time)
+            pending.kind, pending.product = 'delete', None
+            pending.changed_properties.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+
+    def flush(self) -> dict[str, Exception]:
+        """
+        Writes every buffered product deployment, products are written concurrently.
+        Returns the requests whose write failed with its error, a request is written only once its coalesced write succeeded.
+        """
+        with self._lock:
+            pending_writes, self._pending = list(self._pending.values()), {}
+        if not pending_writes:
+            return {}
+        coalesced = sum(len(pending.request_ids) for pending in pending_writes) - len(pending_writes)
+        logger.info('flushing buffered product writes', writes=len(pending_writes), coalesced_requests=coalesced)
+
+        def write(pending: _PendingWrite) -> Optional[Exception]:
+            start = time.perf_counter()
+            try:
+                pending.write()
+                return None
+            except Exception as exc:
+                logger.exception('failed to write product deployment', product_stack_id=pending.product_stack_id, request_ids=pending.request_ids)
+                return exc
+            finally:
+                latencies.record('Dal', time.perf_counter() - start, pending.product_name)
+
+        if self._executor is None or len(pending_writes) == 1:
+            errors = [write(pending) for pending in pending_writes]
+        else:
+            errors = list(self._executor.map(write, pending_writes))
+        return {
+            request_id: error
+            for pending, error in zip(pending_writes, errors, strict=True)
+            if error is not None
+            for request_id in pending.request_ids
+        }
 
 
 # return the request_id of the product which will be used as the custom resource logical id
@@ -10,8 +162,17 @@ def provision_product(
     table_name: str,
     portfolio_id: str,
     product_details: ProductCreateEventModel,
+    portfolio_shards: int = 1,
+    dal_backend: DalBackend = 'dynamodb',
+    write_buffer: Optional[WriteBehindBuffer] = None,
+    event_time: Optional[int] = None,
 ) -> str:
-    dal_handler: DalHandler = get_dal_handler(table_name)
+    dal_handler: DalHandler = get_dal_handler(table_name, portfolio_shards, dal_backend)
+    if write_buffer is not None:
+        write_buffer.add(
+            dal_handler, portfolio_id, product_details.stack_id, product_details.resource_properties, product_details.request_id, event_time
+        )
+        return product_details.request_id
     dal_handler.add_product_deployment(
         portfolio_id=portfolio_id,
         product_stack_id=product_details.stack_id,
@@ -20,19 +181,61 @@ def provision_product(
         account_id=product_details.resource_properties.account_id,
         consumer_name=product_details.resource_properties.consumer_name,
         region=product_details.resource_properties.region,
+        request_id=product_details.request_id,
+        event_time=event_time,
     )
     return product_details.request_id
 
 
 @tracer.capture_method(capture_response=False)
-def delete_product(table_name: str, portfolio_id: str, product_details: ProductDeleteEventModel) -> None:
-    dal_handler: DalHandler = get_dal_handler(table_name)
-    dal_handler.delete_product_deployment(portfolio_id, product_details.stack_id)
+def delete_product(
+    table_name: str,
+    portfolio_id: str,
+    product_details: ProductDeleteEventModel,
+    portfolio_shards: int = 1,
+    dal_backend: DalBackend = 'dynamodb',
+    write_buffer: Optional[WriteBehindBuffer] = None,
+    event_time: Optional[int] = None,
+) -> None:
+    dal_handler: DalHandler = get_dal_handler(table_name, portfolio_shards, dal_backend)
+    if write_buffer is not None:
+        write_buffer.delete(
+            dal_handler, portfolio_id, product_details.stack_id, product_details.resource_properties, product_details.request_id, event_time
+        )
+        return
+    dal_handler.delete_product_deployment(portfolio_id, product_details.stack_id, product_details.request_id, event_time)
 
 
 @tracer.capture_method(capture_response=False)
-def update_product(table_name: str, portfolio_id: str, product_details: ProductUpdateEventModel) -> None:
-    dal_handler: DalHandler = get_dal_handler(table_name)
+def update_product(
+    table_name: str,
+    portfolio_id: str,
+    product_details: ProductUpdateEventModel,
+    portfolio_shards: int = 1,
+    dal_backend: DalBackend = 'dynamodb',
+    write_buffer: Optional[WriteBehindBuffer] = None,
+    event_time: Optional[int] = None,
+) -> bool:
+    """Returns False if the product properties didn't change, the entry is then left as is"""
+    old_properties = product_details.old_resource_properties.model_dump()
+    new_properties = product_details.resource_properties.model_dump()
+    # stack updates that only touch other resources resend the same properties
+    changed_properties = [name for name, value in new_properties.items() if old_properties[name] != value]
+    if not changed_properties:
+        logger.info('product properties did not change, skipping update')
+        return False
+    dal_handler: DalHandler = get_dal_handler(table_name, portfolio_shards, dal_backend)
+    if write_buffer is not None:
+        write_buffer.update(
+            dal_handler,
+            portfolio_id,
+            product_details.stack_id,
+            product_details.resource_properties,
+            changed_properties,
+            product_details.request_id,
+            event_time,
+        )
+        return True
     dal_handler.update_product_deployment(
         portfolio_id=portfolio_id,
         product_stack_id=product_details.stack_id,
@@ -41,4 +244,8 @@ def update_product(table_name: str, portfolio_id: str, product_details: ProductU
         account_id=product_details.resource_properties.account_id,
         consumer_name=product_details.resource_properties.consumer_name,
         region=product_details.resource_properties.region,
+        request_id=product_details.request_id,
+        changed_properties=changed_properties,
+        event_time=event_time,
     )
+    return True
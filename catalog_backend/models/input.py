@@ -1,11 +1,11 @@
-from typing import Literal
+from typing import Annotated, Literal, Union
 
 from aws_lambda_powertools.utilities.parser.models import (
     CloudFormationCustomResourceCreateModel,
     CloudFormationCustomResourceDeleteModel,
     CloudFormationCustomResourceUpdateModel,
 )
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 
 class ProductModel(BaseModel):
@@ -30,3 +30,12 @@ class ProductUpdateEventModel(CloudFormationCustomResourceUpdateModel):
     resource_properties: ProductModel = Field(..., alias='ResourceProperties')
     old_resource_properties: ProductModel = Field(..., alias='OldResourceProperties')
     resource_type: Literal['Custom::PlatformEngGovernanceEnabler'] = Field(..., alias='ResourceType')
+
+
+# a custom resource request of any type, RequestType selects the model so the body is validated against one model only
+ProductEventModel = Annotated[
+    Union[ProductCreateEventModel, ProductUpdateEventModel, ProductDeleteEventModel],
+    Field(discriminator='request_type'),
+]
+# built once, building the validator of a union is expensive
+PRODUCT_EVENT_ADAPTER: TypeAdapter[ProductEventModel] = TypeAdapter(ProductEventModel)
@@ -0,0 +1,14 @@
+from typing import Annotated, Any, Literal
+
+from pydantic import BaseModel, Field
+
+
+class CfnResponseModel(BaseModel):
+    status: Literal['SUCCESS', 'FAILED'] = Field(..., alias='Status')
+    reason: str = Field('', alias='Reason')
+    physical_resource_id: Annotated[str, Field(min_length=1, max_length=1024)] = Field(..., alias='PhysicalResourceId')
+    stack_id: str = Field(..., alias='StackId')
+    request_id: str = Field(..., alias='RequestId')
+    logical_resource_id: str = Field(..., alias='LogicalResourceId')
+    data: dict[str, Any] = Field(default_factory=dict, alias='Data')
+    no_echo: bool = Field(False, alias='NoEcho')
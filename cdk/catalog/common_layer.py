@@ -0,0 +1,170 @@
+"""
+Slim build of the common Lambda layer.
+
+The layer is pruned after its dependencies are installed and precompiled ahead of time:
+- packages the Lambda Python runtime already provides (boto3 and its dependencies) and packages the handler never imports
+  at runtime are removed by their dist-info RECORD, so every file they installed goes with them
+- test suites, type stubs and build files are removed from the remaining packages
+- every module is compiled to an unchecked hash based .pyc, /opt is read only in Lambda and a module without a .pyc
+  is compiled again on every cold start. Unchecked pycs are loaded without comparing them to their source.
+
+The module only uses the standard library: CDK runs it inside the bundling container, with the runtime's Python version.
+
+python -m cdk.catalog.common_layer --report builds the layer both ways and compares their size and handler init time.
+"""
+
+import argparse
+import compileall
+import csv
+import os
+import py_compile
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+# distributions in the Lambda Python runtime, the runtime's versions are used instead
+RUNTIME_PROVIDED_PACKAGES = ('boto3', 'botocore', 's3transfer', 'jmespath', 'python-dateutil', 'six', 'urllib3')
+# type stubs the code imports only when type checking, and validators of model fields the service doesn't declare
+UNUSED_PACKAGES = ('mypy-boto3-dynamodb', 'email-validator', 'dnspython', 'idna')
+PRUNED_DIRECTORIES = ('tests', 'test', '__pycache__')
+PRUNED_SUFFIXES = ('.pyi', '.pyx', '.pxd', '.c', '.h')
+PRUNED_FILES = ('py.typed', 'requirements.txt')  # the requirements file is copied into the layer by the bundling
+CONTAINER_PATH = '/layer-build'  # this module's folder inside the bundling container
+HANDLER_MODULE = 'catalog_backend.handlers.product_callback_handler'
+REPO_ROOT = Path(__file__).parent.parent.parent  # not parents[2], inside the bundling container the module is one folder deep
+INIT_RUNS = 7
+
+
+def _normalize(name: str) -> str:
+    # distribution names compare by their PEP 503 normal form, dist-info folders use underscores
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def remove_distributions(layer_dir: Path, names: tuple[str, ...]) -> list[str]:
+    """Removes every file the distributions installed, returns the removed distributions"""
+    wanted = {_normalize(name) for name in names}
+    removed = []
+    for dist_info in sorted(layer_dir.glob('*.dist-info')):
+        name = _normalize(dist_info.name.removesuffix('.dist-info').rsplit('-', 1)[0])
+        if name not in wanted:
+            continue
+        record = dist_info / 'RECORD'
+        if record.exists():
+            with record.open(newline='') as record_file:
+                for row in csv.reader(record_file):
+                    if row:
+                        (layer_dir / row[0]).unlink(missing_ok=True)
+        shutil.rmtree(dist_info, ignore_errors=True)
+        removed.append(name)
+    _remove_empty_directories(layer_dir)
+    return removed
+
+
+def _remove_empty_directories(layer_dir: Path) -> None:
+    for directory, _, _ in sorted(os.walk(layer_dir), key=lambda entry: len(entry[0]), reverse=True):
+        if directory != str(layer_dir) and not os.listdir(directory):
+            os.rmdir(directory)
+
+
+def strip_files(layer_dir: Path) -> None:
+    shutil.rmtree(layer_dir / 'bin', ignore_errors=True)  # console scripts pip installs next to the packages, a layer can't run them
+    for directory in [path for path in layer_dir.rglob('*') if path.is_dir() and path.name in PRUNED_DIRECTORIES]:
+        shutil.rmtree(directory, ignore_errors=True)
+    for path in layer_dir.rglob('*'):
+        if path.is_file() and (path.suffix in PRUNED_SUFFIXES or path.name in PRUNED_FILES):
+            path.unlink()
+
+
+def precompile(layer_dir: Path) -> None:
+    if not compileall.compile_dir(str(layer_dir), quiet=1, workers=0, optimize=0, invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH):
+        raise RuntimeError(f'failed to precompile {layer_dir}')
+
+
+def slim_layer(layer_dir: Path) -> None:
+    removed = remove_distributions(layer_dir, RUNTIME_PROVIDED_PACKAGES + UNUSED_PACKAGES)
+    strip_files(layer_dir)
+    precompile(layer_dir)
+    print(f'slimmed {layer_dir}, removed {", ".join(removed) or "no distributions"}')
+
+
+def bundling_command(output_dir: str) -> str:
+    # run by the bundling container after pip installed the requirements
+    return f'python {CONTAINER_PATH}/{Path(__file__).name} {output_dir}'
+
+
+def _size(layer_dir: Path) -> tuple[int, int]:
+    # bytes on disk after unzip, and bytes of the zipped layer that is downloaded on a cold start
+    unzipped = sum(path.stat().st_size for path in layer_dir.rglob('*') if path.is_file())
+    with tempfile.TemporaryFile() as archive:
+        with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as layer_zip:
+            for path in layer_dir.rglob('*'):
+                layer_zip.write(path, path.relative_to(layer_dir.parent))
+        return unzipped, archive.tell()
+
+
+def _init_ms(layer_dir: Path) -> float:
+    # a fresh interpreter per run like a new execution environment, bytecode isn't written back like on the read only /opt
+    env = {
+        **os.environ,
+        'PYTHONPATH': os.pathsep.join([str(layer_dir), str(REPO_ROOT)]),
+        'PYTHONDONTWRITEBYTECODE': '1',
+        'POWERTOOLS_SERVICE_NAME': 'PlatformPortfolio',
+        'POWERTOOLS_METRICS_NAMESPACE': 'PlatformEngineering',
+        'LOG_LEVEL': 'INFO',
+        'AWS_DEFAULT_REGION': 'us-east-1',
+    }
+    script = f'import time; start = time.perf_counter(); import {HANDLER_MODULE}; print((time.perf_counter() - start) * 1000)'
+
+    def run() -> float:
+        result = subprocess.run([sys.executable, '-c', script], env=env, cwd=layer_dir.parent, capture_output=True, text=True, check=True)
+        return float(result.stdout.strip().splitlines()[-1])
+
+    run()  # warm the file system cache
+    return statistics.median(run() for _ in range(INIT_RUNS))
+
+
+def report(requirements: Path) -> dict[str, dict[str, float]]:
+    """Installs the requirements for the local interpreter, then measures the layer as is and slimmed"""
+    results: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as temp_dir:
+        full_dir = Path(temp_dir) / 'full' / 'python'
+        command = [sys.executable, '-m', 'pip', 'install', '--quiet', '--disable-pip-version-check', '-r', str(requirements), '-t', str(full_dir)]
+        subprocess.run(command, check=True)
+        slim_dir = Path(temp_dir) / 'slim' / 'python'
+        shutil.copytree(full_dir, slim_dir)
+        slim_layer(slim_dir)
+        for mode, layer_dir in (('full', full_dir), ('slim', slim_dir)):
+            unzipped, zipped = _size(layer_dir)
+            results[mode] = {
+                'unzipped_mb': round(unzipped / 2**20, 2),
+                'zipped_mb': round(zipped / 2**20, 2),
+                'init_ms': round(_init_ms(layer_dir), 1),
+            }
+    print(f'{"":>12} {"full":>8} {"slim":>8}')
+    for metric in ('unzipped_mb', 'zipped_mb', 'init_ms'):
+        print(f'{metric:>12} {results["full"][metric]:>8} {results["slim"][metric]:>8}')
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('layer_dir', type=Path, nargs='?', help='installed layer python folder to slim in place')
+    parser.add_argument('--report', action='store_true', help='compare the full and slim layer of the requirements')
+    parser.add_argument('--requirements', type=Path, default=REPO_ROOT / '.build' / 'common_layer' / 'requirements.txt')
+    args = parser.parse_args(argv)
+    if args.report:
+        report(args.requirements)
+    elif args.layer_dir:
+        slim_layer(args.layer_dir)
+    else:
+        parser.error('either a layer folder or --report is required')
+
+
+if __name__ == '__main__':
+    main()
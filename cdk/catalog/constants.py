@@ -4,10 +4,26 @@ SERVICE_ROLE = 'ServiceRole'
 VISIBILITY_LAMBDA = 'VisibilityLambda'
 TABLE_NAME = 'governance'
 TABLE_NAME_OUTPUT = 'DbOutput'
+ACCOUNT_ID_INDEX = 'account_id-index'
+CONSUMER_NAME_INDEX = 'consumer_name-index'
+PRODUCT_INDEX = 'name-version-index'
+TABLE_TTL_ATTRIBUTE = 'expires_at'  # epoch seconds, tombstones of deleted deployments expire by it
 PORTFOLIO_ID_OUTPUT = 'PortfolioIdOutput'
 LAMBDA_LAYER_NAME = 'common'
 API_HANDLER_LAMBDA_MEMORY_SIZE = 192  # MB
+API_HANDLER_LAMBDA_ARCHITECTURE = 'x86_64'  # x86_64 or arm64 (Graviton)
+LAMBDA_MEMORY_TIERS = (128, 192, 256, 512, 1024, 1769)  # MB, 1769 is a full vCPU, the tiers the cost harness compares
+LAMBDA_MIN_MEMORY_SIZE = 128  # MB
+LAMBDA_MAX_MEMORY_SIZE = 10240  # MB
 API_HANDLER_LAMBDA_TIMEOUT = 30  # seconds
+PORTFOLIO_SHARDS = 1  # deployment table partitions per portfolio, 1 keeps the unsharded key layout
+SQS_BATCH_SIZE = 10  # records per invocation
+SQS_MAX_BATCHING_WINDOW = 5  # seconds
+SQS_MAX_RECEIVE_COUNT = 3  # deliveries of a record before it moves to the DLQ
+SQS_MIN_CONCURRENCY = 2  # lowest maximum concurrency an SQS event source accepts
+SQS_MAX_CONCURRENCY = 1000  # highest maximum concurrency an SQS event source accepts
+DYNAMODB_WRITE_LATENCY_MS = 10  # conservative lower bound of a single item write, used to estimate the writes of an invocation
+RECORD_WORKERS = 10  # records of a batch processed concurrently by the handler
 POWERTOOLS_SERVICE_NAME = 'POWERTOOLS_SERVICE_NAME'
 SERVICE_NAME = 'PlatformPortfolio'
 SERVICE_NAME_TAG = 'service'
@@ -19,10 +35,21 @@ POWERTOOLS_TRACE_DISABLED = 'POWERTOOLS_TRACE_DISABLED'
 POWER_TOOLS_LOG_LEVEL = 'LOG_LEVEL'
 BUILD_FOLDER = '.build/lambdas/'
 COMMON_LAYER_BUILD_FOLDER = '.build/common_layer'
+SLIM_COMMON_LAYER = False  # prune runtime provided and unused packages from the common layer and precompile it, see common_layer.py
+PRODUCT_TEMPLATES_BUILD_FOLDER = '.build/product_templates'  # synthesized product templates by content hash
+PRODUCTS_OWNER = 'Platform engineering'
 ENVIRONMENT = 'dev'
 SNS_TOPIC = 'CatalogTopic'
 SQS = 'CatalogSQS'
 PORTFOLIO_ID = 'GovernancePortfolio'
 MONITORING_TOPIC = 'monitoringTopic'
 PORTFOLIO_ID_ENV_VAR = 'PORTFOLIO_ID'
+PORTFOLIO_SHARDS_ENV_VAR = 'PORTFOLIO_SHARDS'
+RECORD_WORKERS_ENV_VAR = 'RECORD_WORKERS'
 CUSTOM_RESOURCE_TYPE = 'Custom::PlatformEngGovernanceEnabler'
+LAMBDA_ARCHITECTURE_CONTEXT = 'lambda-architecture'  # cdk synth -c lambda-architecture=arm64
+LAMBDA_MEMORY_SIZE_CONTEXT = 'lambda-memory-size'  # cdk synth -c lambda-memory-size=512
+SLIM_COMMON_LAYER_CONTEXT = 'slim-common-layer'  # cdk synth -c slim-common-layer=true
+TABLE_INDEX_COUNT_CONTEXT = 'table-index-count'  # cdk deploy -c table-index-count=1 adds the table indexes one per deployment
+ORGANIZATION_ID_CONTEXT = 'organization-id'  # cdk synth -c organization-id=o-xxxxxxxxxx skips the organization lookup
+CONTEXT_FILE = 'cdk.context.json'
@@ -1,13 +1,13 @@
 from typing import List
 
-from aws_cdk import CfnOutput, aws_sns
+from aws_cdk import CfnOutput, Stack, aws_sns
 from aws_cdk import aws_lambda as _lambda
 from aws_cdk import aws_servicecatalog as servicecatalog
 from constructs import Construct
 
 import cdk.catalog.constants as constants
-from cdk.catalog.products.cicd_product import CiCdProduct
-from cdk.catalog.products.waf_product import WafRulesProduct
+from cdk.catalog.products.registry import ProductTemplateCache, load_manifest
+from cdk.catalog.utils import get_stack_tags
 
 
 class PortfolioConstruct(Construct):
@@ -36,39 +36,28 @@ class PortfolioConstruct(Construct):
         return portfolio
 
     def _create_products(self, governance_topic: aws_sns.Topic) -> List[servicecatalog.CloudFormationProduct]:
-        # create first product
-        cicd_product = CiCdProduct(self, 'CiCdProductStack', governance_topic)
-        cfn_cicd_product = servicecatalog.CloudFormationProduct(
-            self,
-            'CiCdProduct',
-            product_name=cicd_product.product_name,
-            owner='Platform engineering',
-            product_versions=[
-                servicecatalog.CloudFormationProductVersion(
-                    cloud_formation_template=servicecatalog.CloudFormationTemplate.from_product_stack(cicd_product),
-                    description=cicd_product.product_description,
-                    product_version_name=cicd_product.product_version,
-                )
-            ],
-        )
-
-        # create second product
-        waf_product = WafRulesProduct(self, 'WafProductStack', governance_topic)
-        cfn_waf_product = servicecatalog.CloudFormationProduct(
-            self,
-            'WafProduct',
-            product_name=waf_product.product_name,
-            owner='Platform engineering',
-            product_versions=[
-                servicecatalog.CloudFormationProductVersion(
-                    cloud_formation_template=servicecatalog.CloudFormationTemplate.from_product_stack(waf_product),
-                    description=waf_product.product_description,
-                    product_version_name=waf_product.product_version,
-                )
-            ],
-        )
-
-        return [cfn_cicd_product, cfn_waf_product]
+        stack = Stack.of(self)
+        # product templates are synthesized apart from this stack, they import the topic through the export
+        # CDK creates for a cross stack reference, its name is derived from the topic path and stays the same
+        service_token_export = stack.resolve(stack.export_value(governance_topic.topic_arn))['Fn::ImportValue']
+        templates = ProductTemplateCache(service_token_export, tags=get_stack_tags())
+        return [
+            servicecatalog.CloudFormationProduct(
+                self,
+                product.id,
+                product_name=product.name,
+                owner=constants.PRODUCTS_OWNER,
+                product_versions=[
+                    servicecatalog.CloudFormationProductVersion(
+                        cloud_formation_template=templates.template(product, version),
+                        description=version.description or product.description,
+                        product_version_name=version.version,
+                    )
+                    for version in product.versions
+                ],
+            )
+            for product in load_manifest().products
+        ]
 
     def _share_portfolio(self) -> None:
         # share with account numbers, ideally you would share across your organization
@@ -1,11 +1,11 @@
-from aws_cdk import CfnParameter, CustomResource, RemovalPolicy, Stack, aws_sns
+from aws_cdk import CfnParameter, CustomResource, RemovalPolicy, Stack
 from constructs import Construct
 
 from cdk.catalog.constants import CUSTOM_RESOURCE_TYPE
 
 
 class GovernanceProductConstruct(Construct):
-    def __init__(self, scope: Construct, id: str, topic: aws_sns.Topic, product_name: str, product_version: str) -> None:
+    def __init__(self, scope: Construct, id: str, service_token: str, product_name: str, product_version: str) -> None:
         super().__init__(scope, id)
         # Add a parameter for consumer_name
         self.consumer_name_param = CfnParameter(
@@ -16,9 +16,9 @@ class GovernanceProductConstruct(Construct):
             min_length=1,
         )
         self.consumer_name_param.override_logical_id('ConsumerName')  # this will be the parameter name in the CloudFormation template
-        self.custom_resource = self._create_custom_resource(topic, product_name, product_version, self.consumer_name_param.value_as_string)
+        self.custom_resource = self._create_custom_resource(service_token, product_name, product_version, self.consumer_name_param.value_as_string)
 
-    def _create_custom_resource(self, topic: aws_sns.Topic, product_name: str, product_version: str, consumer_name: str) -> CustomResource:
+    def _create_custom_resource(self, service_token: str, product_name: str, product_version: str, consumer_name: str) -> CustomResource:
         stack = Stack.of(self)
         cr_end_props = {
             'account_id': stack.account,
@@ -30,7 +30,7 @@ class GovernanceProductConstruct(Construct):
         custom_resource = CustomResource(
             self,
             'PlatformGovernanceCustomResource',
-            service_token=topic.topic_arn,
+            service_token=service_token,
             resource_type=CUSTOM_RESOURCE_TYPE,
             removal_policy=RemovalPolicy.DESTROY,
             properties=cr_end_props,
@@ -0,0 +1,145 @@
+"""
+The portfolio products and their versions are declared in manifest.json, every version is built by a product stack of PRODUCT_STACKS.
+
+Product templates are memoized by a hash of everything they are built from: the source of every module of the cdk package,
+the product name and version, the governance service token, the stack tags and the CDK library versions. A product version whose hash has a template in
+.build/product_templates is not synthesized again, and its unchanged template has the same asset hash so it isn't uploaded again.
+Synthesis time then grows with the products that changed and not with the size of the portfolio.
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import os
+import shutil
+from functools import lru_cache
+from pathlib import Path
+from typing import Annotated, Optional, Protocol
+
+from aws_cdk import App, Fn, Stack, Tags
+from aws_cdk import aws_servicecatalog as servicecatalog
+from constructs import Construct
+from pydantic import BaseModel, Field, model_validator
+
+import cdk.catalog.constants as constants
+from cdk.catalog.products.cicd_product import CiCdProduct
+from cdk.catalog.products.waf_product import WafRulesProduct
+from cdk.catalog.utils import add_security_checks, get_error_annotations
+
+MANIFEST_FILE = Path(__file__).parent / 'manifest.json'
+CDK_PACKAGE = Path(__file__).parent.parent.parent  # the product stacks build on modules anywhere in it
+
+
+class ProductStackClass(Protocol):
+    def __call__(self, scope: Construct, id: str, service_token: str, product_name: str, product_version: str) -> servicecatalog.ProductStack: ...
+
+
+# manifest stack name to the product stack that builds it
+PRODUCT_STACKS: dict[str, ProductStackClass] = {
+    'cicd': CiCdProduct,
+    'waf': WafRulesProduct,
+}
+
+
+class ProductVersionModel(BaseModel):
+    version: Annotated[str, Field(min_length=1)]
+    description: Optional[str] = None  # defaults to the product description
+    stack: Optional[str] = None  # defaults to the product stack, a version can be built by another product stack
+
+
+class ProductManifestEntry(BaseModel):
+    id: Annotated[str, Field(min_length=1, pattern=r'^[A-Za-z][A-Za-z0-9]*$')]  # construct id, must not change once deployed
+    name: Annotated[str, Field(min_length=1)]
+    description: Annotated[str, Field(min_length=1)]
+    stack: str
+    versions: Annotated[list[ProductVersionModel], Field(min_length=1)]
+
+    @model_validator(mode='after')
+    def validate_versions(self) -> 'ProductManifestEntry':
+        for version in self.versions:
+            stack = version.stack or self.stack
+            if stack not in PRODUCT_STACKS:
+                raise ValueError(f'product {self.id} version {version.version} has an unknown stack {stack}, known stacks: {sorted(PRODUCT_STACKS)}')
+        if len({version.version for version in self.versions}) != len(self.versions):
+            raise ValueError(f'product {self.id} declares a version more than once')
+        return self
+
+
+class ProductManifest(BaseModel):
+    products: list[ProductManifestEntry]
+
+    @model_validator(mode='after')
+    def validate_unique_products(self) -> 'ProductManifest':
+        for attribute in ('id', 'name'):
+            values = [getattr(product, attribute) for product in self.products]
+            if len(set(values)) != len(values):
+                raise ValueError(f'product {attribute}s must be unique')
+        return self
+
+
+def load_manifest(path: Path = MANIFEST_FILE) -> ProductManifest:
+    return ProductManifest.model_validate_json(path.read_text())
+
+
+@lru_cache
+def _sources_digest() -> str:
+    # every module, not only the ones a product stack imports today, a new import of a shared helper can't leave a stale template
+    digest = hashlib.sha256()
+    for path in sorted(CDK_PACKAGE.rglob('*.py')):
+        digest.update(str(path.relative_to(CDK_PACKAGE)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+class ProductTemplateCache:
+    """
+    Builds the CloudFormation template of a product version once per content hash.
+    A missing template is synthesized in an app of its own, with the stack tags, security checks and suppressions of the service stack,
+    an error of the checks fails the build like cdk synth does and the template isn't cached. The nag reports are kept next to it.
+    """
+
+    def __init__(self, service_token_export: str, tags: dict[str, str], cache_dir: Optional[Path] = None) -> None:
+        self.service_token_export = service_token_export
+        self.tags = tags
+        self.cache_dir = cache_dir or Path(constants.PRODUCT_TEMPLATES_BUILD_FOLDER)
+
+    def template(self, product: ProductManifestEntry, version: ProductVersionModel) -> servicecatalog.CloudFormationTemplate:
+        template_path = self.cache_dir / f'{self.content_hash(product, version)}.template.json'
+        if not template_path.exists():
+            self._synthesize(product, version, template_path)
+        return servicecatalog.CloudFormationTemplate.from_asset(str(template_path))
+
+    def content_hash(self, product: ProductManifestEntry, version: ProductVersionModel) -> str:
+        inputs = {
+            'product': {'id': product.id, 'name': product.name, 'version': version.version, 'stack': version.stack or product.stack},
+            'service_token_export': self.service_token_export,
+            'tags': self.tags,
+            'sources': _sources_digest(),
+            'libraries': {library: importlib.metadata.version(library) for library in ('aws-cdk-lib', 'cdk-nag')},
+        }
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def _synthesize(self, product: ProductManifestEntry, version: ProductVersionModel, template_path: Path) -> None:
+        outdir = template_path.with_name(template_path.name.removesuffix('.template.json'))
+        shutil.rmtree(outdir, ignore_errors=True)
+        app = App(outdir=str(outdir))
+        parent = Stack(app, 'ProductTemplate')
+        for key, value in self.tags.items():
+            Tags.of(parent).add(key, value)
+        product_stack = PRODUCT_STACKS[version.stack or product.stack](
+            parent,
+            f'{product.id}Stack',
+            service_token=Fn.import_value(self.service_token_export),
+            product_name=product.name,
+            product_version=version.version,
+        )
+        add_security_checks(parent)
+        app.synth()
+        errors = get_error_annotations(parent)
+        if errors:
+            raise RuntimeError(f'product {product.id} version {version.version} failed the security checks:\n' + '\n'.join(errors))
+        [synthesized] = outdir.glob(f'*{product_stack.node.id}*.product.template.json')
+        # written under a temporary name and renamed, an interrupted synth never leaves a partial template behind
+        temp_path = template_path.with_suffix('.tmp')
+        shutil.copyfile(synthesized, temp_path)
+        os.replace(temp_path, template_path)
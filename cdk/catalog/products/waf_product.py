@@ -1,5 +1,4 @@
 from aws_cdk import aws_servicecatalog as servicecatalog
-from aws_cdk import aws_sns
 from aws_cdk import aws_wafv2 as waf
 from constructs import Construct
 
@@ -7,27 +6,24 @@ from cdk.catalog.products.governance_construct import GovernanceProductConstruct
 
 
 class WafRulesProduct(servicecatalog.ProductStack):
-    WAF_PRODUCT_NAME = 'WAF Rules Product'
-    WAF_PRODUCT_VERSION = '1.0.0'
-    WAF_PRODUCT_DESCRIPTION = 'Collection of WAF ACL rules for API Gateway'
-
     def __init__(
         self,
         scope: Construct,
         id: str,
-        topic: aws_sns.Topic,
+        service_token: str,
+        product_name: str,
+        product_version: str,
         **kwargs,
     ) -> None:
         super().__init__(scope, id, **kwargs)
         self.id_ = id
-        self.product_description = WafRulesProduct.WAF_PRODUCT_DESCRIPTION
-        self.product_name = WafRulesProduct.WAF_PRODUCT_NAME
-        self.product_version = WafRulesProduct.WAF_PRODUCT_VERSION
+        self.product_name = product_name
+        self.product_version = product_version
         self.acl = self._build_waf_rules()
         self.governance_enabler = GovernanceProductConstruct(
             self,
             'GovernanceEnabler',
-            topic,
+            service_token,
             self.product_name,
             self.product_version,
         )
@@ -1,19 +1,26 @@
-from aws_cdk import Aspects, Stack, Tags
-from cdk_nag import AwsSolutionsChecks, NagSuppressions
+from typing import Optional
+
+from aws_cdk import Stack, Tags
 from constructs import Construct
 
-from cdk.catalog.constants import OWNER_TAG, SERVICE_NAME, SERVICE_NAME_TAG
+import cdk.catalog.constants as constants
 from cdk.catalog.observability_construct import ObservabilityConstruct
 from cdk.catalog.portfolio_construct import PortfolioConstruct
-from cdk.catalog.utils import get_construct_name, get_username
-from cdk.catalog.visibility_construct import VisibilityConstruct
+from cdk.catalog.utils import add_security_checks, get_construct_name, get_stack_tags
+from cdk.catalog.visibility_construct import FunctionSizing, VisibilityConstruct
 
 
 class ServiceStack(Stack):
     def __init__(self, scope: Construct, id: str, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
         self._add_stack_tags()
-        self.governance = VisibilityConstruct(self, get_construct_name(stack_prefix=id, construct_name='Governance'))
+        self.governance = VisibilityConstruct(
+            self,
+            get_construct_name(stack_prefix=id, construct_name='Governance'),
+            sizing=FunctionSizing.from_context(self),
+            slim_layer=str(self.node.try_get_context(constants.SLIM_COMMON_LAYER_CONTEXT) or constants.SLIM_COMMON_LAYER).lower() == 'true',
+            table_index_count=self._table_index_count(),
+        )
         self.portfolio = PortfolioConstruct(
             self, get_construct_name(stack_prefix=id, construct_name='Portfolio'), self.governance.sns_topic, self.governance.governance_lambda
         )
@@ -29,18 +36,14 @@ class ServiceStack(Stack):
         # add security check
         self._add_security_tests()
 
+    def _table_index_count(self) -> Optional[int]:
+        # unset deploys every index, see VisibilityDbConstruct
+        index_count = self.node.try_get_context(constants.TABLE_INDEX_COUNT_CONTEXT)
+        return None if index_count is None else int(index_count)
+
     def _add_stack_tags(self) -> None:
-        # best practice to help identify resources in the console
-        Tags.of(self).add(SERVICE_NAME_TAG, SERVICE_NAME)
-        Tags.of(self).add(OWNER_TAG, get_username())
+        for key, value in get_stack_tags().items():
+            Tags.of(self).add(key, value)
 
     def _add_security_tests(self) -> None:
-        Aspects.of(self).add(AwsSolutionsChecks(verbose=True))
-        # Suppress a specific rule for this resource
-        NagSuppressions.add_stack_suppressions(
-            self,
-            [
-                {'id': 'AwsSolutions-IAM5', 'reason': 'wild card is creating by CDK for X-ray tracing and CW logs'},
-                {'id': 'AwsSolutions-IAM4', 'reason': 'log retention role created by CDK'},
-            ],
-        )
+        add_security_checks(self)
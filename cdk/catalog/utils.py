@@ -1,7 +1,12 @@
 import getpass
+import json
 import os
 from pathlib import Path
 
+import boto3
+from aws_cdk import Aspects, Stack, Token
+from cdk_nag import AwsSolutionsChecks, NagSuppressions
+from constructs import Construct
 from git import Repo
 
 import cdk.catalog.constants as constants
@@ -14,6 +19,11 @@ def get_username() -> str:
         return 'github'
 
 
+def get_stack_tags() -> dict[str, str]:
+    # best practice to help identify resources in the console
+    return {constants.SERVICE_NAME_TAG: constants.SERVICE_NAME, constants.OWNER_TAG: get_username()}
+
+
 def get_stack_name() -> str:
     repo = Repo(Path.cwd())
     username = get_username()
@@ -29,3 +39,58 @@ def get_stack_name() -> str:
 
 def get_construct_name(stack_prefix: str, construct_name: str) -> str:
     return f'{stack_prefix}-{construct_name}'[0:64]
+
+
+def add_security_checks(stack: Stack) -> None:
+    Aspects.of(stack).add(AwsSolutionsChecks(verbose=True))
+    # Suppress a specific rule for this resource, product stacks synthesized apart from the service stack get the same suppressions
+    NagSuppressions.add_stack_suppressions(
+        stack,
+        [
+            {'id': 'AwsSolutions-IAM5', 'reason': 'wild card is creating by CDK for X-ray tracing and CW logs'},
+            {'id': 'AwsSolutions-IAM4', 'reason': 'log retention role created by CDK'},
+        ],
+        apply_to_nested_stacks=True,
+    )
+
+
+def get_error_annotations(scope: Construct) -> list[str]:
+    # cdk synth fails on error annotations, an app synthesized in process doesn't and they are only kept in the construct metadata
+    return [
+        f'{construct.node.path}: {entry.data}'
+        for construct in scope.node.find_all()
+        for entry in construct.node.metadata
+        if entry.type == 'aws:cdk:error'
+    ]
+
+
+def get_organization_id(scope: Construct) -> str:
+    """
+    Returns the AWS Organization id of the deployment account, looked up once and cached in cdk.context.json like the CDK context lookups.
+    An organization-id context value overrides the lookup, synth then runs without credentials or network.
+    Delete the cached entry from cdk.context.json to look the organization up again.
+    """
+    organization_id = scope.node.try_get_context(constants.ORGANIZATION_ID_CONTEXT)
+    if organization_id:
+        return organization_id
+    account = Stack.of(scope).account
+    # scoped by account like the CDK lookups, an environment agnostic stack shares a single entry
+    cache_key = constants.ORGANIZATION_ID_CONTEXT if Token.is_unresolved(account) else f'{constants.ORGANIZATION_ID_CONTEXT}:account={account}'
+    # the CDK CLI passes cdk.context.json to the app, an App created directly (tests, scripts) reads it here
+    organization_id = scope.node.try_get_context(cache_key) or _load_context().get(cache_key)
+    if organization_id:
+        return organization_id
+    organization_id = boto3.client('organizations').describe_organization()['Organization']['Id']
+    _save_context(cache_key, organization_id)
+    return organization_id
+
+
+def _load_context() -> dict:
+    context_file = Path(constants.CONTEXT_FILE)
+    return json.loads(context_file.read_text()) if context_file.exists() else {}
+
+
+def _save_context(key: str, value: str) -> None:
+    context = _load_context()
+    context[key] = value
+    Path(constants.CONTEXT_FILE).write_text(json.dumps(context, indent=2, sort_keys=True) + '\n')
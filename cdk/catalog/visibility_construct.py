@@ -1,24 +1,138 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
 import aws_cdk.aws_lambda_event_sources as eventsources
-import boto3
-from aws_cdk import Duration, RemovalPolicy, aws_sns, aws_sqs
+import jsii
+from aws_cdk import DockerVolume, Duration, RemovalPolicy, aws_sns, aws_sqs
 from aws_cdk import aws_dynamodb as dynamodb
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_kms as kms
 from aws_cdk import aws_lambda as _lambda
 from aws_cdk import aws_sns_subscriptions as subscriptions
-from aws_cdk.aws_lambda_python_alpha import PythonLayerVersion
+from aws_cdk.aws_lambda_python_alpha import BundlingOptions, ICommandHooks, PythonLayerVersion
 from aws_cdk.aws_logs import RetentionDays
 from constructs import Construct
 
 import cdk.catalog.constants as constants
+from cdk.catalog import common_layer
+from cdk.catalog.utils import get_organization_id
 from cdk.catalog.visibility_db_construct import VisibilityDbConstruct
 
 
+@dataclass(frozen=True)
+class EventSourceScaling:
+    """
+    Scaling of the product events queue consumer, unset values are derived.
+    Setting write_budget turns on the throttle aware mode: the concurrency of the consumer is capped so its writes stay below the budget,
+    a rollout burst then waits in the queue and drains at the budget instead of retrying throttled writes.
+    """
+
+    batch_size: int = constants.SQS_BATCH_SIZE  # records per invocation
+    max_batching_window: int = constants.SQS_MAX_BATCHING_WINDOW  # seconds an invocation waits to fill its batch
+    # the handler reports failed records, turning it off makes a batch with a failed record succeed as a whole
+    report_batch_item_failures: bool = True
+    max_concurrency: Optional[int] = None  # concurrent invocations the queue drives, unset is the Lambda default
+    write_budget: Optional[int] = None  # DynamoDB item writes per second the consumer may spend, caps max_concurrency
+    visibility_timeout: Optional[int] = None  # seconds, unset is derived from the function timeout
+    max_receive_count: int = constants.SQS_MAX_RECEIVE_COUNT
+
+    def __post_init__(self) -> None:
+        # the limits of an SQS event source mapping, checked at synth instead of failing the deployment
+        if not 1 <= self.batch_size <= 10_000 or (self.max_batching_window == 0 and self.batch_size > 10):
+            raise ValueError(f'batch_size {self.batch_size} must be 1-10000, and at most 10 without a batching window')
+        if not 0 <= self.max_batching_window <= 300:
+            raise ValueError(f'max_batching_window {self.max_batching_window} must be 0-300 seconds')
+        if self.max_concurrency is not None and not constants.SQS_MIN_CONCURRENCY <= self.max_concurrency <= constants.SQS_MAX_CONCURRENCY:
+            raise ValueError(f'max_concurrency {self.max_concurrency} must be {constants.SQS_MIN_CONCURRENCY}-{constants.SQS_MAX_CONCURRENCY}')
+        if self.write_budget is not None and self.write_budget < 1:
+            raise ValueError(f'write_budget {self.write_budget} must be positive')
+
+    def consumer_concurrency(self, record_workers: int) -> Optional[int]:
+        if self.write_budget is None:
+            return self.max_concurrency
+        # an invocation writes at most one item per concurrent record, each write takes at least the write latency
+        invocation_writes = min(self.batch_size, record_workers) * 1000 / constants.DYNAMODB_WRITE_LATENCY_MS
+        min_write_budget = constants.SQS_MIN_CONCURRENCY * invocation_writes
+        if self.write_budget < min_write_budget:
+            # the event source can't run fewer invocations, the consumer would write above the budget
+            raise ValueError(
+                f'write_budget {self.write_budget} must be at least {min_write_budget:g} writes per second '
+                f'for {constants.SQS_MIN_CONCURRENCY} concurrent invocations of {min(self.batch_size, record_workers)} concurrent records'
+            )
+        concurrency = min(int(self.write_budget // invocation_writes), constants.SQS_MAX_CONCURRENCY)
+        return concurrency if self.max_concurrency is None else min(concurrency, self.max_concurrency)
+
+    def queue_visibility_timeout(self, function_timeout: int) -> int:
+        if self.visibility_timeout is None:
+            # AWS guidance: six times the function timeout plus the batching window, a batch retried after throttling isn't redelivered
+            return 6 * function_timeout + self.max_batching_window
+        if self.visibility_timeout < function_timeout:
+            raise ValueError(f'visibility_timeout {self.visibility_timeout} must not be shorter than the function timeout {function_timeout}')
+        return self.visibility_timeout
+
+
+@dataclass(frozen=True)
+class FunctionSizing:
+    """
+    Architecture and memory of the governance function.
+    Lambda allocates CPU in proportion to memory, a full vCPU at 1769 MB, so the memory size is the CPU setting as well.
+    arm64 (Graviton) is billed less per GB-second, the common layer is built for the same architecture.
+    tests/benchmarks/cost_harness.py estimates the per record latency and cost of every memory tier.
+    """
+
+    architecture: str = constants.API_HANDLER_LAMBDA_ARCHITECTURE  # x86_64 or arm64
+    memory_size: int = constants.API_HANDLER_LAMBDA_MEMORY_SIZE  # MB
+
+    def __post_init__(self) -> None:
+        if self.architecture not in ('x86_64', 'arm64'):
+            raise ValueError(f'architecture {self.architecture} must be x86_64 or arm64')
+        if not constants.LAMBDA_MIN_MEMORY_SIZE <= self.memory_size <= constants.LAMBDA_MAX_MEMORY_SIZE:
+            raise ValueError(f'memory_size {self.memory_size} must be {constants.LAMBDA_MIN_MEMORY_SIZE}-{constants.LAMBDA_MAX_MEMORY_SIZE} MB')
+
+    @classmethod
+    def from_context(cls, scope: Construct) -> 'FunctionSizing':
+        # cdk synth -c lambda-architecture=arm64 -c lambda-memory-size=512 overrides the defaults without a code change
+        architecture = scope.node.try_get_context(constants.LAMBDA_ARCHITECTURE_CONTEXT) or constants.API_HANDLER_LAMBDA_ARCHITECTURE
+        memory_size = scope.node.try_get_context(constants.LAMBDA_MEMORY_SIZE_CONTEXT) or constants.API_HANDLER_LAMBDA_MEMORY_SIZE
+        return cls(architecture=architecture, memory_size=int(memory_size))
+
+    @property
+    def lambda_architecture(self) -> _lambda.Architecture:
+        return _lambda.Architecture.ARM_64 if self.architecture == 'arm64' else _lambda.Architecture.X86_64
+
+
+@jsii.implements(ICommandHooks)
+class SlimLayerHooks:
+    """Slims the common layer in the bundling container once its requirements are installed, see common_layer.py"""
+
+    def before_bundling(self, input_dir: str, output_dir: str) -> list[str]:
+        return []
+
+    def after_bundling(self, input_dir: str, output_dir: str) -> list[str]:
+        return [common_layer.bundling_command(output_dir)]
+
+
 class VisibilityConstruct(Construct):
-    def __init__(self, scope: Construct, id_: str) -> None:
+    def __init__(
+        self,
+        scope: Construct,
+        id_: str,
+        scaling: Optional[EventSourceScaling] = None,
+        sizing: Optional[FunctionSizing] = None,
+        slim_layer: bool = constants.SLIM_COMMON_LAYER,
+        portfolio_shards: int = constants.PORTFOLIO_SHARDS,
+        record_workers: int = constants.RECORD_WORKERS,
+        table_index_count: Optional[int] = None,
+    ) -> None:
         super().__init__(scope, id_)
         self.id_ = id_
-        self.api_db = VisibilityDbConstruct(self, f'{id_}db')
+        self.scaling = scaling or EventSourceScaling()
+        self.sizing = sizing or FunctionSizing()
+        self.slim_layer = slim_layer
+        self.portfolio_shards = portfolio_shards
+        self.record_workers = record_workers
+        self.api_db = VisibilityDbConstruct(self, f'{id_}db', index_count=table_index_count)
         self.lambda_role = self._build_lambda_role(self.api_db.db)
         self.common_layer = self._build_common_layer()
         self.governance_lambda = self._add_visibility_lambda(self.lambda_role, self.api_db.db, self.common_layer)
@@ -46,12 +160,10 @@ class VisibilityConstruct(Construct):
         policy_statement = iam.PolicyStatement(actions=['sns:Publish'], resources=[topic.topic_arn], principals=[iam.AnyPrincipal()])
 
         # Add a condition to the policy statement to restrict to the organization
-        client = boto3.client('organizations')
-        response = client.describe_organization()
         policy_statement.add_condition(
             'StringEquals',
             {
-                'aws:PrincipalOrgID': response['Organization']['Id'],
+                'aws:PrincipalOrgID': get_organization_id(self),
             },
         )
 
@@ -64,16 +176,26 @@ class VisibilityConstruct(Construct):
         queue = aws_sqs.Queue(
             self,
             f'{self.id_}{constants.SQS}',
-            visibility_timeout=Duration.seconds(300),
+            visibility_timeout=Duration.seconds(self.scaling.queue_visibility_timeout(constants.API_HANDLER_LAMBDA_TIMEOUT)),
             retention_period=Duration.days(1),
             queue_name=f'{self.id_}{constants.SQS}',
             removal_policy=RemovalPolicy.DESTROY,
             encryption=aws_sqs.QueueEncryption.SQS_MANAGED,
-            dead_letter_queue=aws_sqs.DeadLetterQueue(max_receive_count=3, queue=dlq),
+            dead_letter_queue=aws_sqs.DeadLetterQueue(max_receive_count=self.scaling.max_receive_count, queue=dlq),
             enforce_ssl=True,
         )
         topic.add_subscription(topic_subscription=subscriptions.SqsSubscription(queue, raw_message_delivery=True))
-        function.add_event_source(eventsources.SqsEventSource(queue=queue, batch_size=1, enabled=True))
+        # records are processed independently, failed records are reported back by the handler and only they are redelivered
+        function.add_event_source(
+            eventsources.SqsEventSource(
+                queue=queue,
+                batch_size=self.scaling.batch_size,
+                max_batching_window=Duration.seconds(self.scaling.max_batching_window),
+                report_batch_item_failures=self.scaling.report_batch_item_failures,
+                max_concurrency=self.scaling.consumer_concurrency(self.record_workers),
+                enabled=True,
+            )
+        )
         return queue
 
     def _build_lambda_role(self, db: dynamodb.TableV2) -> iam.Role:
@@ -85,10 +207,15 @@ class VisibilityConstruct(Construct):
                 'dynamodb_db': iam.PolicyDocument(
                     statements=[
                         iam.PolicyStatement(
-                            actions=['dynamodb:PutItem', 'dynamodb:GetItem', 'dynamodb:DeleteItem'],
+                            actions=['dynamodb:PutItem', 'dynamodb:UpdateItem', 'dynamodb:GetItem', 'dynamodb:DeleteItem', 'dynamodb:BatchWriteItem'],
                             resources=[db.table_arn],
                             effect=iam.Effect.ALLOW,
-                        )
+                        ),
+                        iam.PolicyStatement(
+                            actions=['dynamodb:Query'],
+                            resources=[db.table_arn, f'{db.table_arn}/index/*'],
+                            effect=iam.Effect.ALLOW,
+                        ),
                     ]
                 ),
             },
@@ -98,11 +225,21 @@ class VisibilityConstruct(Construct):
         )
 
     def _build_common_layer(self) -> PythonLayerVersion:
+        bundling = None
+        if self.slim_layer:
+            # the slimming module is mounted into the bundling container and run with the runtime's Python
+            bundling = BundlingOptions(
+                command_hooks=SlimLayerHooks(),
+                volumes=[DockerVolume(host_path=str(Path(common_layer.__file__).parent), container_path=common_layer.CONTAINER_PATH)],
+            )
         return PythonLayerVersion(
             self,
             constants.LAMBDA_LAYER_NAME,
             entry=constants.COMMON_LAYER_BUILD_FOLDER,
             compatible_runtimes=[_lambda.Runtime.PYTHON_3_12],
+            # the dependencies are bundled for the platform of the first compatible architecture, native wheels must match the function
+            compatible_architectures=[self.sizing.lambda_architecture],
+            bundling=bundling,
             removal_policy=RemovalPolicy.DESTROY,
         )
 
@@ -116,6 +253,7 @@ class VisibilityConstruct(Construct):
             self,
             constants.VISIBILITY_LAMBDA,
             runtime=_lambda.Runtime.PYTHON_3_12,
+            architecture=self.sizing.lambda_architecture,
             code=_lambda.Code.from_asset(constants.BUILD_FOLDER),
             handler='catalog_backend.handlers.product_callback_handler.handle_product_event',
             environment={
@@ -124,12 +262,14 @@ class VisibilityConstruct(Construct):
                 'POWERTOOLS_METRICS_NAMESPACE': constants.METRICS_NAMESPACE,  # for metrics
                 'METRICS_DIMENSION_KEY': constants.METRICS_DIMENSION_VALUE,  # for metrics
                 'TABLE_NAME': db.table_name,
+                constants.PORTFOLIO_SHARDS_ENV_VAR: str(self.portfolio_shards),
+                constants.RECORD_WORKERS_ENV_VAR: str(self.record_workers),
                 # 'PORTFOLIO_ID': constants.PORTFOLIO_ID, is added later after portfolio creation
             },
             tracing=_lambda.Tracing.ACTIVE,
             retry_attempts=0,
             timeout=Duration.seconds(constants.API_HANDLER_LAMBDA_TIMEOUT),
-            memory_size=constants.API_HANDLER_LAMBDA_MEMORY_SIZE,
+            memory_size=self.sizing.memory_size,
             layers=[layer],
             role=role,
             log_retention=RetentionDays.ONE_DAY,
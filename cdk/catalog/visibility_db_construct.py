@@ -1,17 +1,47 @@
+from typing import Optional
+
 from aws_cdk import CfnOutput, RemovalPolicy
 from aws_cdk import aws_dynamodb as dynamodb
 from constructs import Construct
 
 import cdk.catalog.constants as constants
 
+# deployment inventory queries: by account, by consumer team and by product name and version
+TABLE_INDEXES = [
+    dynamodb.GlobalSecondaryIndexPropsV2(
+        index_name=constants.ACCOUNT_ID_INDEX,
+        partition_key=dynamodb.Attribute(name='account_id', type=dynamodb.AttributeType.STRING),
+        sort_key=dynamodb.Attribute(name='product_stack_id', type=dynamodb.AttributeType.STRING),
+    ),
+    dynamodb.GlobalSecondaryIndexPropsV2(
+        index_name=constants.CONSUMER_NAME_INDEX,
+        partition_key=dynamodb.Attribute(name='consumer_name', type=dynamodb.AttributeType.STRING),
+        sort_key=dynamodb.Attribute(name='product_stack_id', type=dynamodb.AttributeType.STRING),
+    ),
+    dynamodb.GlobalSecondaryIndexPropsV2(
+        index_name=constants.PRODUCT_INDEX,
+        partition_key=dynamodb.Attribute(name='name', type=dynamodb.AttributeType.STRING),
+        sort_key=dynamodb.Attribute(name='version', type=dynamodb.AttributeType.STRING),
+    ),
+]
+
 
 class VisibilityDbConstruct(Construct):
-    def __init__(self, scope: Construct, id_: str) -> None:
+    """
+    index_count deploys only the first TABLE_INDEXES. CloudFormation creates or deletes a single global secondary index
+    per table update, so indexes are added to an existing table one per deployment: -c table-index-count=1, then 2, then 3.
+    A new table is created with all of them at once.
+    """
+
+    def __init__(self, scope: Construct, id_: str, index_count: Optional[int] = None) -> None:
         super().__init__(scope, id_)
+        index_count = len(TABLE_INDEXES) if index_count is None else index_count
+        if not 0 <= index_count <= len(TABLE_INDEXES):
+            raise ValueError(f'index_count {index_count} must be 0-{len(TABLE_INDEXES)}')
 
-        self.db: dynamodb.TableV2 = self._build_db(id_)
+        self.db: dynamodb.TableV2 = self._build_db(id_, TABLE_INDEXES[:index_count])
 
-    def _build_db(self, id_prefix: str) -> dynamodb.TableV2:
+    def _build_db(self, id_prefix: str, indexes: list[dynamodb.GlobalSecondaryIndexPropsV2]) -> dynamodb.TableV2:
         table_id = f'{id_prefix}{constants.TABLE_NAME}'
         table = dynamodb.TableV2(
             self,
@@ -20,6 +50,8 @@ class VisibilityDbConstruct(Construct):
             partition_key=dynamodb.Attribute(name='portfolio_id', type=dynamodb.AttributeType.STRING),
             sort_key=dynamodb.Attribute(name='product_stack_id', type=dynamodb.AttributeType.STRING),
             billing=dynamodb.Billing.on_demand(),
+            global_secondary_indexes=indexes,
+            time_to_live_attribute=constants.TABLE_TTL_ATTRIBUTE,
             point_in_time_recovery=True,
             removal_policy=RemovalPolicy.DESTROY,
         )
@@ -0,0 +1,237 @@
+"""
+Estimates the per record latency and cost of the governance handler at every Lambda memory tier.
+
+A recorded event mix is replayed through the handler in a child process that gets the CPU share of the memory tier:
+Lambda allocates CPU in proportion to memory, a full vCPU at 1769 MB, and enforces the share with a CPU quota per period.
+The parent stops and continues the child for the same share of every period, on a single core, so the measured latency
+includes the time the handler waits for its quota. Deployments are kept in the in-memory DAL and responses are sent to a
+local server in the parent, the latencies exclude DynamoDB and S3 round trips.
+
+Latency is measured on the architecture of the host, the cost of both architectures is derived from it.
+
+poetry run python -m tests.benchmarks.cost_harness [--events recorded.jsonl] [--memory 128 256 1769] [--rounds 5]
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from cdk.catalog import constants
+from tests.benchmarks.utils import LAMBDA_ENV, response_server
+
+FULL_VCPU_MEMORY_SIZE = 1769  # MB
+THROTTLE_PERIOD = 0.02  # seconds, the CPU quota is granted per period
+# us-east-1 on-demand prices in USD, other regions differ by a constant factor
+PRICE_PER_GB_SECOND = {'x86_64': 0.0000166667, 'arm64': 0.0000133334}
+PRICE_PER_REQUEST = 0.20 / 1_000_000
+REPO_ROOT = Path(__file__).parents[2]
+HARNESS_ENV = {
+    **LAMBDA_ENV,
+    'POWERTOOLS_TRACE_DISABLED': 'true',
+    'TABLE_NAME': 'harness-governance',
+    'PORTFOLIO_ID': 'port-harness1234',
+    'DAL_BACKEND': 'memory',
+    constants.RECORD_WORKERS_ENV_VAR: str(constants.RECORD_WORKERS),
+}
+# request types of the default mix by their share, a rollout creates most stacks and updates or deletes fewer
+DEFAULT_MIX = {'Create': 0.6, 'Update': 0.25, 'Delete': 0.15}
+DEFAULT_BATCH_SIZES = (1, 1, 2, 5, 10)  # invocations are mostly small batches, bursts fill the batch size
+
+
+@dataclass(frozen=True)
+class TierEstimate:
+    memory_size: int  # MB
+    cpu_share: float
+    records: int
+    invocation_ms_p50: float
+    invocation_ms_p95: float
+    ms_per_record: float
+    cost_per_million_records: dict[str, float]  # USD by architecture
+
+
+def cpu_share(memory_size: int) -> float:
+    # the handler runs on one thread most of the time, more than a full vCPU isn't faster
+    return min(memory_size / FULL_VCPU_MEMORY_SIZE, 1.0)
+
+
+def default_event_mix(invocations: int = 20, seed: int = 7) -> list[dict]:
+    """A reproducible mix of SQS events: stacks are created, then updated or deleted by later records"""
+    from tests.integration.utils import NEW_RESOURCE_PROPERTIES, RESOURCE_PROPERTIES, create_product_body, create_sqs_records
+
+    rng = random.Random(seed)
+    live_stacks: list[str] = []
+    events = []
+    for _ in range(invocations):
+        bodies = []
+        for _ in range(rng.choice(DEFAULT_BATCH_SIZES)):
+            request_type = rng.choices(list(DEFAULT_MIX), weights=list(DEFAULT_MIX.values()))[0] if live_stacks else 'Create'
+            if request_type == 'Create':
+                live_stacks.append(
+                    f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-harness/{uuid.UUID(int=rng.getrandbits(128))}'
+                )
+                bodies.append(create_product_body('Create', live_stacks[-1], RESOURCE_PROPERTIES))
+            elif request_type == 'Update':
+                bodies.append(create_product_body('Update', rng.choice(live_stacks), NEW_RESOURCE_PROPERTIES, RESOURCE_PROPERTIES))
+            else:
+                bodies.append(create_product_body('Delete', live_stacks.pop(rng.randrange(len(live_stacks))), RESOURCE_PROPERTIES))
+        events.append(create_sqs_records(*bodies))
+    return events
+
+
+def load_events(path: Path) -> list[dict]:
+    """Recorded SQS events of the handler, one event per line"""
+    return [json.loads(line) for line in path.read_text().splitlines() if line.strip()]
+
+
+def _fresh_requests(event: dict, response_url: str) -> dict:
+    # every replay is a new request, a replayed request id would be skipped as already answered
+    records = []
+    for record in event['Records']:
+        with contextlib.suppress(ValueError, TypeError, AttributeError):
+            body = json.loads(record['body'])
+            body.update({'RequestId': str(uuid.uuid4()), 'ResponseURL': response_url})
+            record = {**record, 'body': json.dumps(body)}
+        records.append(record)
+    return {**event, 'Records': records}
+
+
+def _replay(events_path: Path, memory_size: int, rounds: int, response_url: str, results_path: Path) -> None:
+    # runs in the throttled child process, the first round warms up clients and caches and isn't measured
+    from aws_lambda_powertools.utilities.typing import LambdaContext
+
+    from catalog_backend.handlers.product_callback_handler import handle_product_event
+    from catalog_backend.handlers.utils.observability import logger
+
+    # built here, tests.utils imports the CDK app and its node runtime would compete with the handler for the CPU quota
+    context = LambdaContext()
+    context._aws_request_id, context._function_name = 'harness', 'harness'
+    context._invoked_function_arn = 'arn:aws:lambda:us-east-1:123456789012:function:harness'
+    context._memory_limit_in_mb = memory_size
+    events = load_events(events_path)
+    replays = [[_fresh_requests(event, response_url) for event in events] for _ in range(rounds + 1)]
+    durations: list[tuple[int, float]] = []  # (records, seconds) per invocation
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        # log lines and metrics are still serialized like in Lambda, only the output is dropped
+        logger.registered_handler.stream = devnull  # type: ignore[attr-defined]
+        for round_index, replay in enumerate(replays):
+            for event in replay:
+                start = time.perf_counter()
+                handle_product_event(event, context)
+                if round_index:
+                    durations.append((len(event['Records']), time.perf_counter() - start))
+    results_path.write_text(json.dumps(durations))
+
+
+def _throttle(process: subprocess.Popen, share: float) -> None:
+    # a duty cycle of SIGCONT and SIGSTOP grants the child its CPU share of every period, like a CFS quota
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(process.pid, {min(os.sched_getaffinity(0))})  # worker threads share one core, as below a full vCPU
+    try:
+        while process.poll() is None:
+            if share < 1.0:
+                time.sleep(THROTTLE_PERIOD * share)
+                process.send_signal(signal.SIGSTOP)
+                time.sleep(THROTTLE_PERIOD * (1 - share))
+                process.send_signal(signal.SIGCONT)
+            else:
+                time.sleep(THROTTLE_PERIOD)
+    finally:
+        if process.poll() is None:
+            process.send_signal(signal.SIGCONT)
+
+
+def _cost_per_invocation(memory_size: int, seconds: float, architecture: str) -> float:
+    billed_seconds = math.ceil(seconds * 1000) / 1000  # duration is billed in 1 ms increments
+    return memory_size / 1024 * billed_seconds * PRICE_PER_GB_SECOND[architecture] + PRICE_PER_REQUEST
+
+
+def measure_tier(events_path: Path, memory_size: int, rounds: int, response_url: str) -> TierEstimate:
+    share = cpu_share(memory_size)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        results_path = Path(temp_dir) / 'durations.json'
+        command = [
+            sys.executable,
+            '-m',
+            'tests.benchmarks.cost_harness',
+            '--replay',
+            str(events_path),
+            '--memory',
+            str(memory_size),
+            '--rounds',
+            str(rounds),
+        ]
+        command += ['--response-url', response_url, '--results', str(results_path)]
+        stderr_path = Path(temp_dir) / 'stderr.log'
+        # stderr goes to a file, a child that fills a pipe nobody reads while it is throttled would block forever
+        with stderr_path.open('w') as stderr:
+            process = subprocess.Popen(command, cwd=REPO_ROOT, env={**os.environ, **HARNESS_ENV}, stderr=stderr)
+            _throttle(process, share)
+        if process.wait() != 0:
+            raise RuntimeError(f'replay at {memory_size} MB failed: {stderr_path.read_text()}')
+        durations: list[tuple[int, float]] = json.loads(results_path.read_text())
+    records = sum(count for count, _ in durations)
+    invocation_ms = sorted(seconds * 1000 for _, seconds in durations)
+    return TierEstimate(
+        memory_size=memory_size,
+        cpu_share=round(share, 3),
+        records=records,
+        invocation_ms_p50=round(statistics.median(invocation_ms), 2),
+        invocation_ms_p95=round(invocation_ms[min(len(invocation_ms) - 1, int(len(invocation_ms) * 0.95))], 2),
+        ms_per_record=round(sum(invocation_ms) / records, 3),
+        cost_per_million_records={
+            architecture: round(sum(_cost_per_invocation(memory_size, seconds, architecture) for _, seconds in durations) / records * 1_000_000, 4)
+            for architecture in PRICE_PER_GB_SECOND
+        },
+    )
+
+
+def estimate(events: list[dict], memory_sizes: tuple[int, ...] = constants.LAMBDA_MEMORY_TIERS, rounds: int = 3) -> list[TierEstimate]:
+    # the response server runs in the parent so the child isn't charged for it
+    with tempfile.TemporaryDirectory() as temp_dir, response_server() as response_url:
+        events_path = Path(temp_dir) / 'events.jsonl'
+        events_path.write_text(''.join(f'{json.dumps(event)}\n' for event in events))
+        return [measure_tier(events_path, memory_size, rounds, response_url) for memory_size in memory_sizes]
+
+
+def _print_table(estimates: list[TierEstimate]) -> None:
+    print(f'latency measured on {platform.machine()}, {estimates[0].records if estimates else 0} records per tier')
+    print(f'{"memory MB":>10} {"cpu share":>10} {"p50 ms":>8} {"p95 ms":>8} {"ms/record":>10} {"x86_64 $/1M":>12} {"arm64 $/1M":>11}')
+    for tier in estimates:
+        print(
+            f'{tier.memory_size:>10} {tier.cpu_share:>10} {tier.invocation_ms_p50:>8} {tier.invocation_ms_p95:>8} {tier.ms_per_record:>10}'
+            f' {tier.cost_per_million_records["x86_64"]:>12} {tier.cost_per_million_records["arm64"]:>11}'
+        )
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=Path, help='recorded SQS events, one per line, defaults to a generated mix')
+    parser.add_argument('--memory', type=int, nargs='+', default=list(constants.LAMBDA_MEMORY_TIERS), help='memory tiers in MB')
+    parser.add_argument('--rounds', type=int, default=3, help='measured replays of the events per tier')
+    parser.add_argument('--replay', type=Path, help=argparse.SUPPRESS)  # the throttled child process
+    parser.add_argument('--response-url', help=argparse.SUPPRESS)
+    parser.add_argument('--results', type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.replay:
+        _replay(args.replay, args.memory[0], args.rounds, args.response_url, args.results)
+        return
+    events = load_events(args.events) if args.events else default_event_mix()
+    _print_table(estimate(events, tuple(args.memory), args.rounds))
+
+
+if __name__ == '__main__':
+    main()
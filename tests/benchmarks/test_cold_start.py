@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from tests.benchmarks.utils import LAMBDA_ENV, assert_within_baseline, median_of
+
+HANDLER_MODULE = 'catalog_backend.handlers.product_callback_handler'
+# imported on first use, importing them during init is a cold start regression
+DEFERRED_MODULES = ('boto3', 'cachetools', 'mypy_boto3_dynamodb', 'crhelper', 'catalog_backend.dal.dynamo_dal_handler')
+REPO_ROOT = Path(__file__).parents[2]
+RUNS = 7
+
+
+def _run_python(*args: str) -> subprocess.CompletedProcess:
+    # every run uses a fresh interpreter, like a new Lambda execution environment
+    env = {**os.environ, **LAMBDA_ENV, 'PYTHONDONTWRITEBYTECODE': '1'}
+    return subprocess.run([sys.executable, *args], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+
+
+def _import_time_tree() -> dict[str, int]:
+    # python -X importtime writes 'import time: self [us] | cumulative | imported package' per module to stderr
+    output = _run_python('-X', 'importtime', '-c', f'import {HANDLER_MODULE}').stderr
+    modules: dict[str, int] = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def _init_latency_ms() -> float:
+    script = f'import time; start = time.perf_counter(); import {HANDLER_MODULE}; print((time.perf_counter() - start) * 1000)'
+    return float(_run_python('-c', script).stdout.strip())
+
+
+def test_heavy_modules_are_not_imported_during_init():
+    imported = _import_time_tree()
+    assert HANDLER_MODULE in imported
+    assert [module for module in DEFERRED_MODULES if module in imported] == []
+
+
+def test_handler_init_latency():
+    _init_latency_ms()  # warm the file system cache
+    assert_within_baseline('cold_start', 'handler_init_ms', median_of(RUNS, _init_latency_ms))
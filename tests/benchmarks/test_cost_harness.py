@@ -0,0 +1,44 @@
+import json
+import signal
+
+import pytest
+
+from tests.benchmarks.cost_harness import _fresh_requests, cpu_share, default_event_mix, estimate, measure_tier
+
+pytestmark = pytest.mark.skipif(not hasattr(signal, 'SIGSTOP'), reason='the CPU throttling stops and continues a child process')
+
+
+def test_replayed_requests_are_new_requests():
+    # Given: a recorded event
+    event = default_event_mix(invocations=1)[0]
+
+    # When: it is prepared for two replays
+    first, second = _fresh_requests(event, 'http://127.0.0.1:1/response'), _fresh_requests(event, 'http://127.0.0.1:1/response')
+
+    # Then: every replay has its own request ids and answers the local response url
+    first_body, second_body = json.loads(first['Records'][0]['body']), json.loads(second['Records'][0]['body'])
+    assert first_body['RequestId'] != second_body['RequestId']
+    assert first_body['ResponseURL'] == 'http://127.0.0.1:1/response'
+    assert first_body['StackId'] == json.loads(event['Records'][0]['body'])['StackId']
+
+
+def test_cpu_share_follows_memory():
+    assert cpu_share(1769) == cpu_share(3538) == 1.0
+    assert cpu_share(128) == pytest.approx(0.072, abs=0.001)
+
+
+def test_throttled_tier_is_slower_per_record():
+    # Given: a small recorded mix replayed at a throttled tier and at a full vCPU
+    low, full = estimate(default_event_mix(invocations=10), memory_sizes=(256, 1769), rounds=2)
+
+    # Then: both tiers replay the same records, the throttled tier waits for its CPU quota
+    assert low.records == full.records > 0
+    assert low.ms_per_record > full.ms_per_record * 2
+    # Graviton is billed less for the same duration
+    assert all(tier.cost_per_million_records['arm64'] < tier.cost_per_million_records['x86_64'] for tier in (low, full))
+
+
+def test_failed_replay_reports_its_stderr(tmp_path):
+    # the child's traceback is read from its stderr file once it exited
+    with pytest.raises(RuntimeError, match='FileNotFoundError'):
+        measure_tier(tmp_path / 'missing.jsonl', 1769, rounds=1, response_url='http://127.0.0.1:1/response')
@@ -0,0 +1,68 @@
+import logging
+import os
+import time
+import uuid
+from typing import Callable
+
+from aws_lambda_powertools.logging import Logger
+
+from catalog_backend.handlers.utils.observability import PayloadLogger
+from tests.benchmarks.utils import assert_relative
+from tests.integration.utils import RESOURCE_PROPERTIES, create_product_body, create_sqs_records
+
+RUNS = 7
+BATCHES_PER_RUN = 200
+BATCH_SIZE = 10
+STACK_ID = 'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-benchmark/1dbb0a20-14e8-11ef-a95c-0eaa9ec0a8b1'
+EVENT = create_sqs_records(*(create_product_body('Create', STACK_ID, RESOURCE_PROPERTIES) for _ in range(BATCH_SIZE)))
+
+
+def _devnull_logger() -> Logger:
+    # lines are formatted and written like in Lambda, only not shipped anywhere
+    return Logger(service=f'logging-benchmark-{uuid.uuid4()}', level='INFO', logger_handler=logging.StreamHandler(open(os.devnull, 'w')))
+
+
+def _full_dumps(bench_logger: Logger) -> Callable[[], None]:
+    # the previous logging: the whole event at INFO, then every record body again
+    def log_batch() -> None:
+        bench_logger.info('processing product SQS event', event=EVENT)
+        for record in EVENT['Records']:
+            bench_logger.info('processing product SQS body', record_body=record['body'])
+
+    return log_batch
+
+
+def _gated_dumps(bench_logger: Logger, sample_rate: float) -> Callable[[], None]:
+    payload_logger = PayloadLogger(bench_logger)
+
+    def log_batch() -> None:
+        payload_logger.start_invocation(sample_rate)
+        bench_logger.info('processing product SQS event', records=len(EVENT['Records']))
+        payload_logger.log('product SQS event', event=EVENT)
+        for record in EVENT['Records']:
+            payload_logger.log('processing product SQS body', record_body=record['body'])
+
+    return log_batch
+
+
+def _us_per_record(log_batch: Callable[[], None]) -> float:
+    def measure() -> float:
+        start = time.perf_counter_ns()
+        for _ in range(BATCHES_PER_RUN):
+            log_batch()
+        return (time.perf_counter_ns() - start) / 1000 / (BATCHES_PER_RUN * BATCH_SIZE)
+
+    return min(measure() for _ in range(RUNS))
+
+
+def test_event_logging_overhead_per_record():
+    bench_logger = _devnull_logger()
+
+    full = _us_per_record(_full_dumps(bench_logger))
+    gated = _us_per_record(_gated_dumps(bench_logger, sample_rate=0))
+    sampled = _us_per_record(_gated_dumps(bench_logger, sample_rate=1))
+    print(f'\nfull dumps {full:.2f}us/record, gated {gated:.2f}us/record, every invocation sampled {sampled:.2f}us/record')
+
+    assert_relative('event_logging.gated_to_full', gated, full, max_ratio=0.2)
+    # a sampled invocation redacts and truncates on top of the dumps, only a small share of invocations pays for it
+    assert_relative('event_logging.sampled_to_full', sampled, full, max_ratio=3)
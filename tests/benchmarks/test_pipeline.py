@@ -0,0 +1,152 @@
+import contextlib
+import functools
+import os
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Iterator
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from tests.benchmarks.utils import LAMBDA_ENV, assert_within_baseline, median_of, response_server
+from tests.integration.utils import RESOURCE_PROPERTIES, create_product_body, create_sqs_records
+from tests.utils import generate_context
+
+TABLE_NAME = 'benchmark-governance'
+PORTFOLIO_ID = 'port-benchmark1234'
+BATCH_SIZES = (1, 10, 100)
+STAGE_BATCH_SIZE = 10
+MEMORY_BATCH_SIZE = 100
+RUNS = 5
+# a batch of 100 records flushes its metrics once they reach the EMF 100 values limit, nothing is left for the final flush
+pytestmark = pytest.mark.filterwarnings('ignore:No application metrics to publish')
+PIPELINE_ENV = {
+    **LAMBDA_ENV,
+    'POWERTOOLS_TRACE_DISABLED': 'true',
+    'TABLE_NAME': TABLE_NAME,
+    'PORTFOLIO_ID': PORTFOLIO_ID,
+    'AWS_ACCESS_KEY_ID': 'testing',
+    'AWS_SECRET_ACCESS_KEY': 'testing',
+}
+
+
+@pytest.fixture(scope='module')
+def response_url() -> Iterator[str]:
+    with response_server() as url:
+        yield url
+
+
+@pytest.fixture(scope='module')
+def handler(response_url) -> Iterator[Callable[[dict], dict]]:
+    with pytest.MonkeyPatch.context() as monkeypatch, mock_aws():
+        for key, value in PIPELINE_ENV.items():
+            monkeypatch.setenv(key, value)
+        boto3.client('dynamodb').create_table(
+            TableName=TABLE_NAME,
+            KeySchema=[{'AttributeName': 'portfolio_id', 'KeyType': 'HASH'}, {'AttributeName': 'product_stack_id', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[
+                {'AttributeName': 'portfolio_id', 'AttributeType': 'S'},
+                {'AttributeName': 'product_stack_id', 'AttributeType': 'S'},
+            ],
+            BillingMode='PAY_PER_REQUEST',
+        )
+        from catalog_backend.dal import dynamo_clients
+        from catalog_backend.handlers.product_callback_handler import handle_product_event
+        from catalog_backend.handlers.utils.observability import logger
+
+        dynamo_clients.clear()  # clients built outside of the mock must not be reused
+        with open(os.devnull, 'w') as devnull:
+            # log records and metrics are still serialized like in Lambda, only the output is dropped
+            monkeypatch.setattr(logger.registered_handler, 'stream', devnull)
+
+            def call_handler(event: dict) -> dict:
+                with contextlib.redirect_stdout(devnull):
+                    return handle_product_event(event, generate_context())
+
+            yield call_handler
+        dynamo_clients.clear()
+
+
+def _create_event(records: int, response_url: str) -> dict:
+    bodies = []
+    for _ in range(records):
+        stack_id = f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-benchmark/{uuid.uuid4()}'
+        body = create_product_body('Create', stack_id, RESOURCE_PROPERTIES).replace(
+            'https://cloudformation-custom-resource-response-useast1.s3.amazonaws.com', response_url, 1
+        )
+        bodies.append(body)
+    return create_sqs_records(*bodies)
+
+
+def _run_batch(handler: Callable[[dict], dict], records: int, response_url: str) -> float:
+    event = _create_event(records, response_url)  # built outside of the measurement
+    start = time.perf_counter()
+    response = handler(event)
+    elapsed = time.perf_counter() - start
+    assert response['batchItemFailures'] == []
+    return elapsed
+
+
+@contextlib.contextmanager
+def _stage_timer(monkeypatch: pytest.MonkeyPatch) -> Iterator[dict[str, float]]:
+    import catalog_backend.handlers.product_callback_handler as product_callback_handler
+
+    totals: dict[str, float] = defaultdict(float)
+
+    def timed(stage: str, function: Callable) -> Callable:
+        @functools.wraps(function)  # the batch processor inspects the record handler signature
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                totals[stage] += time.perf_counter() - start
+
+        return wrapper
+
+    monkeypatch.setattr(product_callback_handler, 'record_handler', timed('record', product_callback_handler.record_handler))
+    monkeypatch.setattr(product_callback_handler, 'provision_product', timed('buffer', product_callback_handler.provision_product))
+    write_buffer = product_callback_handler.WriteBehindBuffer
+    monkeypatch.setattr(write_buffer, 'flush', timed('flush', write_buffer.flush))
+    sender = product_callback_handler.RESPONSE_SENDER
+    monkeypatch.setattr(sender, 'send_timed', timed('callback', sender.send_timed))
+    yield totals
+
+
+@pytest.mark.parametrize('records', BATCH_SIZES)
+def test_throughput(handler, response_url, records):
+    _run_batch(handler, records, response_url)  # warm up clients and connections
+    records_per_second = median_of(RUNS, lambda: records / _run_batch(handler, records, response_url))
+    assert_within_baseline('pipeline', f'throughput_{records}_records_per_second', records_per_second, lower_is_better=False)
+
+
+def test_stage_timings(handler, response_url, monkeypatch):
+    _run_batch(handler, STAGE_BATCH_SIZE, response_url)
+    with _stage_timer(monkeypatch) as totals:
+        for _ in range(RUNS):
+            _run_batch(handler, STAGE_BATCH_SIZE, response_url)
+
+    records = STAGE_BATCH_SIZE * RUNS
+    stages = {
+        # the record handler parses the record and buffers its write, the buffering and the flush of the batch are accounted to the DAL
+        'parse': (totals['record'] - totals['buffer']) / records,
+        'dal': (totals['buffer'] + totals['flush']) / records,
+        'callback': totals['callback'] / records,
+    }
+    for stage, seconds in stages.items():
+        assert_within_baseline('pipeline', f'{stage}_ms_per_record', seconds * 1000)
+
+
+def test_peak_memory(handler, response_url):
+    _run_batch(handler, MEMORY_BATCH_SIZE, response_url)
+    # python allocations only, the interpreter and native library memory are not traced
+    tracemalloc.start()
+    try:
+        _run_batch(handler, MEMORY_BATCH_SIZE, response_url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert_within_baseline('pipeline', f'peak_memory_kb_{MEMORY_BATCH_SIZE}_records', peak / 1024)
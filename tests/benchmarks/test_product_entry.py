@@ -0,0 +1,73 @@
+import time
+from typing import Any, Iterator
+from unittest.mock import patch
+
+import pytest
+
+from catalog_backend.dal.db_handler import _SingletonMeta
+from catalog_backend.dal.dynamo_dal_handler import DynamoDalHandler
+from catalog_backend.dal.models.db import ProductEntry
+from tests.benchmarks.utils import assert_within_baseline
+
+RUNS = 15
+BUILDS_PER_RUN = 10_000  # smaller batches are repeated so every run measures the same number of records
+PRODUCT: dict[str, Any] = {
+    'portfolio_id': 'port-abcdefgh12345',
+    'product_name': 'product',
+    'product_version': '1.0.0',
+    'account_id': '123456789012',
+    'consumer_name': 'consumer',
+    'region': 'us-east-1',
+}
+
+
+@pytest.fixture(scope='module')
+def handler() -> Iterator[DynamoDalHandler]:
+    # handlers are kept per constructor arguments, the benchmark gets a fresh one and leaves the others alone
+    with patch.dict(_SingletonMeta._instances, clear=True):
+        yield DynamoDalHandler('table')
+
+
+def _validated_item(handler: DynamoDalHandler, product_stack_id: str, request_id: str) -> dict:
+    # the previous write path, the values are validated again by ProductEntry and the model is dumped
+    entry = ProductEntry(
+        portfolio_id=PRODUCT['portfolio_id'],
+        product_stack_id=product_stack_id,
+        name=PRODUCT['product_name'],
+        version=PRODUCT['product_version'],
+        account_id=PRODUCT['account_id'],
+        consumer_name=PRODUCT['consumer_name'],
+        region=PRODUCT['region'],
+        created_at=handler._get_unix_time(),
+        request_id=request_id,
+    )
+    return handler._to_item(entry)
+
+
+def _fast_item(handler: DynamoDalHandler, product_stack_id: str, request_id: str) -> dict:
+    return handler._build_item(product_stack_id=product_stack_id, request_id=request_id, **PRODUCT)
+
+
+def _cpu_us_per_record(handler: DynamoDalHandler, build, records: int) -> float:
+    stack_ids = [f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-{index}' for index in range(records)]
+    repeats = max(1, BUILDS_PER_RUN // records)
+
+    def measure() -> float:
+        start = time.process_time_ns()
+        for _ in range(repeats):
+            for stack_id in stack_ids:
+                build(handler, stack_id, 'request-id')
+        return (time.process_time_ns() - start) / 1000 / (repeats * records)
+
+    # the fastest run is the least disturbed by other processes, the usual estimator for CPU bound microbenchmarks
+    return min(measure() for _ in range(RUNS))
+
+
+@pytest.mark.parametrize('records', [1, 100, 10_000])
+def test_item_build_cpu_time(handler, records):
+    validated = _cpu_us_per_record(handler, _validated_item, records)
+    fast = _cpu_us_per_record(handler, _fast_item, records)
+    print(f'\n{records} records: validated {validated:.2f}us/record, fast path {fast:.2f}us/record')
+
+    assert fast < validated
+    assert_within_baseline('product_entry', f'fast_path_us_per_record_{records}', fast)
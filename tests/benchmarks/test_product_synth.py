@@ -0,0 +1,56 @@
+import time
+
+from aws_cdk import App, Stack
+from aws_cdk import aws_servicecatalog as servicecatalog
+
+from cdk.catalog.products.registry import ProductManifest, ProductTemplateCache
+from tests.benchmarks.utils import assert_within_baseline
+
+PRODUCTS = 100
+MANIFEST = ProductManifest.model_validate(
+    {
+        'products': [
+            {
+                'id': f'Product{index}',
+                'name': f'Product {index}',
+                'description': 'benchmark product',
+                'stack': 'cicd',
+                'versions': [{'version': '1.0.0'}],
+            }
+            for index in range(PRODUCTS)
+        ]
+    }
+)
+
+
+def _synth_ms(cache_dir, products: int = PRODUCTS) -> float:
+    start = time.perf_counter()
+    app = App()
+    stack = Stack(app, 'product-synth-benchmark')
+    cache = ProductTemplateCache('service:ExportsOutputRefTopic', {'service': 'PlatformPortfolio'}, cache_dir=cache_dir)
+    for product in MANIFEST.products[:products]:
+        servicecatalog.CloudFormationProduct(
+            stack,
+            product.id,
+            product_name=product.name,
+            owner='Platform engineering',
+            product_versions=[
+                servicecatalog.CloudFormationProductVersion(
+                    cloud_formation_template=cache.template(product, version), product_version_name=version.version
+                )
+                for version in product.versions
+            ],
+        )
+    app.synth()
+    return (time.perf_counter() - start) * 1000
+
+
+def test_unchanged_products_are_not_synthesized_again(tmp_path):
+    _synth_ms(tmp_path / 'warmup', products=1)  # the first synth of a process starts the CDK runtime
+
+    cold = _synth_ms(tmp_path / 'cache')
+    warm = min(_synth_ms(tmp_path / 'cache') for _ in range(3))
+    print(f'\n{PRODUCTS} products: cold cache {cold:.0f}ms, warm cache {warm:.0f}ms')
+
+    assert warm < cold / 2
+    assert_within_baseline('product_synth', f'warm_ms_per_product_{PRODUCTS}', warm / PRODUCTS)
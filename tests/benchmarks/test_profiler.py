@@ -0,0 +1,61 @@
+import contextlib
+import time
+from typing import Iterator
+
+from catalog_backend.handlers.utils import profiler
+from catalog_backend.handlers.utils.profiler import InvocationProfiler
+from tests.benchmarks.utils import assert_relative
+
+RUNS = 15
+CALLS_PER_RUN = 20_000
+WORKLOAD_RUNS = 5
+WORKLOAD_SECONDS = 0.2
+
+
+@contextlib.contextmanager
+def _no_op(every_n: int, interval_ms: int, top_n: int, request_id: str) -> Iterator[None]:
+    # the cheapest context manager the handler could wrap an invocation in
+    yield
+
+
+def _us_per_call(sampled) -> float:
+    def measure() -> float:
+        start = time.perf_counter_ns()
+        for _ in range(CALLS_PER_RUN):
+            with sampled(every_n=0, interval_ms=5, top_n=15, request_id='request'):
+                pass
+        return (time.perf_counter_ns() - start) / 1000 / CALLS_PER_RUN
+
+    return min(measure() for _ in range(RUNS))
+
+
+def _iterations(profiled: bool, invocation_profiler: InvocationProfiler) -> int:
+    # iterations of a CPU bound stand in for an invocation in a fixed time, the worst case for a sampler that competes for the GIL
+    iterations = 0
+    end = time.perf_counter() + WORKLOAD_SECONDS
+    with invocation_profiler.sampled(every_n=1 if profiled else 0, interval_ms=5, top_n=15, request_id='benchmark'):
+        while time.perf_counter() < end:
+            sum(range(100))
+            iterations += 1
+    return iterations
+
+
+def test_profiler_off_overhead():
+    off = _us_per_call(InvocationProfiler().sampled)
+    no_op = _us_per_call(_no_op)
+    print(f'\nprofiling off: {off:.3f}us per invocation, no-op context manager {no_op:.3f}us')
+    assert off < 5  # microseconds, noise next to an invocation of milliseconds
+    # profiling off costs a comparison on top of entering a context manager
+    assert_relative('profiler.off_to_no_op', off, no_op, max_ratio=1.5)
+
+
+def test_profiler_on_overhead(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, 'PROFILE_DIR', tmp_path)
+    invocation_profiler = InvocationProfiler()
+
+    plain = max(_iterations(False, invocation_profiler) for _ in range(WORKLOAD_RUNS))
+    profiled = max(_iterations(True, invocation_profiler) for _ in range(WORKLOAD_RUNS))
+    slowdown = 100 * (plain - profiled) / plain
+    print(f'\nprofiling on at 5ms: {slowdown:.1f}% slower')
+
+    assert slowdown < 20
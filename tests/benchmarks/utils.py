@@ -0,0 +1,78 @@
+import contextlib
+import json
+import os
+import statistics
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Iterator
+
+BASELINE_FILE = Path(__file__).parent / 'baseline.json'
+# a result may be this many times slower than its baseline before the run fails, machines differ
+TOLERANCE = float(os.getenv('BENCHMARK_TOLERANCE', '1.5'))
+# set to rewrite the stored baseline with the results of the current run
+UPDATE_BASELINE = os.getenv('BENCHMARK_UPDATE_BASELINE', '').lower() in ('1', 'true')
+# the environment of the governance function, each harness adds its table and backend
+LAMBDA_ENV = {
+    'POWERTOOLS_SERVICE_NAME': 'PlatformPortfolio',
+    'POWERTOOLS_METRICS_NAMESPACE': 'PlatformEngineering',
+    'LOG_LEVEL': 'INFO',
+    'AWS_DEFAULT_REGION': 'us-east-1',
+}
+
+
+def median_of(runs: int, measure: Callable[[], float]) -> float:
+    return statistics.median(measure() for _ in range(runs))
+
+
+def assert_within_baseline(suite: str, name: str, value: float, lower_is_better: bool = True) -> None:
+    baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    print(f'{suite}.{name}: {value:.3f} (baseline {baseline.get(suite, {}).get(name)})')
+    if UPDATE_BASELINE:
+        baseline.setdefault(suite, {})[name] = round(value, 3)
+        BASELINE_FILE.write_text(json.dumps(baseline, indent=4, sort_keys=True) + '\n')
+        return
+    # a new or renamed benchmark must not record its own baseline in a normal run
+    assert name in baseline.get(suite, {}), f'{suite}.{name} has no baseline, run with BENCHMARK_UPDATE_BASELINE=1 to record it'
+    expected = baseline[suite][name]
+    if lower_is_better:
+        assert value <= expected * TOLERANCE, f'{suite}.{name} regressed: {value:.3f} > {expected} * {TOLERANCE}'
+    else:
+        assert value >= expected / TOLERANCE, f'{suite}.{name} regressed: {value:.3f} < {expected} / {TOLERANCE}'
+
+
+def assert_relative(name: str, value: float, reference: float, max_ratio: float) -> None:
+    """
+    For results of a few microseconds, an absolute baseline measures the machine more than the code.
+    The reference is measured in the same run, so the speed and load of the machine cancel out.
+    """
+    ratio = value / reference
+    print(f'{name}: {value:.3f} / {reference:.3f} = {ratio:.3f} (max {max_ratio})')
+    assert ratio <= max_ratio, f'{name} regressed: {value:.3f} is {ratio:.2f} times its in-run reference {reference:.3f}, max {max_ratio}'
+
+
+class _ResponseUrlHandler(BaseHTTPRequestHandler):
+    # stands in for the presigned S3 ResponseURL, accepts every response
+    protocol_version = 'HTTP/1.1'
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers['content-length']))
+        self.send_response(200)
+        self.send_header('content-length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@contextlib.contextmanager
+def response_server() -> Iterator[str]:
+    """Serves the response url on a local port for as long as the context is open"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ResponseUrlHandler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}/response'
+    finally:
+        server.shutdown()
+        server.server_close()
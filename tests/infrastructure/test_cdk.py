@@ -1,11 +1,15 @@
 from aws_cdk import App
-from aws_cdk.assertions import Template
+from aws_cdk.assertions import Match, Template
 
+from cdk.catalog.constants import API_HANDLER_LAMBDA_MEMORY_SIZE, ORGANIZATION_ID_CONTEXT
 from cdk.catalog.stack import ServiceStack
 
+ORGANIZATION_ID = 'o-test123456'
+
 
 def test_synthesizes_properly():
-    app = App()
+    # the organization id is passed as context, synth makes no AWS calls
+    app = App(context={ORGANIZATION_ID_CONTEXT: ORGANIZATION_ID})
 
     service_stack = ServiceStack(app, 'service-test')
 
@@ -15,3 +19,39 @@ def test_synthesizes_properly():
     template.resource_count_is('AWS::DynamoDB::GlobalTable', 1)  # main db
     template.resource_count_is('AWS::ServiceCatalog::CloudFormationProduct', 2)  # two products
     template.resource_count_is('AWS::ServiceCatalog::Portfolio', 1)  # one portfolio
+
+    # deployment inventory query indexes
+    template.has_resource_properties(
+        'AWS::DynamoDB::GlobalTable',
+        {
+            'GlobalSecondaryIndexes': Match.array_with(
+                [
+                    Match.object_like({'IndexName': 'account_id-index'}),
+                    Match.object_like({'IndexName': 'consumer_name-index'}),
+                    Match.object_like({'IndexName': 'name-version-index'}),
+                ]
+            )
+        },
+    )
+
+    # tombstones of deleted deployments expire
+    template.has_resource_properties('AWS::DynamoDB::GlobalTable', {'TimeToLiveSpecification': {'AttributeName': 'expires_at', 'Enabled': True}})
+
+    # only principals of the organization publish product events
+    template.has_resource_properties(
+        'AWS::SNS::TopicPolicy',
+        {
+            'PolicyDocument': {
+                'Statement': Match.array_with(
+                    [Match.object_like({'Action': 'sns:Publish', 'Condition': {'StringEquals': {'aws:PrincipalOrgID': ORGANIZATION_ID}}})]
+                )
+            }
+        },
+    )
+
+    # the product events queue outlives retried batches and failed records are redelivered alone
+    template.has_resource_properties('AWS::SQS::Queue', {'VisibilityTimeout': 185, 'RedrivePolicy': Match.object_like({'maxReceiveCount': 3})})
+    template.has_resource_properties('AWS::Lambda::EventSourceMapping', {'BatchSize': 10, 'FunctionResponseTypes': ['ReportBatchItemFailures']})
+
+    # the governance function keeps its default architecture and memory tier without context
+    template.has_resource_properties('AWS::Lambda::Function', {'Architectures': ['x86_64'], 'MemorySize': API_HANDLER_LAMBDA_MEMORY_SIZE})
@@ -0,0 +1,58 @@
+import sys
+from pathlib import Path
+
+from aws_cdk import App
+
+from cdk.catalog import constants
+from cdk.catalog.common_layer import CONTAINER_PATH, slim_layer
+from cdk.catalog.stack import ServiceStack
+from cdk.catalog.visibility_construct import SlimLayerHooks
+
+
+def _install(layer_dir: Path, distribution: str, files: dict[str, str]) -> None:
+    # lays out a distribution like pip install --target, its RECORD lists every file it installed
+    dist_info = f'{distribution}-1.0.0.dist-info'
+    for name, content in {**files, f'{dist_info}/METADATA': f'Name: {distribution}\n'}.items():
+        (layer_dir / name).parent.mkdir(parents=True, exist_ok=True)
+        (layer_dir / name).write_text(content)
+    (layer_dir / dist_info / 'RECORD').write_text(''.join(f'{name},,\n' for name in [*files, f'{dist_info}/METADATA', f'{dist_info}/RECORD']))
+
+
+def test_slim_layer_prunes_and_precompiles(tmp_path):
+    # Given: an installed layer with a runtime provided package, a stub package and a package the handler uses
+    _install(tmp_path, 'boto3', {'boto3/__init__.py': '', 'boto3/session.py': ''})
+    _install(tmp_path, 'mypy_boto3_dynamodb', {'mypy_boto3_dynamodb/__init__.pyi': ''})
+    _install(
+        tmp_path,
+        'cachetools',
+        {'cachetools/__init__.py': 'VALUE = 1\n', 'cachetools/__init__.pyi': '', 'cachetools/py.typed': '', 'cachetools/tests/test_cache.py': ''},
+    )
+    (tmp_path / 'bin').mkdir()
+    (tmp_path / 'bin' / 'jp.py').write_text('')
+    (tmp_path / 'requirements.txt').write_text('cachetools\n')
+
+    # When: the layer is slimmed
+    slim_layer(tmp_path)
+
+    # Then: only the used package is left, without its tests and stubs, and it is compiled to unchecked hash based pycs
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['cachetools', 'cachetools-1.0.0.dist-info']
+    assert sorted(path.name for path in (tmp_path / 'cachetools').iterdir()) == ['__init__.py', '__pycache__']
+    [pyc] = (tmp_path / 'cachetools' / '__pycache__').iterdir()
+    assert pyc.name == f'__init__.{sys.implementation.cache_tag}.pyc'
+    assert int.from_bytes(pyc.read_bytes()[4:8], 'little') == 0b01  # hash based, the source is not checked
+
+
+def test_slim_layer_hooks_run_in_bundling_container():
+    assert SlimLayerHooks().after_bundling('/asset-input', '/asset-output/python') == [
+        f'python {CONTAINER_PATH}/common_layer.py /asset-output/python'
+    ]
+    assert SlimLayerHooks().before_bundling('/asset-input', '/asset-output/python') == []
+
+
+def test_slim_layer_from_context():
+    app = App(context={constants.ORGANIZATION_ID_CONTEXT: 'o-test123456', constants.SLIM_COMMON_LAYER_CONTEXT: 'true'})
+
+    service_stack = ServiceStack(app, 'service-test')
+
+    assert service_stack.governance.slim_layer
+    assert not ServiceStack(App(context={constants.ORGANIZATION_ID_CONTEXT: 'o-test123456'}), 'service-test').governance.slim_layer
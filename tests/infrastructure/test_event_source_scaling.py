@@ -0,0 +1,50 @@
+import pytest
+
+from cdk.catalog import constants
+from cdk.catalog.visibility_construct import EventSourceScaling
+
+
+def test_defaults_are_derived_from_function_timeout():
+    scaling = EventSourceScaling()
+
+    assert scaling.queue_visibility_timeout(function_timeout=30) == 6 * 30 + constants.SQS_MAX_BATCHING_WINDOW
+    assert scaling.consumer_concurrency(record_workers=10) is None  # no cap without a write budget
+    assert scaling.report_batch_item_failures
+
+
+def test_write_budget_caps_concurrency():
+    # an invocation of 10 records with 10 workers writes at most 10 items every 10ms
+    assert EventSourceScaling(write_budget=5_000).consumer_concurrency(record_workers=10) == 5
+    # fewer workers write less per invocation, more invocations fit the same budget
+    assert EventSourceScaling(write_budget=5_000).consumer_concurrency(record_workers=1) == 50
+    # an explicit maximum still applies
+    assert EventSourceScaling(write_budget=5_000, max_concurrency=3).consumer_concurrency(record_workers=10) == 3
+    # the smallest budget that fits the event source minimum
+    assert EventSourceScaling(write_budget=2_000).consumer_concurrency(record_workers=10) == constants.SQS_MIN_CONCURRENCY
+
+
+def test_write_budget_below_minimum_concurrency_fails_at_synth():
+    # the event source runs at least two invocations, each writes up to 1000 items per second
+    with pytest.raises(ValueError, match='write_budget 10 must be at least 2000 writes per second'):
+        EventSourceScaling(write_budget=10).consumer_concurrency(record_workers=10)
+
+
+def test_visibility_timeout_must_cover_function_timeout():
+    assert EventSourceScaling(visibility_timeout=60).queue_visibility_timeout(function_timeout=30) == 60
+    with pytest.raises(ValueError, match='visibility_timeout'):
+        EventSourceScaling(visibility_timeout=20).queue_visibility_timeout(function_timeout=30)
+
+
+@pytest.mark.parametrize(
+    'options',
+    [
+        {'batch_size': 0},
+        {'batch_size': 20, 'max_batching_window': 0},
+        {'max_batching_window': 301},
+        {'max_concurrency': 1},
+        {'write_budget': 0},
+    ],
+)
+def test_invalid_options_fail_at_synth(options):
+    with pytest.raises(ValueError):
+        EventSourceScaling(**options)
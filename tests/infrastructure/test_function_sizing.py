@@ -0,0 +1,40 @@
+import pytest
+from aws_cdk import App
+from aws_cdk.assertions import Template
+
+from cdk.catalog import constants
+from cdk.catalog.stack import ServiceStack
+from cdk.catalog.visibility_construct import FunctionSizing
+
+
+def test_defaults():
+    sizing = FunctionSizing()
+
+    assert (sizing.architecture, sizing.memory_size) == (constants.API_HANDLER_LAMBDA_ARCHITECTURE, constants.API_HANDLER_LAMBDA_MEMORY_SIZE)
+
+
+@pytest.mark.parametrize('options', [{'architecture': 'arm'}, {'memory_size': 127}, {'memory_size': 10241}])
+def test_invalid_options_fail_at_synth(options):
+    with pytest.raises(ValueError):
+        FunctionSizing(**options)
+
+
+def test_arm64_function_and_layer_from_context():
+    # Given: the architecture and memory size passed as context, context values from the command line are strings
+    app = App(
+        context={
+            constants.ORGANIZATION_ID_CONTEXT: 'o-test123456',
+            constants.LAMBDA_ARCHITECTURE_CONTEXT: 'arm64',
+            constants.LAMBDA_MEMORY_SIZE_CONTEXT: '512',
+        }
+    )
+
+    # When: the service stack is synthesized
+    template = Template.from_stack(ServiceStack(app, 'service-test'))
+
+    # Then: the function runs on Graviton with its memory tier and the common layer is built for the same architecture
+    template.has_resource_properties(
+        'AWS::Lambda::Function',
+        {'Handler': 'catalog_backend.handlers.product_callback_handler.handle_product_event', 'Architectures': ['arm64'], 'MemorySize': 512},
+    )
+    template.has_resource_properties('AWS::Lambda::LayerVersion', {'CompatibleArchitectures': ['arm64']})
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+from aws_cdk import App, Environment, Stack
+
+from cdk.catalog import constants
+from cdk.catalog.utils import get_organization_id
+
+
+@pytest.fixture
+def context_file(tmp_path, monkeypatch):
+    context_file = tmp_path / 'cdk.context.json'
+    monkeypatch.setattr(constants, 'CONTEXT_FILE', str(context_file))
+    return context_file
+
+
+def _stack(context: dict) -> Stack:
+    return Stack(App(context=context), 'organization-test', env=Environment(account='123456789012', region='us-east-1'))
+
+
+def test_context_override_skips_lookup(context_file, mocker):
+    boto_client = mocker.patch('cdk.catalog.utils.boto3.client')
+
+    assert get_organization_id(_stack({constants.ORGANIZATION_ID_CONTEXT: 'o-override1234'})) == 'o-override1234'
+    boto_client.assert_not_called()
+    assert not context_file.exists()
+
+
+def test_lookup_is_cached_in_context_file(context_file, mocker):
+    # Given: a context file with other cached lookups
+    context_file.write_text(json.dumps({'availability-zones:account=123456789012:region=us-east-1': ['us-east-1a']}))
+    boto_client = mocker.patch('cdk.catalog.utils.boto3.client')
+    boto_client.return_value.describe_organization.return_value = {'Organization': {'Id': 'o-lookup12345'}}
+
+    # When: the organization is resolved by two synths
+    first = get_organization_id(_stack({}))
+    second = get_organization_id(_stack({}))
+
+    # Then: it was looked up once, cached by account next to the other entries
+    assert first == second == 'o-lookup12345'
+    assert boto_client.call_count == 1
+    assert json.loads(context_file.read_text()) == {
+        'availability-zones:account=123456789012:region=us-east-1': ['us-east-1a'],
+        'organization-id:account=123456789012': 'o-lookup12345',
+    }
+
+
+def test_cached_lookup_passed_by_cli(context_file, mocker):
+    # the CDK CLI passes the entries of cdk.context.json as context
+    boto_client = mocker.patch('cdk.catalog.utils.boto3.client')
+
+    assert get_organization_id(_stack({'organization-id:account=123456789012': 'o-cached12345'})) == 'o-cached12345'
+    boto_client.assert_not_called()
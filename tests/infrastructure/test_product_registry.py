@@ -0,0 +1,134 @@
+import json
+
+import pytest
+from aws_cdk import App, Stack
+from aws_cdk import aws_s3 as s3
+from aws_cdk import aws_servicecatalog as servicecatalog
+from aws_cdk.assertions import Template
+from pydantic import ValidationError
+
+from cdk.catalog.products import registry
+from cdk.catalog.products.registry import ProductManifest, ProductTemplateCache, load_manifest
+
+SERVICE_TOKEN_EXPORT = 'service:ExportsOutputRefTopic'
+TAGS = {'service': 'PlatformPortfolio', 'owner': 'test'}
+
+
+def _manifest(*versions: str, stack: str = 'cicd') -> ProductManifest:
+    return ProductManifest.model_validate(
+        {
+            'products': [
+                {
+                    'id': 'CiCdProduct',
+                    'name': 'CI/CD IAM Role Product',
+                    'description': 'An IAM role for CI/CD pipelines',
+                    'stack': stack,
+                    'versions': [{'version': version} for version in versions],
+                }
+            ]
+        }
+    )
+
+
+def test_shipped_manifest_is_valid():
+    manifest = load_manifest()
+
+    assert {product.id for product in manifest.products} == {'CiCdProduct', 'WafProduct'}
+
+
+def test_manifest_rejects_unknown_stack_and_duplicate_versions():
+    with pytest.raises(ValidationError, match='unknown stack'):
+        _manifest('1.0.0', stack='missing')
+    with pytest.raises(ValidationError, match='more than once'):
+        _manifest('1.0.0', '1.0.0')
+
+
+def test_product_templates_are_synthesized_once_per_content(tmp_path, mocker):
+    # Given: a product with two versions and an empty template cache
+    [product] = _manifest('1.0.0', '2.0.0').products
+    synthesize = mocker.spy(ProductTemplateCache, '_synthesize')
+    cache = ProductTemplateCache(SERVICE_TOKEN_EXPORT, TAGS, cache_dir=tmp_path)
+
+    # When: both versions are built by two synths
+    for _ in range(2):
+        for version in product.versions:
+            cache.template(product, version)
+
+    # Then: every version was synthesized once
+    assert synthesize.call_count == 2
+    templates = [json.loads(path.read_text()) for path in tmp_path.glob('*.template.json')]
+    versions = sorted(
+        resource['Properties']['product_version']
+        for template in templates
+        for resource in template['Resources'].values()
+        if 'product_version' in resource['Properties']
+    )
+    assert versions == ['1.0.0', '2.0.0']
+    custom_resource = next(resource for resource in templates[0]['Resources'].values() if 'product_version' in resource['Properties'])
+    assert custom_resource['Properties']['ServiceToken'] == {'Fn::ImportValue': SERVICE_TOKEN_EXPORT}
+
+    # And: a change of the inputs of a template is synthesized again
+    ProductTemplateCache(SERVICE_TOKEN_EXPORT, {**TAGS, 'owner': 'other'}, cache_dir=tmp_path).template(product, product.versions[0])
+    assert synthesize.call_count == 3
+
+
+class _UnencryptedBucketProduct(servicecatalog.ProductStack):
+    def __init__(self, scope, id: str, service_token: str, product_name: str, product_version: str) -> None:
+        super().__init__(scope, id)
+        s3.Bucket(self, 'Bucket')
+
+
+def test_product_template_failing_security_checks_is_not_cached(tmp_path, monkeypatch):
+    # Given: a product whose stack has a resource with an unsuppressed nag error
+    monkeypatch.setitem(registry.PRODUCT_STACKS, 'bucket', _UnencryptedBucketProduct)
+    [product] = _manifest('1.0.0', stack='bucket').products
+    cache = ProductTemplateCache(SERVICE_TOKEN_EXPORT, TAGS, cache_dir=tmp_path)
+
+    # When: its template is built
+    with pytest.raises(RuntimeError, match='AwsSolutions-S1'):
+        cache.template(product, product.versions[0])
+
+    # Then: no template was cached, the next build checks it again
+    assert not list(tmp_path.glob('*.template.json'))
+
+
+def test_product_template_hash_covers_every_cdk_module(tmp_path, monkeypatch):
+    [product] = _manifest('1.0.0').products
+    cache = ProductTemplateCache(SERVICE_TOKEN_EXPORT, TAGS, cache_dir=tmp_path)
+    package = tmp_path / 'cdk'
+    (package / 'catalog').mkdir(parents=True)
+    (package / 'catalog' / 'helpers.py').write_text('NAME = 1\n')
+    monkeypatch.setattr(registry, 'CDK_PACKAGE', package)
+    registry._sources_digest.cache_clear()
+    before = cache.content_hash(product, product.versions[0])
+
+    # a module no product stack is known to import changes
+    (package / 'catalog' / 'helpers.py').write_text('NAME = 2\n')
+    registry._sources_digest.cache_clear()
+    after = cache.content_hash(product, product.versions[0])
+    registry._sources_digest.cache_clear()  # the next test hashes the real package again
+
+    assert after != before
+
+
+def test_product_versions_are_declared_on_one_product(tmp_path):
+    [product] = _manifest('1.0.0', '2.0.0').products
+    stack = Stack(App(), 'registry-test')
+    cache = ProductTemplateCache(SERVICE_TOKEN_EXPORT, TAGS, cache_dir=tmp_path)
+
+    servicecatalog.CloudFormationProduct(
+        stack,
+        product.id,
+        product_name=product.name,
+        owner='Platform engineering',
+        product_versions=[
+            servicecatalog.CloudFormationProductVersion(
+                cloud_formation_template=cache.template(product, version), product_version_name=version.version
+            )
+            for version in product.versions
+        ],
+    )
+
+    template = Template.from_stack(stack).find_resources('AWS::ServiceCatalog::CloudFormationProduct')
+    [cfn_product] = template.values()
+    assert [artifact['Name'] for artifact in cfn_product['Properties']['ProvisioningArtifactParameters']] == ['1.0.0', '2.0.0']
@@ -0,0 +1,31 @@
+import pytest
+from aws_cdk import App, Stack
+from aws_cdk.assertions import Template
+
+from cdk.catalog import constants
+from cdk.catalog.visibility_db_construct import TABLE_INDEXES, VisibilityDbConstruct
+
+
+def _index_names(index_count):
+    stack = Stack(App(), 'table-indexes-test')
+    VisibilityDbConstruct(stack, 'db', index_count=index_count)
+    [table] = Template.from_stack(stack).find_resources('AWS::DynamoDB::GlobalTable').values()
+    return [index['IndexName'] for index in table['Properties'].get('GlobalSecondaryIndexes', [])]
+
+
+def test_every_index_by_default():
+    assert _index_names(None) == [constants.ACCOUNT_ID_INDEX, constants.CONSUMER_NAME_INDEX, constants.PRODUCT_INDEX]
+
+
+def test_indexes_are_added_one_per_deployment():
+    # every step of the staged rollout adds a single index to the previous deployment
+    steps = [_index_names(index_count) for index_count in range(len(TABLE_INDEXES) + 1)]
+
+    for previous, current in zip(steps, steps[1:], strict=False):
+        assert current[: len(previous)] == previous and len(current) == len(previous) + 1
+
+
+@pytest.mark.parametrize('index_count', [-1, len(TABLE_INDEXES) + 1])
+def test_invalid_index_count_fails_at_synth(index_count):
+    with pytest.raises(ValueError):
+        VisibilityDbConstruct(Stack(App(), 'table-indexes-test'), 'db', index_count=index_count)
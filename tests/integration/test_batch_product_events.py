@@ -0,0 +1,151 @@
+import json
+
+import boto3
+
+from tests.integration.utils import (
+    NEW_RESOURCE_PROPERTIES,
+    RESOURCE_PROPERTIES,
+    call_handle_product_event,
+    create_product_body,
+    create_sqs_records,
+    mock_cfn_response,
+)
+from tests.utils import generate_random_string
+
+
+def test_batch_reports_only_malformed_records(mocker, table_name, portfolio_id):
+    product_stack_id = f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-yuqxzldfdagkq/{generate_random_string(12)}'
+    event = create_sqs_records('not a json body', create_product_body('Create', product_stack_id, RESOURCE_PROPERTIES))
+    cfn_response_mock = mock_cfn_response(mocker)
+    response = call_handle_product_event(event)
+
+    # only the malformed record is returned for redelivery
+    assert response['batchItemFailures'] == [{'itemIdentifier': event['Records'][0]['messageId']}]
+
+    # the valid record was answered and saved
+    body = json.loads(cfn_response_mock.call_args[1]['body'])
+    assert body['Status'] == 'SUCCESS'
+    dynamodb_table = boto3.resource('dynamodb').Table(table_name)
+    response = dynamodb_table.get_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
+    assert response['Item']['product_stack_id'] == product_stack_id
+    dynamodb_table.delete_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
+
+
+def test_batch_all_records_processed(mocker, table_name, portfolio_id):
+    product_stack_ids = [
+        f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-yuqxzldfdagkq/{generate_random_string(12)}' for _ in range(3)
+    ]
+    event = create_sqs_records(*[create_product_body('Create', stack_id, RESOURCE_PROPERTIES) for stack_id in product_stack_ids])
+    mock_cfn_response(mocker)
+    response = call_handle_product_event(event)
+    assert response['batchItemFailures'] == []
+
+    dynamodb_table = boto3.resource('dynamodb').Table(table_name)
+    for product_stack_id in product_stack_ids:
+        response = dynamodb_table.get_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
+        assert response['Item']['product_stack_id'] == product_stack_id
+        dynamodb_table.delete_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
+
+
+def test_batch_reports_records_with_undelivered_response(mocker, table_name, portfolio_id):
+    product_stack_id = f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-yuqxzldfdagkq/{generate_random_string(12)}'
+    event = create_sqs_records(create_product_body('Create', product_stack_id, RESOURCE_PROPERTIES))
+    cfn_response_mock = mock_cfn_response(mocker)
+    cfn_response_mock.return_value = 503  # the response url endpoint keeps failing
+    mocker.patch('catalog_backend.handlers.utils.cfn_response.time.sleep')
+    response = call_handle_product_event(event)
+
+    # the record is redelivered so CloudFormation can still be answered
+    assert response['batchItemFailures'] == [{'itemIdentifier': event['Records'][0]['messageId']}]
+    dynamodb_table = boto3.resource('dynamodb').Table(table_name)
+    dynamodb_table.delete_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
+
+
+def test_concurrent_batch_keeps_stack_order(mocker, monkeypatch, table_name, portfolio_id):
+    # Given: concurrent record workers and a batch that creates, updates and deletes one stack next to creates of other stacks
+    monkeypatch.setenv('RECORD_WORKERS', '4')
+    monkeypatch.setenv('LAMBDA_ENV_MODELER_DISABLE_CACHE', 'true')
+    stack_id, *other_stack_ids = [
+        f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-yuqxzldfdagkq/{generate_random_string(12)}' for _ in range(4)
+    ]
+    event = create_sqs_records(
+        create_product_body('Create', stack_id, RESOURCE_PROPERTIES),
+        *[create_product_body('Create', other_stack_id, RESOURCE_PROPERTIES) for other_stack_id in other_stack_ids],
+        create_product_body('Update', stack_id, NEW_RESOURCE_PROPERTIES, RESOURCE_PROPERTIES),
+        create_product_body('Delete', stack_id, NEW_RESOURCE_PROPERTIES),
+    )
+    cfn_response_mock = mock_cfn_response(mocker)
+
+    # When: the batch is processed
+    response = call_handle_product_event(event)
+
+    # Then: every record is answered and the stack's requests were applied in order, so it ends up deleted
+    assert response['batchItemFailures'] == []
+    assert cfn_response_mock.call_count == 6
+    dynamodb_table = boto3.resource('dynamodb').Table(table_name)
+    assert dynamodb_table.get_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': stack_id})['Item']['deleted']  # only its tombstone is left
+    for other_stack_id in other_stack_ids:
+        assert 'Item' in dynamodb_table.get_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': other_stack_id})
+        dynamodb_table.delete_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': other_stack_id})
+
+
+def test_batch_coalesces_writes_of_a_stack(mocker, table_name, portfolio_id):
+    # Given: a batch that creates a stack and updates it right after
+    product_stack_id = f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-yuqxzldfdagkq/{generate_random_string(12)}'
+    event = create_sqs_records(
+        create_product_body('Create', product_stack_id, RESOURCE_PROPERTIES),
+        create_product_body('Update', product_stack_id, NEW_RESOURCE_PROPERTIES, RESOURCE_PROPERTIES),
+    )
+    cfn_response_mock = mock_cfn_response(mocker)
+    from catalog_backend.dal.dynamo_dal_handler import DynamoDalHandler  # imported after the environment is set, like the handler
+
+    add_spy = mocker.spy(DynamoDalHandler, 'add_product_deployment')
+    update_spy = mocker.spy(DynamoDalHandler, 'update_product_deployment')
+
+    # When: the batch is processed
+    response = call_handle_product_event(event)
+
+    # Then: both requests are answered and the stack is written once with its latest properties
+    assert response['batchItemFailures'] == []
+    assert [json.loads(call.kwargs['body'])['Status'] for call in cfn_response_mock.call_args_list] == ['SUCCESS', 'SUCCESS']
+    assert add_spy.call_count == 1
+    assert update_spy.call_count == 0
+    dynamodb_table = boto3.resource('dynamodb').Table(table_name)
+    item = dynamodb_table.get_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})['Item']
+    assert item['version'] == NEW_RESOURCE_PROPERTIES['product_version']
+    dynamodb_table.delete_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
+
+
+def test_batch_answers_failed_write_with_failure(mocker, table_name, portfolio_id):
+    # Given: a create whose buffered write fails
+    product_stack_id = f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-yuqxzldfdagkq/{generate_random_string(12)}'
+    event = create_sqs_records(create_product_body('Create', product_stack_id, RESOURCE_PROPERTIES))
+    cfn_response_mock = mock_cfn_response(mocker)
+    mocker.patch('catalog_backend.dal.dynamo_dal_handler.DynamoDalHandler.add_product_deployment', side_effect=RuntimeError('throttled'))
+
+    # When: the batch is processed
+    response = call_handle_product_event(event)
+
+    # Then: CloudFormation is told the request failed
+    assert response['batchItemFailures'] == []
+    body = json.loads(cfn_response_mock.call_args.kwargs['body'])
+    assert (body['Status'], body['Reason']) == ('FAILED', 'throttled')
+
+
+def test_delayed_request_does_not_undo_newer_write(mocker, table_name, portfolio_id):
+    # Given: a stack written by a request that SQS received at 1716017284863
+    product_stack_id = f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-yuqxzldfdagkq/{generate_random_string(12)}'
+    mock_cfn_response(mocker)
+    call_handle_product_event(create_sqs_records(create_product_body('Create', product_stack_id, RESOURCE_PROPERTIES)))
+
+    # When: a delete that was sent earlier is delivered after it
+    delayed = create_sqs_records(create_product_body('Delete', product_stack_id, RESOURCE_PROPERTIES))
+    delayed['Records'][0]['attributes']['SentTimestamp'] = '1716017280000'
+    response = call_handle_product_event(delayed)
+
+    # Then: the stale delete is answered but the newer entry is kept
+    assert response['batchItemFailures'] == []
+    dynamodb_table = boto3.resource('dynamodb').Table(table_name)
+    item = dynamodb_table.get_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})['Item']
+    assert item['event_time'] == 1716017284863
+    dynamodb_table.delete_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
@@ -1,14 +1,15 @@
+import json
 from datetime import datetime, timezone
 
 import boto3
 
 from tests.integration.utils import (
     RESOURCE_PROPERTIES,
-    assert_crhelper_response,
+    assert_cfn_response,
     call_handle_product_event,
     create_product_body,
     create_sqs_records,
-    mock_crhelper,
+    mock_cfn_response,
 )
 from tests.utils import generate_random_string
 
@@ -16,9 +17,9 @@ from tests.utils import generate_random_string
 def test_create_product_success(mocker, table_name, portfolio_id):
     product_stack_id = f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-yuqxzldfdagkq/{generate_random_string(12)}'
     event = create_sqs_records(create_product_body('Create', product_stack_id, RESOURCE_PROPERTIES))
-    crhelper_mock = mock_crhelper(mocker)
+    cfn_response_mock = mock_cfn_response(mocker)
     call_handle_product_event(event)
-    assert_crhelper_response(success=True, crhelper_mock=crhelper_mock)
+    assert_cfn_response(success=True, cfn_response_mock=cfn_response_mock)
 
     # check that product is in dynamoDB after create event
     dynamodb_table = boto3.resource('dynamodb').Table(table_name)
@@ -47,6 +48,22 @@ def _assert_db_item(item: dict, portfolio_id: str, product_stack_id: str):
 
 def test_create_product_failure_empty_resource_props_body_input(mocker):
     event = create_sqs_records(create_product_body('Create', 'aaaa', {}))
-    crhelper_mock = mock_crhelper(mocker)
+    cfn_response_mock = mock_cfn_response(mocker)
     call_handle_product_event(event)
-    assert_crhelper_response(success=False, crhelper_mock=crhelper_mock)
+    assert_cfn_response(success=False, cfn_response_mock=cfn_response_mock)
+
+
+def test_create_product_redelivery_is_not_written_or_answered_twice(mocker, table_name, portfolio_id):
+    product_stack_id = f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-yuqxzldfdagkq/{generate_random_string(12)}'
+    event = create_sqs_records(create_product_body('Create', product_stack_id, RESOURCE_PROPERTIES))
+    cfn_response_mock = mock_cfn_response(mocker)
+    call_handle_product_event(event)
+    # SQS delivers the same message again
+    call_handle_product_event(event)
+
+    # the request is answered once and the entry holds the request that wrote it
+    assert_cfn_response(success=True, cfn_response_mock=cfn_response_mock)
+    dynamodb_table = boto3.resource('dynamodb').Table(table_name)
+    response = dynamodb_table.get_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
+    assert response['Item']['request_id'] == json.loads(event['Records'][0]['body'])['RequestId']
+    dynamodb_table.delete_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
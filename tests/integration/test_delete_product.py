@@ -2,11 +2,11 @@ import boto3
 
 from tests.integration.utils import (
     RESOURCE_PROPERTIES,
-    assert_crhelper_response,
+    assert_cfn_response,
     call_handle_product_event,
     create_product_body,
     create_sqs_records,
-    mock_crhelper,
+    mock_cfn_response,
 )
 from tests.utils import generate_random_string
 
@@ -19,7 +19,9 @@ def _check_db_entry_exists(table_name: str, portfolio_id: str, product_stack_id:
             'product_stack_id': product_stack_id,
         }
     )
-    return response.get('Item', None)
+    # a delete leaves a tombstone of the stack, which isn't a deployment
+    item = response.get('Item', None)
+    return item is not None and 'deleted' not in item
 
 
 def _add_db_entry(table_name: str, portfolio_id: str, product_stack_id: str):
@@ -47,9 +49,9 @@ def test_delete_product_success(mocker, table_name, portfolio_id):
 
     # create delete event
     event = create_sqs_records(create_product_body('Delete', product_stack_id, RESOURCE_PROPERTIES))
-    crhelper_mock = mock_crhelper(mocker)
+    cfn_response_mock = mock_cfn_response(mocker)
     call_handle_product_event(event)
-    assert_crhelper_response(success=True, crhelper_mock=crhelper_mock)
+    assert_cfn_response(success=True, cfn_response_mock=cfn_response_mock)
 
     # check that product is deleted from dynamoDB after delete event
     assert not _check_db_entry_exists(table_name, portfolio_id, product_stack_id)
@@ -57,6 +59,6 @@ def test_delete_product_success(mocker, table_name, portfolio_id):
 
 def test_delete_product_failure_empty_resource_props_body_input(mocker):
     event = create_sqs_records(create_product_body('Delete', 'aaaa', {}))
-    crhelper_mock = mock_crhelper(mocker)
+    cfn_response_mock = mock_cfn_response(mocker)
     call_handle_product_event(event)
-    assert_crhelper_response(success=False, crhelper_mock=crhelper_mock)
+    assert_cfn_response(success=False, cfn_response_mock=cfn_response_mock)
@@ -5,11 +5,11 @@ import boto3
 from tests.integration.utils import (
     NEW_RESOURCE_PROPERTIES,
     RESOURCE_PROPERTIES,
-    assert_crhelper_response,
+    assert_cfn_response,
     call_handle_product_event,
     create_product_body,
     create_sqs_records,
-    mock_crhelper,
+    mock_cfn_response,
 )
 from tests.utils import generate_random_string
 
@@ -50,9 +50,9 @@ def test_update_product_success(mocker, table_name, portfolio_id):
 
     # create update event
     event = create_sqs_records(create_product_body('Update', product_stack_id, NEW_RESOURCE_PROPERTIES, RESOURCE_PROPERTIES))
-    crhelper_mock = mock_crhelper(mocker)
+    cfn_response_mock = mock_cfn_response(mocker)
     call_handle_product_event(event)
-    assert_crhelper_response(success=True, crhelper_mock=crhelper_mock)
+    assert_cfn_response(success=True, cfn_response_mock=cfn_response_mock)
 
     dynamodb_table = boto3.resource('dynamodb').Table(table_name)
     response = dynamodb_table.get_item(
@@ -68,16 +68,34 @@ def test_update_product_success(mocker, table_name, portfolio_id):
     assert item['region'] == NEW_RESOURCE_PROPERTIES['region']
     assert item['portfolio_id'] == portfolio_id
     assert item['product_stack_id'] == product_stack_id
-    assert item['created_at'] is not None
+    assert item['created_at'] == 1234567890  # an update keeps the creation time
     now = int(datetime.now(timezone.utc).timestamp())
-    assert now - int(item['created_at']) <= 60  # assume item was created in last minute, check that utc time calc is correct
+    assert now - int(item['updated_at']) <= 60  # assume item was updated in last minute, check that utc time calc is correct
 
     # delete entry
     response = dynamodb_table.delete_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
 
 
+def test_update_product_unchanged_properties(mocker, table_name, portfolio_id):
+    # Given: a deployed product
+    product_stack_id = f'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-yuqxzldfdagkq/{generate_random_string(12)}'
+    _add_db_entry(table_name, portfolio_id, product_stack_id)
+
+    # When: a stack update resends the same product properties
+    event = create_sqs_records(create_product_body('Update', product_stack_id, RESOURCE_PROPERTIES, RESOURCE_PROPERTIES))
+    cfn_response_mock = mock_cfn_response(mocker)
+    call_handle_product_event(event)
+
+    # Then: the update succeeds without writing the entry
+    assert_cfn_response(success=True, cfn_response_mock=cfn_response_mock)
+    dynamodb_table = boto3.resource('dynamodb').Table(table_name)
+    item = dynamodb_table.get_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})['Item']
+    assert 'updated_at' not in item
+    dynamodb_table.delete_item(Key={'portfolio_id': portfolio_id, 'product_stack_id': product_stack_id})
+
+
 def test_update_product_failure_empty_resource_props_body_input(mocker):
     event = create_sqs_records(create_product_body('Update', 'aaaaaa', NEW_RESOURCE_PROPERTIES, {}))
-    crhelper_mock = mock_crhelper(mocker)
+    cfn_response_mock = mock_cfn_response(mocker)
     call_handle_product_event(event)
-    assert_crhelper_response(success=False, crhelper_mock=crhelper_mock)
+    assert_cfn_response(success=False, cfn_response_mock=cfn_response_mock)
@@ -1,4 +1,5 @@
 import json
+import uuid
 from typing import Any, Optional
 from unittest.mock import ANY, MagicMock
 
@@ -11,21 +12,14 @@ def call_handle_product_event(event: dict[str, Any]) -> dict[str, Any]:
     return handle_product_event(event, generate_context())
 
 
-def mock_crhelper(mocker) -> MagicMock:
-    # crhelper.utils.HTTPSConnection.getresponse: mock the response for the crhelper.utils.HTTPSConnection.request
-    crhelper_getresponse_mock = mocker.patch('crhelper.utils.HTTPSConnection.getresponse')
-    # crhelper expects reason field in response
-    crhelper_getresponse_mock.return_value.reason = 'ok'
+def mock_cfn_response(mocker) -> MagicMock:
+    # CfnResponseSender._put: mock the HTTP PUT of the response to the custom resource presigned url
+    return mocker.patch('catalog_backend.handlers.utils.cfn_response.CfnResponseSender._put', return_value=200)
 
-    # crhelper.utils.HTTPSConnection.request: mock the class used by crhelper to send responses to the custom resource
-    crhelper_send_response_mock = mocker.patch('crhelper.utils.HTTPSConnection.request')
-    return crhelper_send_response_mock
 
-
-def assert_crhelper_response(success: bool, crhelper_mock: MagicMock):
-    assert crhelper_mock.call_count == 2
-    actual_call_args = crhelper_mock.call_args[1]
-    body = json.loads(actual_call_args['body'])
+def assert_cfn_response(success: bool, cfn_response_mock: MagicMock):
+    assert cfn_response_mock.call_count == 1
+    body = json.loads(cfn_response_mock.call_args.kwargs['body'])
     if success:
         assert body['Status'] == 'SUCCESS'
     else:
@@ -39,7 +33,7 @@ def create_product_body(request_type: str, stack_id: str, resource_properties: d
         'ServiceToken': 'arn:aws:sns:us-east-1:123456789012:ranisenberg-custom-PlatformCatalog-dev-GovernanceCatalogTopic',
         'ResponseURL': 'https://cloudformation-custom-resource-response-useast1.s3.amazonaws.com/arn%3Aaws%3Acloudformation%3Aus-east-1%3A123456789012%3Astack/SC-123456789012-pp-yuqxzldfdagkq/1dbb0a20-14e8-11ef-a95c-0eaa9ec0a8b1%7CPlatformGovernanceCustomResource%7Ccc5ad960-e179-4f71-8fdc-3513cdc604a8?X-Amz-Algorithm=AWS4-HMAC-SHA256&X-Amz-Date=20240518T072804Z&X-Amz-SignedHeaders=host&X-Amz-Expires=7200&X-Amz-Credential=Afdsfdsfs0518%2Fus-east-1%2Fs3%2Faws4_request&X-Amz-Signature=3f4fgdgdfgfdg',
         'StackId': stack_id,
-        'RequestId': 'cc5ad960-e179-4f71-8fdc-3513cdc604a8',
+        'RequestId': str(uuid.uuid4()),
         'LogicalResourceId': 'PlatformGovernanceCustomResource',
         'PhysicalResourceId': 'unique-physical-resource-id',
         'ResourceType': 'Custom::PlatformEngGovernanceEnabler',
@@ -50,11 +44,11 @@ def create_product_body(request_type: str, stack_id: str, resource_properties: d
     return json.dumps(body)
 
 
-def create_sqs_records(body: str) -> dict:
+def create_sqs_records(*bodies: str) -> dict:
     return {
         'Records': [
             {
-                'messageId': '428bfb11-fda9-4299-9f16-b215d0deb1a3',
+                'messageId': str(uuid.uuid4()),
                 'receiptHandle': 'AQEB2mXyP3uOkgsIMNWwbVjc6f+4bJDVPG2T+iROmjKnjcMRPHzpYaPbCgPmIH/Tt2lX2EcXD7BHHnBG9O/N2etG9FwxY0gt7tLn6kK0LcnOyKn43PeUlFn5HPUn6bY2VE3TycfPQjm7xK8FHANs6+0l61YuL/EtW8SOp5tayfTfo0TmAsBZhgWUIFEAzec7Q4QePsfgerNzRSifow6qvNy3M0Txn98VlUyih7Ettd/j00X7tTlAT1f7EFwDB2jsQOTAOGTmFRJsAivBnvHxtzZIAiwSIIluzqlK3gna88iLpkuCM/dWFdIKMaU+E65y5ZfGLzNRq8JEwPRoj4pPcxtv6jiPHJ3+XMp9KhGcxvYU4Huxr4KGujKghCf8S9lJb/YXJm1xHpSWZdJAQSwjBk3nYpZ+K/JC7hYG/HQH8h1RbTKVOo2U7eIuAWRvx1dv2esYNiqfjrsTojBJec9MVx31fg==',
                 'body': body,
                 'attributes': {
@@ -69,6 +63,7 @@ def create_sqs_records(body: str) -> dict:
                 'eventSourceARN': 'arn:aws:sqs:us-east-1:123456789012:ranisenberg-custom-PlatformCatalog-dev-GovernanceCatalogSQS',
                 'awsRegion': 'us-east-1',
             }
+            for body in bodies
         ]
     }
 
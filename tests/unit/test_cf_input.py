@@ -1,7 +1,16 @@
+import json
+
 import pytest
 from pydantic import ValidationError
 
-from catalog_backend.models.input import ProductCreateEventModel, ProductDeleteEventModel, ProductModel, ProductUpdateEventModel
+from catalog_backend.models.input import (
+    PRODUCT_EVENT_ADAPTER,
+    ProductCreateEventModel,
+    ProductDeleteEventModel,
+    ProductModel,
+    ProductUpdateEventModel,
+)
+from tests.integration.utils import NEW_RESOURCE_PROPERTIES, RESOURCE_PROPERTIES, create_product_body
 
 
 # Test cases for ProductModel
@@ -229,3 +238,33 @@ def test_product_update_event_model_invalid_resource_type():
     with pytest.raises(ValidationError):
         ProductUpdateEventModel(**invalid_event_data)
         # Explanation: We expect a ValidationError because 'LogicalResourceId' must be 'PlatformGovernanceCustomResource'.
+
+
+@pytest.mark.parametrize(
+    'request_type, old_resource_properties, model',
+    [
+        ('Create', None, ProductCreateEventModel),
+        ('Update', RESOURCE_PROPERTIES, ProductUpdateEventModel),
+        ('Delete', None, ProductDeleteEventModel),
+    ],
+)
+def test_product_event_adapter_selects_model_by_request_type(request_type, old_resource_properties, model):
+    # Given: a raw request body of each request type
+    body = create_product_body(request_type, 'stack-1', NEW_RESOURCE_PROPERTIES, old_resource_properties)
+
+    # When: validating it in a single pass
+    event = PRODUCT_EVENT_ADAPTER.validate_json(body)
+
+    # Then: it is validated by the model of its request type, like validating the parsed body with that model
+    assert type(event) is model
+    assert event == model.model_validate(json.loads(body))
+
+
+def test_product_event_adapter_invalid_request_type():
+    # Given: a request type no product model handles
+    body = create_product_body('Replace', 'stack-1', RESOURCE_PROPERTIES)
+
+    # When/Then: it is rejected without trying every model
+    with pytest.raises(ValidationError) as exc_info:
+        PRODUCT_EVENT_ADAPTER.validate_json(body)
+    assert exc_info.value.errors()[0]['type'] == 'union_tag_invalid'
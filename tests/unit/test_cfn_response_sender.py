@@ -0,0 +1,157 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+
+from catalog_backend.handlers.utils.cfn_response import REASON_TAIL_LENGTH, TRUNCATED_REASON_PREFIX, CfnResponseSender
+from catalog_backend.models.output import CfnResponseModel
+
+
+class _ResponseUrlStandIn(BaseHTTPRequestHandler):
+    # local stand-in for the presigned S3 ResponseURL, keeps connections alive like S3 does
+    protocol_version = 'HTTP/1.1'
+
+    def do_PUT(self):  # noqa: N802
+        body = self.rfile.read(int(self.headers['content-length']))
+        server = self.server
+        with server.lock:
+            server.received.append({'path': self.path, 'body': json.loads(body)})
+            server.client_ports.add(self.client_address[1])
+            status = server.statuses.pop(0) if server.statuses else 200
+        self.send_response(status)
+        self.send_header('content-length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):  # noqa: A002
+        return
+
+
+@pytest.fixture
+def server() -> Iterator[ThreadingHTTPServer]:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _ResponseUrlStandIn)
+    server.lock = threading.Lock()  # type: ignore[attr-defined]
+    server.statuses = []  # type: ignore[attr-defined]
+    server.received = []  # type: ignore[attr-defined]
+    server.client_ports = set()  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _response(request_id: str) -> CfnResponseModel:
+    return CfnResponseModel(
+        Status='SUCCESS',
+        PhysicalResourceId=request_id,
+        StackId='arn:aws:cloudformation:us-east-1:123456789012:stack/stack-name/guid',
+        RequestId=request_id,
+        LogicalResourceId='PlatformGovernanceCustomResource',
+    )
+
+
+def _url(server: ThreadingHTTPServer, request_id: str) -> str:
+    return f'http://127.0.0.1:{server.server_address[1]}/response/{request_id}?X-Amz-Signature=abc'
+
+
+def test_send_batch_delivers_all_responses(server):
+    # Given: a batch of responses
+    sender = CfnResponseSender(max_workers=4)
+    responses = [(_url(server, f'request-{index}'), _response(f'request-{index}')) for index in range(20)]
+
+    # When: sending them
+    delivered = sender.send(responses)
+
+    # Then: every response is delivered to its own url with the CloudFormation response body
+    assert delivered == [True] * 20
+    assert sorted(item['path'] for item in server.received) == sorted(f'/response/request-{index}?X-Amz-Signature=abc' for index in range(20))
+    assert {item['body']['Status'] for item in server.received} == {'SUCCESS'}
+    # keep-alive connections are reused, at most one connection per worker
+    assert len(server.client_ports) <= 4
+
+
+def test_send_reuses_connection_across_calls(server):
+    sender = CfnResponseSender(max_workers=2)
+    for index in range(5):
+        assert sender.send([(_url(server, f'request-{index}'), _response(f'request-{index}'))]) == [True]
+    assert len(server.client_ports) == 1
+
+
+def test_send_retries_server_errors(server, mocker):
+    mocker.patch('catalog_backend.handlers.utils.cfn_response.time.sleep')
+    server.statuses.extend([500, 503])
+    sender = CfnResponseSender(max_attempts=3)
+
+    assert sender.send([(_url(server, 'request'), _response('request'))]) == [True]
+    assert len(server.received) == 3
+
+
+def test_send_gives_up_after_max_attempts(server, mocker):
+    mocker.patch('catalog_backend.handlers.utils.cfn_response.time.sleep')
+    server.statuses.extend([500, 500, 500])
+    sender = CfnResponseSender(max_attempts=3)
+
+    assert sender.send([(_url(server, 'request'), _response('request'))]) == [False]
+    assert len(server.received) == 3
+
+
+def test_send_does_not_retry_rejected_url(server):
+    # an expired presigned url is rejected by S3 with 403
+    server.statuses.append(403)
+    sender = CfnResponseSender()
+
+    assert sender.send([(_url(server, 'request'), _response('request'))]) == [False]
+    assert len(server.received) == 1
+
+
+def test_send_truncates_long_reason(server):
+    # Given: a failed response with a reason far over what CloudFormation accepts in a response body
+    reason = 'validation error ' * 500 + 'the end'
+    response = _response('request').model_copy(update={'status': 'FAILED', 'reason': reason})
+    sender = CfnResponseSender()
+
+    # When: it is sent
+    assert sender.send([(_url(server, 'request'), response)]) == [True]
+
+    # Then: the end of the reason is kept behind a truncation marker and the body stays small
+    sent_reason = server.received[0]['body']['Reason']
+    assert sent_reason == f'{TRUNCATED_REASON_PREFIX}{reason[-REASON_TAIL_LENGTH:]}'
+    assert sent_reason.endswith('the end')
+    assert len(json.dumps(server.received[0]['body'])) < 4096
+
+
+def test_send_fails_on_unreachable_endpoint(mocker):
+    mocker.patch('catalog_backend.handlers.utils.cfn_response.time.sleep')
+    sender = CfnResponseSender(max_attempts=2, timeout=0.5)
+
+    assert sender.send([('http://127.0.0.1:1/response?X-Amz-Signature=abc', _response('request'))]) == [False]
+
+
+def test_delivered_requests_are_remembered(server, mocker):
+    mocker.patch('catalog_backend.handlers.utils.cfn_response.time.sleep')
+    server.statuses.extend([500, 500, 500])
+    sender = CfnResponseSender(max_attempts=3)
+
+    # a response that was not delivered can be sent again on redelivery
+    assert sender.send([(_url(server, 'request-1'), _response('request-1'))]) == [False]
+    assert not sender.is_delivered('request-1')
+    assert sender.send([(_url(server, 'request-1'), _response('request-1'))]) == [True]
+    assert sender.is_delivered('request-1')
+
+
+def test_send_timed_returns_delivery_and_duration_per_response(server):
+    # Given: a response to a reachable url and one to an unreachable endpoint
+    sender = CfnResponseSender(max_workers=2)
+    responses = [
+        (_url(server, 'request-1'), _response('request-1')),
+        ('http://127.0.0.1:1/response?X-Amz-Signature=abc', _response('request-2')),
+    ]
+
+    # When: they are sent
+    sent = sender.send_timed(responses)
+
+    # Then: every response has its delivery and how long it took, in the order of the batch
+    assert [is_delivered for is_delivered, _ in sent] == [True, False]
+    assert all(seconds > 0 for _, seconds in sent)
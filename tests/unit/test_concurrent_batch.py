@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+
+from aws_lambda_powertools.utilities.batch import EventType
+
+from catalog_backend.handlers.utils.batch import OrderedConcurrentBatchProcessor
+from catalog_backend.handlers.utils.observability import append_record_keys, clear_record_keys, logger
+
+
+def _record(message_id: str, stack_id: str) -> dict:
+    return {'messageId': message_id, 'body': json.dumps({'StackId': stack_id}), 'attributes': {}, 'messageAttributes': {}}
+
+
+def _stack_id(record: dict) -> str:
+    return json.loads(record['body'])['StackId']
+
+
+def _process(processor: OrderedConcurrentBatchProcessor, records: list[dict], handler) -> list[tuple]:
+    with processor(records=records, handler=handler):
+        return processor.process()
+
+
+def test_records_of_a_stack_keep_their_order():
+    # Given: interleaved records of two stacks and a handler that finishes the first records last
+    records = [_record(f'{stack}-{index}', stack) for index in range(3) for stack in ('a', 'b')]
+    processed: list[str] = []
+    lock = threading.Lock()
+
+    def handler(record: dict) -> str:
+        time.sleep(0.03 - 0.01 * int(record['messageId'][-1]))
+        with lock:
+            processed.append(record['messageId'])
+        return record['messageId']
+
+    # When: processing them with more workers than stacks
+    processor = OrderedConcurrentBatchProcessor(event_type=EventType.SQS, group_key=_stack_id, max_workers=4)
+    results = _process(processor, records, handler)
+
+    # Then: each stack is processed in batch order and the results keep the batch order
+    assert [message_id for message_id in processed if message_id.startswith('a')] == ['a-0', 'a-1', 'a-2']
+    assert [message_id for message_id in processed if message_id.startswith('b')] == ['b-0', 'b-1', 'b-2']
+    assert [result for _, result, _ in results] == [record['messageId'] for record in records]
+
+
+def test_stacks_are_processed_concurrently():
+    records = [_record(f'{stack}-0', stack) for stack in ('a', 'b', 'c', 'd')]
+    barrier = threading.Barrier(len(records), timeout=2)
+
+    # every record waits for all the others, this only completes when all of them run at the same time
+    processor = OrderedConcurrentBatchProcessor(event_type=EventType.SQS, group_key=_stack_id, max_workers=4)
+    results = _process(processor, records, lambda record: barrier.wait())
+
+    assert [status for status, _, _ in results] == ['success'] * 4
+
+
+def test_failures_are_reported_per_record():
+    records = [_record('a-0', 'a'), _record('a-1', 'a'), _record('b-0', 'b')]
+
+    def handler(record: dict) -> None:
+        if record['messageId'] == 'a-0':
+            raise ValueError('failed')
+
+    processor = OrderedConcurrentBatchProcessor(event_type=EventType.SQS, group_key=_stack_id, max_workers=4)
+    _process(processor, records, handler)
+
+    # a failed record doesn't stop the next records of its stack
+    assert processor.response() == {'batchItemFailures': [{'itemIdentifier': 'a-0'}]}
+
+
+def test_record_log_keys_are_scoped_to_the_thread(caplog):
+    # Given: a key appended by a worker thread
+    worker = threading.Thread(target=append_record_keys, kwargs={'stack_id': 'worker-stack'})
+    worker.start()
+    worker.join()
+
+    # When: logging in this thread
+    append_record_keys(stack_id='main-stack')
+    logger.info('record log line')
+    clear_record_keys()
+    logger.info('after the record')
+
+    # Then: only this thread's key is logged, and only until cleared
+    record_line, cleared_line = caplog.records[-2:]
+    assert record_line.stack_id == 'main-stack'
+    assert not hasattr(cleared_line, 'stack_id')
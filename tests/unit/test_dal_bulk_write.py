@@ -0,0 +1,86 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from catalog_backend.dal.dynamo_dal_handler import DynamoDalHandler, UnprocessedItemsError
+from catalog_backend.dal.models.db import ProductEntry
+
+TABLE_NAME = 'table'
+
+
+def _entry(product_stack_id: str, version: str = '1.0.0') -> ProductEntry:
+    return ProductEntry(
+        portfolio_id='portfolio',
+        product_stack_id=product_stack_id,
+        name='product',
+        version=version,
+        account_id='123456789012',
+        consumer_name='consumer',
+        region='us-east-1',
+        created_at=1234567890,
+    )
+
+
+@pytest.fixture
+def table(mocker) -> MagicMock:
+    table = MagicMock()
+    table.name = TABLE_NAME
+    table.meta.client.batch_write_item.return_value = {'UnprocessedItems': {}}
+    mocker.patch.object(DynamoDalHandler, '_get_db_handler', return_value=table)
+    mocker.patch('catalog_backend.dal.dynamo_dal_handler.time.sleep')
+    return table
+
+
+def _sent_requests(table: MagicMock) -> list[list[dict]]:
+    return [call.kwargs['RequestItems'][TABLE_NAME] for call in table.meta.client.batch_write_item.call_args_list]
+
+
+def test_add_product_deployments_splits_to_chunks_of_25(table):
+    # Given: 60 unique entries
+    entries = [_entry(f'stack-{index}') for index in range(60)]
+
+    # When: saving them in bulk
+    DynamoDalHandler(TABLE_NAME).add_product_deployments(entries)
+
+    # Then: three BatchWriteItem requests are sent with all the items
+    assert [len(chunk) for chunk in _sent_requests(table)] == [25, 25, 10]
+
+
+def test_add_product_deployments_last_entry_of_key_wins(table):
+    # Given: two entries for the same key
+    entries = [_entry('stack-1', '1.0.0'), _entry('stack-2'), _entry('stack-1', '2.0.0')]
+
+    # When: saving them in bulk
+    DynamoDalHandler(TABLE_NAME).add_product_deployments(entries)
+
+    # Then: a single put is sent for the duplicated key with the latest entry
+    requests = _sent_requests(table)[0]
+    assert len(requests) == 2
+    assert requests[0]['PutRequest']['Item']['version'] == '2.0.0'
+
+
+def test_delete_product_deployments_removes_duplicate_ids(table):
+    DynamoDalHandler(TABLE_NAME).delete_product_deployments('portfolio', ['stack-1', 'stack-2', 'stack-1'])
+
+    requests = _sent_requests(table)[0]
+    assert [request['DeleteRequest']['Key']['product_stack_id'] for request in requests] == ['stack-1', 'stack-2']
+
+
+def test_unprocessed_items_are_retried(table):
+    # Given: the first call leaves one item unprocessed
+    unprocessed = {TABLE_NAME: [{'DeleteRequest': {'Key': {'portfolio_id': 'portfolio', 'product_stack_id': 'stack-2'}}}]}
+    table.meta.client.batch_write_item.side_effect = [{'UnprocessedItems': unprocessed}, {'UnprocessedItems': {}}]
+
+    # When: deleting in bulk
+    DynamoDalHandler(TABLE_NAME).delete_product_deployments('portfolio', ['stack-1', 'stack-2'])
+
+    # Then: only the unprocessed item is sent again
+    assert _sent_requests(table)[1] == unprocessed[TABLE_NAME]
+
+
+def test_unprocessed_items_raise_after_max_attempts(table):
+    unprocessed = {TABLE_NAME: [{'DeleteRequest': {'Key': {'portfolio_id': 'portfolio', 'product_stack_id': 'stack-1'}}}]}
+    table.meta.client.batch_write_item.return_value = {'UnprocessedItems': unprocessed}
+
+    with pytest.raises(UnprocessedItemsError):
+        DynamoDalHandler(TABLE_NAME).delete_product_deployments('portfolio', ['stack-1'])
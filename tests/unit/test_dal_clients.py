@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+from unittest.mock import MagicMock
+
+import pytest
+
+from catalog_backend.dal import dynamo_clients
+from catalog_backend.dal.db_handler import _SingletonMeta
+from catalog_backend.dal.dynamo_dal_handler import DynamoDalHandler
+
+
+@pytest.fixture
+def session(mocker) -> Iterator[MagicMock]:
+    session = MagicMock()
+    mocker.patch('boto3.session.Session', return_value=session)
+    mocker.patch.object(dynamo_clients, '_session', None)
+    dynamo_clients.clear()
+    yield session
+    dynamo_clients.clear()
+
+
+def test_table_is_built_once_per_table_and_region(session):
+    # Given: the same table is requested twice and another table of the same region once
+    first = dynamo_clients.get_table('table-1')
+    again = dynamo_clients.get_table('table-1')
+    dynamo_clients.get_table('table-2')
+
+    # Then: both tables share the region client, the table resource is reused
+    assert first is again
+    session.resource.assert_called_once()
+
+
+def test_threads_get_their_own_table_on_one_client(monkeypatch):
+    # boto3 resources aren't thread safe, the low level client is
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    dynamo_clients.clear()
+    table = dynamo_clients.get_table('table')
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        worker_table = executor.submit(dynamo_clients.get_table, 'table').result()
+
+    assert worker_table is not table
+    assert worker_table.meta.client is table.meta.client
+    assert worker_table.name == 'table'
+    dynamo_clients.clear()
+
+
+def test_other_region_gets_its_own_client(session):
+    dynamo_clients.get_table('table', 'us-east-1')
+    dynamo_clients.get_table('table', 'eu-west-1')
+
+    assert [call.kwargs['region_name'] for call in session.resource.call_args_list] == ['us-east-1', 'eu-west-1']
+
+
+def test_client_config(session):
+    dynamo_clients.get_table('table')
+
+    config = session.resource.call_args.kwargs['config']
+    assert config.tcp_keepalive is True
+    assert config.max_pool_connections == dynamo_clients.MAX_POOL_CONNECTIONS
+    assert config.retries == {'mode': 'adaptive', 'max_attempts': dynamo_clients.MAX_ATTEMPTS}
+    assert config.connect_timeout == dynamo_clients.CONNECT_TIMEOUT
+    assert config.read_timeout == dynamo_clients.READ_TIMEOUT
+
+
+def test_handler_instance_per_constructor_arguments(mocker):
+    mocker.patch.dict(_SingletonMeta._instances, clear=True)
+
+    # the same arguments, positional, keyword or default, map to the same instance
+    handler = DynamoDalHandler('table-1')
+    assert DynamoDalHandler('table-1', 1) is handler
+    assert DynamoDalHandler(table_name='table-1', portfolio_shards=1, region=None) is handler
+    # another table is another handler
+    other = DynamoDalHandler('table-2')
+    assert other is not handler
+    assert other.table_name == 'table-2'
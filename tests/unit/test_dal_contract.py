@@ -0,0 +1,293 @@
+"""
+The DalHandler contract: every backend must pass the same cases.
+DynamoDB runs against a moto table with the global secondary indexes of the CDK table definition.
+"""
+
+from typing import TYPE_CHECKING, Iterator
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from catalog_backend.dal import dynamo_clients, get_dal_handler
+from catalog_backend.dal.db_handler import DalHandler, _SingletonMeta
+from catalog_backend.dal.dynamo_dal_handler import ACCOUNT_ID_INDEX, CONSUMER_NAME_INDEX, PRODUCT_INDEX, DynamoDalHandler
+from catalog_backend.dal.models.db import ProductEntry
+
+if TYPE_CHECKING:
+    from mypy_boto3_dynamodb.type_defs import GlobalSecondaryIndexTypeDef
+
+TABLE_NAME = 'contract-governance'
+PORTFOLIO_ID = 'portfolio'
+
+
+def _create_table() -> None:
+    def index(name: str, partition_key: str, sort_key: str) -> 'GlobalSecondaryIndexTypeDef':
+        return {
+            'IndexName': name,
+            'KeySchema': [{'AttributeName': partition_key, 'KeyType': 'HASH'}, {'AttributeName': sort_key, 'KeyType': 'RANGE'}],
+            'Projection': {'ProjectionType': 'ALL'},
+        }
+
+    boto3.client('dynamodb').create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{'AttributeName': 'portfolio_id', 'KeyType': 'HASH'}, {'AttributeName': 'product_stack_id', 'KeyType': 'RANGE'}],
+        AttributeDefinitions=[
+            {'AttributeName': attribute, 'AttributeType': 'S'}
+            for attribute in ('portfolio_id', 'product_stack_id', 'account_id', 'consumer_name', 'name', 'version')
+        ],
+        GlobalSecondaryIndexes=[
+            index(ACCOUNT_ID_INDEX, 'account_id', 'product_stack_id'),
+            index(CONSUMER_NAME_INDEX, 'consumer_name', 'product_stack_id'),
+            index(PRODUCT_INDEX, 'name', 'version'),
+        ],
+        BillingMode='PAY_PER_REQUEST',
+    )
+
+
+@pytest.fixture(params=[('memory', 1), ('dynamodb', 1), ('dynamodb', 4)], ids=['memory', 'dynamodb', 'dynamodb-sharded'])
+def dal_handler(request, mocker, monkeypatch) -> Iterator[DalHandler]:
+    backend, portfolio_shards = request.param
+    mocker.patch.dict(_SingletonMeta._instances, clear=True)
+    get_dal_handler.cache_clear()
+    if backend == 'memory':
+        yield get_dal_handler(TABLE_NAME, portfolio_shards, backend)
+        return
+    for key, value in {'AWS_DEFAULT_REGION': 'us-east-1', 'AWS_ACCESS_KEY_ID': 'testing', 'AWS_SECRET_ACCESS_KEY': 'testing'}.items():
+        monkeypatch.setenv(key, value)
+    with mock_aws():
+        dynamo_clients.clear()  # clients built outside of the mock must not be reused
+        _create_table()
+        yield get_dal_handler(TABLE_NAME, portfolio_shards, backend)
+        dynamo_clients.clear()
+    get_dal_handler.cache_clear()
+
+
+def _product(product_stack_id: str, **overrides: str) -> dict:
+    return {
+        'portfolio_id': PORTFOLIO_ID,
+        'product_stack_id': product_stack_id,
+        'product_name': 'product',
+        'product_version': '1.0.0',
+        'account_id': '123456789012',
+        'consumer_name': 'consumer',
+        'region': 'us-east-1',
+        **overrides,
+    }
+
+
+def _entry(product_stack_id: str, **overrides: str) -> ProductEntry:
+    return ProductEntry.model_validate(
+        {
+            'portfolio_id': PORTFOLIO_ID,
+            'product_stack_id': product_stack_id,
+            'name': 'product',
+            'version': '1.0.0',
+            'account_id': '123456789012',
+            'consumer_name': 'consumer',
+            'region': 'us-east-1',
+            'created_at': 1234567890,
+            **overrides,
+        }
+    )
+
+
+def _stack_ids(entries: Iterator[ProductEntry]) -> list[str]:
+    return [entry.product_stack_id for entry in entries]
+
+
+def test_add_and_get_product_deployment(dal_handler):
+    dal_handler.add_product_deployment(**_product('stack-1'), request_id='request-1')
+
+    entry = dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1')
+
+    assert entry is not None
+    assert (entry.portfolio_id, entry.name, entry.request_id) == (PORTFOLIO_ID, 'product', 'request-1')
+    assert dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-2') is None
+
+
+def test_update_overwrites_product_deployment(dal_handler):
+    # Given: a deployed product
+    dal_handler.add_product_deployment(**_product('stack-1'), request_id='request-1')
+
+    # When: a newer request updates it
+    dal_handler.update_product_deployment(**_product('stack-1', product_version='2.0.0', account_id='210987654321'), request_id='request-2')
+
+    # Then: the entry and every index hold only the new values
+    entry = dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1')
+    assert entry is not None and entry.version == '2.0.0'
+    assert entry.updated_at is not None and entry.updated_at >= entry.created_at
+    assert _stack_ids(dal_handler.list_deployments_by_account('123456789012')) == []
+    assert _stack_ids(dal_handler.list_deployments_by_account('210987654321')) == ['stack-1']
+    assert _stack_ids(dal_handler.list_deployments_by_product('product', '1.0.0')) == []
+
+
+def test_partial_update_keeps_other_attributes(dal_handler):
+    # Given: an entry created long ago
+    dal_handler.add_product_deployments([_entry('stack-1', request_id='request-1')])
+
+    # When: an update changes only the version, the other values passed along are ignored
+    dal_handler.update_product_deployment(
+        **_product('stack-1', product_version='2.0.0', region='eu-west-1'), request_id='request-2', changed_properties=['product_version']
+    )
+
+    # Then: the creation time and the unchanged attributes are kept
+    entry = dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1')
+    assert entry is not None
+    assert (entry.version, entry.region, entry.created_at, entry.request_id) == ('2.0.0', 'us-east-1', 1234567890, 'request-2')
+
+
+def test_update_of_missing_entry_writes_whole_entry(dal_handler):
+    dal_handler.update_product_deployment(
+        **_product('stack-1', product_version='2.0.0'), request_id='request-1', changed_properties=['product_version']
+    )
+
+    entry = dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1')
+    assert entry is not None
+    assert (entry.version, entry.account_id, entry.updated_at) == ('2.0.0', '123456789012', None)
+
+
+def test_duplicate_request_is_written_once(dal_handler):
+    # Given: a request that was already written
+    dal_handler.add_product_deployment(**_product('stack-1'), request_id='request-1')
+
+    # When: it is delivered again with other values
+    dal_handler.add_product_deployment(**_product('stack-1', product_version='2.0.0'), request_id='request-1')
+
+    # Then: the first write is kept
+    entry = dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1')
+    assert entry is not None and entry.version == '1.0.0'
+
+
+def test_delete_product_deployment(dal_handler):
+    dal_handler.add_product_deployment(**_product('stack-1'), request_id='request-1')
+
+    dal_handler.delete_product_deployment(PORTFOLIO_ID, 'stack-1', request_id='request-2')
+    dal_handler.delete_product_deployment(PORTFOLIO_ID, 'stack-missing', request_id='request-3')  # deleting a missing entry is not an error
+
+    assert dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1') is None
+    assert _stack_ids(dal_handler.list_deployments_by_portfolio(PORTFOLIO_ID)) == []
+
+
+def test_stale_requests_do_not_overwrite_newer_entry(dal_handler):
+    # Given: an entry written by a request sent at 2000
+    dal_handler.add_product_deployment(**_product('stack-1', product_version='2.0.0'), request_id='request-2', event_time=2000)
+
+    # When: requests sent earlier are delivered late
+    dal_handler.add_product_deployment(**_product('stack-1'), request_id='request-1', event_time=1000)
+    dal_handler.update_product_deployment(**_product('stack-1', product_version='1.5.0'), request_id='request-3', event_time=1500)
+    dal_handler.delete_product_deployment(PORTFOLIO_ID, 'stack-1', request_id='request-4', event_time=1999)
+
+    # Then: the newer entry is kept
+    entry = dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1')
+    assert entry is not None
+    assert (entry.version, entry.request_id, entry.event_time) == ('2.0.0', 'request-2', 2000)
+
+
+def test_requests_sent_at_the_same_time_or_later_are_written(dal_handler):
+    dal_handler.add_product_deployment(**_product('stack-1'), request_id='request-1', event_time=1000)
+
+    dal_handler.update_product_deployment(**_product('stack-1', product_version='2.0.0'), request_id='request-2', event_time=1000)
+    entry = dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1')
+    assert entry is not None and (entry.version, entry.event_time) == ('2.0.0', 1000)
+
+    dal_handler.delete_product_deployment(PORTFOLIO_ID, 'stack-1', request_id='request-3', event_time=3000)
+    assert dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1') is None
+
+
+def test_late_create_of_deleted_stack_is_skipped(dal_handler):
+    # Given: a stack that was deleted by a request sent at 2000
+    dal_handler.add_product_deployment(**_product('stack-1'), request_id='request-1', event_time=1000)
+    dal_handler.delete_product_deployment(PORTFOLIO_ID, 'stack-1', request_id='request-2', event_time=2000)
+
+    # When: a create and an update sent before the delete are delivered late
+    dal_handler.add_product_deployment(**_product('stack-1'), request_id='request-3', event_time=1500)
+    dal_handler.update_product_deployment(**_product('stack-1', product_version='2.0.0'), request_id='request-4', event_time=1999)
+
+    # Then: the deployment stays deleted and its tombstone is never returned
+    assert dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1') is None
+    assert _stack_ids(dal_handler.list_deployments_by_portfolio(PORTFOLIO_ID)) == []
+    assert _stack_ids(dal_handler.list_deployments_by_account('123456789012')) == []
+    assert [entries for segment in range(2) for entries, _ in dal_handler.scan_deployments(segment, 2)] == [[], []]
+
+    # And: a create sent after the delete writes the stack again
+    dal_handler.add_product_deployment(**_product('stack-1'), request_id='request-5', event_time=3000)
+    entry = dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1')
+    assert entry is not None and (entry.request_id, entry.event_time) == ('request-5', 3000)
+
+
+def test_update_after_delete_writes_whole_entry(dal_handler):
+    dal_handler.add_product_deployment(**_product('stack-1'), request_id='request-1', event_time=1000)
+    dal_handler.delete_product_deployment(PORTFOLIO_ID, 'stack-1', request_id='request-2', event_time=2000)
+
+    dal_handler.update_product_deployment(
+        **_product('stack-1', product_version='2.0.0'), request_id='request-3', changed_properties=['product_version'], event_time=3000
+    )
+
+    entry = dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1')
+    assert entry is not None and (entry.version, entry.account_id, entry.event_time) == ('2.0.0', '123456789012', 3000)
+    assert _stack_ids(dal_handler.list_deployments_by_product('product', '2.0.0')) == ['stack-1']
+
+
+def test_bulk_add_and_delete(dal_handler):
+    dal_handler.add_product_deployments([_entry(f'stack-{index:02d}') for index in range(30)] + [_entry('stack-00', version='2.0.0')])
+
+    dal_handler.delete_product_deployments(PORTFOLIO_ID, [f'stack-{index:02d}' for index in range(10, 30)])
+
+    # the last entry of a key wins
+    assert _stack_ids(dal_handler.list_deployments_by_portfolio(PORTFOLIO_ID, page_size=3)) == [f'stack-{index:02d}' for index in range(10)]
+    entry = dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-00')
+    assert entry is not None and entry.version == '2.0.0'
+
+
+def test_bulk_delete_removes_unmigrated_entries(dal_handler):
+    if not isinstance(dal_handler, DynamoDalHandler) or dal_handler.portfolio_shards == 1:
+        pytest.skip('only a sharded table has entries under the unsharded key')
+    # Given: stack-1 was written before the portfolio was sharded, stack-2 after
+    DynamoDalHandler(TABLE_NAME, 1).add_product_deployments([_entry('stack-1')])
+    dal_handler.add_product_deployments([_entry('stack-2')])
+    assert _stack_ids(dal_handler.list_deployments_by_portfolio(PORTFOLIO_ID)) == ['stack-1', 'stack-2']
+
+    # When: both are deleted in bulk
+    dal_handler.delete_product_deployments(PORTFOLIO_ID, ['stack-1', 'stack-2'])
+
+    # Then: neither is returned anymore
+    assert dal_handler.get_product_deployment(PORTFOLIO_ID, 'stack-1') is None
+    assert _stack_ids(dal_handler.list_deployments_by_portfolio(PORTFOLIO_ID)) == []
+
+
+def test_list_deployments_by_secondary_attributes(dal_handler):
+    # Given: deployments of two accounts, consumers and product versions, inserted out of order
+    dal_handler.add_product_deployments(
+        [
+            _entry('stack-3', account_id='111111111111', consumer_name='team-a', version='2.0.0'),
+            _entry('stack-1', account_id='111111111111', consumer_name='team-b', version='1.0.0'),
+            _entry('stack-2', account_id='222222222222', consumer_name='team-a', version='1.0.0'),
+            _entry('stack-4', name='other'),
+        ]
+    )
+
+    # Then: every lookup returns only its matches, sorted like the table and index sort keys
+    assert _stack_ids(dal_handler.list_deployments_by_portfolio(PORTFOLIO_ID, page_size=2)) == ['stack-1', 'stack-2', 'stack-3', 'stack-4']
+    assert _stack_ids(dal_handler.list_deployments_by_account('111111111111', page_size=1)) == ['stack-1', 'stack-3']
+    assert _stack_ids(dal_handler.list_deployments_by_consumer('team-a')) == ['stack-2', 'stack-3']
+    assert sorted(_stack_ids(dal_handler.list_deployments_by_product('product'))) == ['stack-1', 'stack-2', 'stack-3']
+    assert [entry.version for entry in dal_handler.list_deployments_by_product('product')] == ['1.0.0', '1.0.0', '2.0.0']
+    assert _stack_ids(dal_handler.list_deployments_by_product('product', '2.0.0')) == ['stack-3']
+    assert _stack_ids(dal_handler.list_deployments_by_consumer('team-missing')) == []
+
+
+def test_scan_segments_cover_every_deployment_once(dal_handler):
+    dal_handler.add_product_deployments([_entry(f'stack-{index:02d}') for index in range(25)])
+
+    scanned: list[str] = []
+    for segment in range(3):
+        exclusive_start_key = None
+        # resume every segment after each page like an interrupted export does
+        while True:
+            entries, exclusive_start_key = next(dal_handler.scan_deployments(segment, 3, exclusive_start_key, page_size=4))
+            scanned.extend(_stack_ids(iter(entries)))
+            if exclusive_start_key is None:
+                break
+
+    assert sorted(scanned) == [f'stack-{index:02d}' for index in range(25)]
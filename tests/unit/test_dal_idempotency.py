@@ -0,0 +1,145 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from catalog_backend.dal.dynamo_dal_handler import DynamoDalHandler
+from catalog_backend.dal.models.db import ProductEntry
+
+TABLE_NAME = 'table'
+PRODUCT = {
+    'portfolio_id': 'portfolio',
+    'product_stack_id': 'stack',
+    'product_name': 'product',
+    'product_version': '1.0.0',
+    'account_id': '123456789012',
+    'consumer_name': 'consumer',
+    'region': 'us-east-1',
+}
+
+
+class ConditionalCheckFailedException(Exception):
+    pass
+
+
+@pytest.fixture
+def table(mocker) -> MagicMock:
+    table = MagicMock()
+    table.meta.client.exceptions.ConditionalCheckFailedException = ConditionalCheckFailedException
+    mocker.patch.object(DynamoDalHandler, '_get_db_handler', return_value=table)
+    handler = DynamoDalHandler(TABLE_NAME)
+    handler._written_requests.clear()
+    return table
+
+
+def test_add_product_deployment_is_a_conditional_write(table):
+    DynamoDalHandler(TABLE_NAME).add_product_deployment(**PRODUCT, request_id='request-1')
+
+    kwargs = table.put_item.call_args.kwargs
+    assert kwargs['Item']['request_id'] == 'request-1'
+    assert kwargs['ExpressionAttributeValues'] == {':request_id': 'request-1'}
+
+
+def test_duplicate_request_is_written_once(table):
+    # Given: a request that was already written by this execution environment
+    handler = DynamoDalHandler(TABLE_NAME)
+    handler.add_product_deployment(**PRODUCT, request_id='request-1')
+
+    # When: the same request is delivered again
+    handler.add_product_deployment(**PRODUCT, request_id='request-1')
+    handler.update_product_deployment(**PRODUCT, request_id='request-1')
+
+    # Then: no additional write is sent
+    assert table.put_item.call_count == 1
+
+
+def test_request_written_by_previous_delivery_is_skipped(table):
+    # Given: another execution environment already wrote the request, the failed condition returns the existing item
+    table.update_item.side_effect = ConditionalCheckFailedException()
+    table.update_item.side_effect.response = {'Item': {'request_id': {'S': 'request-1'}}}
+    handler = DynamoDalHandler(TABLE_NAME)
+
+    # When/Then: the failed condition is a duplicate, not an error, and the request is remembered
+    handler.update_product_deployment(**PRODUCT, request_id='request-1')
+    handler.update_product_deployment(**PRODUCT, request_id='request-1')
+    assert table.update_item.call_count == 1
+    table.put_item.assert_not_called()
+
+
+def test_update_writes_only_changed_attributes(table):
+    DynamoDalHandler(TABLE_NAME).update_product_deployment(**PRODUCT, request_id='request-1', changed_properties=['product_version'])
+
+    # created_at and the unchanged attributes are not part of the update
+    kwargs = table.update_item.call_args.kwargs
+    assert set(kwargs['ExpressionAttributeNames'].values()) == {'version', 'updated_at', 'request_id'}
+    assert kwargs['ExpressionAttributeValues'][':version'] == '1.0.0'
+    assert 'attribute_exists(product_stack_id)' in kwargs['ConditionExpression']
+    table.put_item.assert_not_called()
+
+
+def test_update_of_missing_entry_writes_whole_entry(table):
+    # Given: no entry to update, the failed condition returns no item
+    table.update_item.side_effect = ConditionalCheckFailedException()
+    table.update_item.side_effect.response = {}
+
+    # When: updating it
+    DynamoDalHandler(TABLE_NAME).update_product_deployment(**PRODUCT, request_id='request-1', changed_properties=['product_version'])
+
+    # Then: the entry is written with all its attributes
+    item = table.put_item.call_args.kwargs['Item']
+    assert (item['name'], item['account_id'], item['request_id']) == ('product', '123456789012', 'request-1')
+
+
+def test_duplicate_delete_is_skipped(table):
+    handler = DynamoDalHandler(TABLE_NAME)
+    handler.delete_product_deployment('portfolio', 'stack', request_id='request-1')
+    handler.delete_product_deployment('portfolio', 'stack', request_id='request-1')
+    assert table.delete_item.call_count == 1
+
+
+def test_failed_write_is_not_remembered(table):
+    table.put_item.side_effect = [RuntimeError('throttled'), None]
+    handler = DynamoDalHandler(TABLE_NAME)
+
+    with pytest.raises(RuntimeError):
+        handler.add_product_deployment(**PRODUCT, request_id='request-1')
+    handler.add_product_deployment(**PRODUCT, request_id='request-1')
+    assert table.put_item.call_count == 2
+
+
+def test_fast_path_item_matches_product_entry_schema(table):
+    # Given: the item written without building a ProductEntry
+    DynamoDalHandler(TABLE_NAME).add_product_deployment(**PRODUCT, request_id='request-1', event_time=1716017284863)
+    item = table.put_item.call_args.kwargs['Item']
+
+    # Then: it is exactly what the validated model would have written, a new entry was never updated
+    assert item == ProductEntry.model_validate(item).model_dump(exclude_none=True)
+    assert list(item) == [field for field in ProductEntry.model_fields if field != 'updated_at']
+
+
+@pytest.mark.parametrize('key', [{'portfolio_id': 'p' * 41}, {'product_stack_id': 's' * 201}, {'product_stack_id': ''}])
+def test_fast_path_checks_key_lengths(table, key):
+    # the keys aren't constrained by the input model, the fast path keeps the ProductEntry length checks
+    with pytest.raises(ValueError, match=next(iter(key))):
+        DynamoDalHandler(TABLE_NAME).add_product_deployment(**{**PRODUCT, **key}, request_id='request-1')
+    table.put_item.assert_not_called()
+
+
+def test_writes_with_event_time_are_conditioned_on_it(table):
+    handler = DynamoDalHandler(TABLE_NAME)
+    handler.add_product_deployment(**PRODUCT, request_id='request-1', event_time=2000)
+    handler.update_product_deployment(**PRODUCT, request_id='request-2', changed_properties=['product_version'], event_time=3000)
+    handler.delete_product_deployment('portfolio', 'stack', request_id='request-3', event_time=4000)
+
+    # the delete replaces the entry with a tombstone that keeps its event time
+    put, tombstone = (call.kwargs for call in table.put_item.call_args_list)
+    update = table.update_item.call_args.kwargs
+    assert (put['Item']['event_time'], put['ExpressionAttributeValues'][':event_time']) == (2000, 2000)
+    assert update['ExpressionAttributeValues'][':event_time'] == 3000
+    assert (tombstone['Item']['deleted'], tombstone['Item']['event_time'], tombstone['ExpressionAttributeValues'][':event_time']) == (
+        True,
+        4000,
+        4000,
+    )
+    assert set(tombstone['Item']) == {'portfolio_id', 'product_stack_id', 'deleted', 'request_id', 'event_time', 'expires_at'}
+    assert table.delete_item.call_count == 0
+    assert all('event_time <= :event_time' in kwargs['ConditionExpression'] for kwargs in (put, update, tombstone))
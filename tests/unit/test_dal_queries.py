@@ -0,0 +1,85 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from catalog_backend.dal.dynamo_dal_handler import ACCOUNT_ID_INDEX, PRODUCT_INDEX, DynamoDalHandler
+
+TABLE_NAME = 'table'
+
+
+def _item(product_stack_id: str) -> dict:
+    return {
+        'portfolio_id': 'portfolio',
+        'product_stack_id': product_stack_id,
+        'name': 'product',
+        'version': '1.0.0',
+        'account_id': '123456789012',
+        'consumer_name': 'consumer',
+        'region': 'us-east-1',
+        'created_at': 1234567890,
+    }
+
+
+@pytest.fixture
+def table(mocker) -> MagicMock:
+    table = MagicMock()
+    table.name = TABLE_NAME
+    mocker.patch.object(DynamoDalHandler, '_get_db_handler', return_value=table)
+    return table
+
+
+def test_list_deployments_by_account_follows_pages(table):
+    # Given: the index returns two pages
+    table.query.side_effect = [
+        {'Items': [_item('stack-1'), _item('stack-2')], 'LastEvaluatedKey': {'product_stack_id': 'stack-2'}},
+        {'Items': [_item('stack-3')]},
+    ]
+
+    # When: listing the deployments of the account
+    entries = list(DynamoDalHandler(TABLE_NAME).list_deployments_by_account('123456789012', page_size=2))
+
+    # Then: all pages are read in order, the second from where the first stopped
+    assert [entry.product_stack_id for entry in entries] == ['stack-1', 'stack-2', 'stack-3']
+    first_call, second_call = table.query.call_args_list
+    assert first_call.kwargs['IndexName'] == ACCOUNT_ID_INDEX
+    assert first_call.kwargs['Limit'] == 2
+    assert 'ExclusiveStartKey' not in first_call.kwargs
+    assert second_call.kwargs['ExclusiveStartKey'] == {'product_stack_id': 'stack-2'}
+
+
+def test_list_deployments_is_lazy(table):
+    table.query.return_value = {'Items': [_item('stack-1')], 'LastEvaluatedKey': {'product_stack_id': 'stack-1'}}
+
+    entries = DynamoDalHandler(TABLE_NAME).list_deployments_by_consumer('consumer')
+
+    # no page is read before iterating, and only one page is read for the first entry
+    assert table.query.call_count == 0
+    assert next(entries).product_stack_id == 'stack-1'
+    assert table.query.call_count == 1
+
+
+def test_list_deployments_by_product_version(table):
+    table.query.return_value = {'Items': []}
+
+    assert list(DynamoDalHandler(TABLE_NAME).list_deployments_by_product('product', '1.0.0')) == []
+
+    # the version narrows the key condition on the product index sort key
+    query_kwargs = table.query.call_args.kwargs
+    assert query_kwargs['IndexName'] == PRODUCT_INDEX
+    expression = query_kwargs['KeyConditionExpression'].get_expression()
+    assert expression['operator'] == 'AND'
+
+
+def test_get_product_deployment(table):
+    table.get_item.return_value = {'Item': _item('stack-1')}
+
+    entry = DynamoDalHandler(TABLE_NAME).get_product_deployment('portfolio', 'stack-1')
+
+    assert entry is not None and entry.account_id == '123456789012'
+    table.get_item.assert_called_once_with(Key={'portfolio_id': 'portfolio', 'product_stack_id': 'stack-1'})
+
+
+def test_get_missing_product_deployment(table):
+    table.get_item.return_value = {}
+
+    assert DynamoDalHandler(TABLE_NAME).get_product_deployment('portfolio', 'stack-1') is None
@@ -0,0 +1,189 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from catalog_backend.dal.db_handler import _SingletonMeta
+from catalog_backend.dal.dynamo_dal_handler import DynamoDalHandler
+from catalog_backend.dal.models.db import ProductEntry
+
+TABLE_NAME = 'table'
+SHARDS = 4
+
+
+class ConditionalCheckFailedException(Exception):
+    pass
+
+
+def _entry(product_stack_id: str) -> ProductEntry:
+    return ProductEntry(
+        portfolio_id='portfolio',
+        product_stack_id=product_stack_id,
+        name='product',
+        version='1.0.0',
+        account_id='123456789012',
+        consumer_name='consumer',
+        region='us-east-1',
+        created_at=1234567890,
+    )
+
+
+def _item(partition_key: str, product_stack_id: str) -> dict:
+    return {**_entry(product_stack_id).model_dump(exclude_none=True), 'portfolio_id': partition_key}
+
+
+@pytest.fixture
+def table(mocker) -> MagicMock:
+    table = MagicMock()
+    table.name = TABLE_NAME
+    table.meta.client.batch_write_item.return_value = {'UnprocessedItems': {}}
+    table.meta.client.exceptions.ConditionalCheckFailedException = ConditionalCheckFailedException
+    mocker.patch.object(DynamoDalHandler, '_get_db_handler', return_value=table)
+    # every test builds its handler with its own shard count
+    mocker.patch.dict(_SingletonMeta._instances, clear=True)
+    return table
+
+
+def _sent_requests(table: MagicMock) -> list[dict]:
+    return [request for call in table.meta.client.batch_write_item.call_args_list for request in call.kwargs['RequestItems'][TABLE_NAME]]
+
+
+def test_single_shard_keeps_unsharded_key(table):
+    handler = DynamoDalHandler(TABLE_NAME)
+
+    assert handler._partition_key('portfolio', 'stack-1') == 'portfolio'
+
+
+def test_shard_is_deterministic_and_spread(table):
+    # Given: a sharded handler and many product stacks
+    handler = DynamoDalHandler(TABLE_NAME, SHARDS)
+    stack_ids = [f'stack-{index}' for index in range(100)]
+
+    # When: deriving their partition keys twice
+    keys = [handler._partition_key('portfolio', stack_id) for stack_id in stack_ids]
+
+    # Then: the same stack always gets the same shard and all shards are used
+    assert keys == [handler._partition_key('portfolio', stack_id) for stack_id in stack_ids]
+    assert set(keys) == {f'portfolio#{shard}' for shard in range(SHARDS)}
+
+
+def test_add_writes_sharded_key(table):
+    handler = DynamoDalHandler(TABLE_NAME, SHARDS)
+
+    handler.add_product_deployments([_entry('stack-1')])
+
+    item = _sent_requests(table)[0]['PutRequest']['Item']
+    assert item['portfolio_id'] == handler._partition_key('portfolio', 'stack-1')
+    assert item['portfolio_id'].startswith('portfolio#')
+
+
+def _partition_key(query_kwargs: dict) -> str:
+    return query_kwargs['KeyConditionExpression'].get_expression()['values'][1]
+
+
+def test_list_deployments_by_portfolio_gathers_all_shards(table):
+    # Given: every shard partition holds one entry and the unsharded partition was migrated
+    def query(**kwargs) -> dict:
+        partition_key = _partition_key(kwargs)
+        return {'Items': [_item(partition_key, f'stack-{partition_key.split("#")[1]}')] if '#' in partition_key else []}
+
+    table.query.side_effect = query
+    handler = DynamoDalHandler(TABLE_NAME, SHARDS)
+
+    # When: listing the portfolio
+    entries = list(handler.list_deployments_by_portfolio('portfolio'))
+
+    # Then: each shard and the unsharded partition are queried once, the results are merged in stack id order with the logical portfolio id
+    assert table.query.call_count == SHARDS + 1
+    assert [entry.product_stack_id for entry in entries] == [f'stack-{shard}' for shard in range(SHARDS)]
+    assert {entry.portfolio_id for entry in entries} == {'portfolio'}
+
+    # And: once the unsharded partition was found empty it isn't queried again
+    list(handler.list_deployments_by_portfolio('portfolio'))
+    assert table.query.call_count == 2 * SHARDS + 1
+
+
+def test_list_deployments_by_portfolio_includes_unmigrated_entries(table):
+    # Given: stack-1 is only under the unsharded key, stack-2 was copied to its shard and not yet removed from it
+    handler = DynamoDalHandler(TABLE_NAME, SHARDS)
+    sharded = {handler._partition_key('portfolio', 'stack-2'): [_item(handler._partition_key('portfolio', 'stack-2'), 'stack-2')]}
+    legacy = [_item('portfolio', 'stack-1'), _item('portfolio', 'stack-2')]
+
+    def query(**kwargs) -> dict:
+        partition_key = _partition_key(kwargs)
+        return {'Items': legacy if partition_key == 'portfolio' else sharded.get(partition_key, [])}
+
+    table.query.side_effect = query
+
+    entries = list(handler.list_deployments_by_portfolio('portfolio'))
+
+    # Then: every stack is listed once, the unsharded partition is read again until it is empty
+    assert [entry.product_stack_id for entry in entries] == ['stack-1', 'stack-2']
+    list(handler.list_deployments_by_portfolio('portfolio'))
+    assert table.query.call_count == 2 * (SHARDS + 1)
+
+
+def test_list_deployments_by_portfolio_reads_later_pages_lazily(table):
+    # Given: every shard has two pages
+    def query(**kwargs) -> dict:
+        partition_key = _partition_key(kwargs)
+        if '#' not in partition_key:
+            return {'Items': []}
+        shard = partition_key.split('#')[1]
+        if 'ExclusiveStartKey' in kwargs:
+            return {'Items': [_item(partition_key, f'stack-{shard}-b')]}
+        return {'Items': [_item(partition_key, f'stack-{shard}-a')], 'LastEvaluatedKey': {'product_stack_id': f'stack-{shard}-a'}}
+
+    table.query.side_effect = query
+    entries = DynamoDalHandler(TABLE_NAME, SHARDS).list_deployments_by_portfolio('portfolio', page_size=1)
+
+    # When: only the first entry is read
+    first = next(entries)
+
+    # Then: only the first page of every partition was queried
+    assert first.product_stack_id == 'stack-0-a'
+    assert table.query.call_count == SHARDS + 1
+    # And: the rest is read on iteration, still in order
+    assert [entry.product_stack_id for entry in entries][-1] == f'stack-{SHARDS - 1}-b'
+    assert table.query.call_count == 2 * SHARDS + 1
+
+
+def test_sharded_delete_removes_unsharded_copy(table):
+    handler = DynamoDalHandler(TABLE_NAME, SHARDS)
+
+    handler.delete_product_deployment('portfolio', 'stack-1', 'request-1')
+
+    keys = [request['DeleteRequest']['Key']['portfolio_id'] for request in _sent_requests(table)]
+    assert keys == [handler._partition_key('portfolio', 'stack-1'), 'portfolio']
+
+
+def test_get_falls_back_to_unsharded_key(table):
+    # Given: the entry wasn't migrated yet
+    table.get_item.side_effect = [{}, {'Item': _item('portfolio', 'stack-1')}]
+
+    entry = DynamoDalHandler(TABLE_NAME, SHARDS).get_product_deployment('portfolio', 'stack-1')
+
+    assert entry is not None and entry.product_stack_id == 'stack-1'
+    assert table.get_item.call_args.kwargs['Key'] == {'portfolio_id': 'portfolio', 'product_stack_id': 'stack-1'}
+
+
+def test_migrate_to_sharded_keys(table):
+    # Given: two unsharded entries, the second was already rewritten under its sharded key by a newer event
+    table.query.return_value = {'Items': [_item('portfolio', 'stack-1'), _item('portfolio', 'stack-2')]}
+    table.put_item.side_effect = [None, ConditionalCheckFailedException()]
+    handler = DynamoDalHandler(TABLE_NAME, SHARDS)
+
+    # When: migrating the portfolio
+    moved = handler.migrate_to_sharded_keys('portfolio')
+
+    # Then: only the first entry is copied, both unsharded copies are removed
+    assert moved == 1
+    assert table.put_item.call_args_list[0].kwargs['Item']['portfolio_id'] == handler._partition_key('portfolio', 'stack-1')
+    assert [request['DeleteRequest']['Key'] for request in _sent_requests(table)] == [
+        {'portfolio_id': 'portfolio', 'product_stack_id': 'stack-1'},
+        {'portfolio_id': 'portfolio', 'product_stack_id': 'stack-2'},
+    ]
+
+
+def test_migrate_single_shard_is_noop(table):
+    assert DynamoDalHandler(TABLE_NAME).migrate_to_sharded_keys('portfolio') == 0
+    table.query.assert_not_called()
@@ -60,3 +60,66 @@ def test_visibility_env_vars_inherited_invalid_log_level():
     # Test inherited invalid LOG_LEVEL from Observability
     with pytest.raises(ValidationError):
         VisibilityEnvVars(POWERTOOLS_SERVICE_NAME='MyService', LOG_LEVEL='INVALID_LEVEL', TABLE_NAME='MyTable', PORTFOLIO_ID='MyPortfolioId')
+
+
+def test_visibility_env_vars_portfolio_shards():
+    # Test PORTFOLIO_SHARDS defaults to the unsharded layout and rejects zero
+    env_vars = {
+        'POWERTOOLS_SERVICE_NAME': 'MyService',
+        'LOG_LEVEL': 'INFO',
+        'TABLE_NAME': 'MyTable',
+        'PORTFOLIO_ID': 'MyPortfolioId',
+        'POWERTOOLS_METRICS_NAMESPACE': 'MyNamespace',
+    }
+    assert VisibilityEnvVars.model_validate(env_vars).PORTFOLIO_SHARDS == 1
+    assert VisibilityEnvVars.model_validate({**env_vars, 'PORTFOLIO_SHARDS': '8'}).PORTFOLIO_SHARDS == 8
+    with pytest.raises(ValidationError):
+        VisibilityEnvVars.model_validate({**env_vars, 'PORTFOLIO_SHARDS': '0'})
+
+
+def test_visibility_env_vars_dal_backend():
+    # Test DAL_BACKEND defaults to DynamoDB and accepts only known backends
+    env_vars = {
+        'POWERTOOLS_SERVICE_NAME': 'MyService',
+        'LOG_LEVEL': 'INFO',
+        'TABLE_NAME': 'MyTable',
+        'PORTFOLIO_ID': 'MyPortfolioId',
+        'POWERTOOLS_METRICS_NAMESPACE': 'MyNamespace',
+    }
+    assert VisibilityEnvVars.model_validate(env_vars).DAL_BACKEND == 'dynamodb'
+    assert VisibilityEnvVars.model_validate({**env_vars, 'DAL_BACKEND': 'memory'}).DAL_BACKEND == 'memory'
+    with pytest.raises(ValidationError):
+        VisibilityEnvVars.model_validate({**env_vars, 'DAL_BACKEND': 'sqlite'})
+
+
+def test_visibility_env_vars_profiling():
+    # Test profiling is off by default and its settings are bounded
+    env_vars = {
+        'POWERTOOLS_SERVICE_NAME': 'MyService',
+        'LOG_LEVEL': 'INFO',
+        'TABLE_NAME': 'MyTable',
+        'PORTFOLIO_ID': 'MyPortfolioId',
+        'POWERTOOLS_METRICS_NAMESPACE': 'MyNamespace',
+    }
+    assert VisibilityEnvVars.model_validate(env_vars).PROFILE_EVERY_N == 0
+    profiled = VisibilityEnvVars.model_validate({**env_vars, 'PROFILE_EVERY_N': '100', 'PROFILE_INTERVAL_MS': '10', 'PROFILE_TOP_N': '5'})
+    assert (profiled.PROFILE_EVERY_N, profiled.PROFILE_INTERVAL_MS, profiled.PROFILE_TOP_N) == (100, 10, 5)
+    for name, value in (('PROFILE_EVERY_N', '-1'), ('PROFILE_INTERVAL_MS', '0'), ('PROFILE_TOP_N', '0')):
+        with pytest.raises(ValidationError):
+            VisibilityEnvVars.model_validate({**env_vars, name: value})
+
+
+def test_visibility_env_vars_payload_logging():
+    # Test payloads are logged only at DEBUG by default and the sample rate is a share
+    env_vars = {
+        'POWERTOOLS_SERVICE_NAME': 'MyService',
+        'LOG_LEVEL': 'INFO',
+        'TABLE_NAME': 'MyTable',
+        'PORTFOLIO_ID': 'MyPortfolioId',
+        'POWERTOOLS_METRICS_NAMESPACE': 'MyNamespace',
+    }
+    assert VisibilityEnvVars.model_validate(env_vars).LOG_PAYLOAD_SAMPLE_RATE == 0
+    assert VisibilityEnvVars.model_validate({**env_vars, 'LOG_PAYLOAD_SAMPLE_RATE': '0.01'}).LOG_PAYLOAD_SAMPLE_RATE == 0.01
+    for name, value in (('LOG_PAYLOAD_SAMPLE_RATE', '1.5'), ('LOG_PAYLOAD_MAX_CHARS', '10')):
+        with pytest.raises(ValidationError):
+            VisibilityEnvVars.model_validate({**env_vars, name: value})
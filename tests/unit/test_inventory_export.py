@@ -0,0 +1,105 @@
+import gzip
+import json
+from typing import Iterator, Optional
+
+import pyarrow.parquet as pq
+import pytest
+
+from catalog_backend.dal.models.db import ProductEntry
+from catalog_backend.logic import inventory_export
+from catalog_backend.logic.inventory_export import CheckpointMismatchError, export_inventory
+
+TOTAL_SEGMENTS = 3
+PAGES_PER_SEGMENT = 4
+PAGE_SIZE = 5
+
+
+def _entry(segment: int, page: int, index: int) -> ProductEntry:
+    return ProductEntry(
+        portfolio_id='portfolio',
+        product_stack_id=f'stack-{segment}-{page}-{index}',
+        name='product',
+        version='1.0.0',
+        account_id='123456789012',
+        consumer_name='consumer',
+        region='us-east-1',
+        created_at=1234567890,
+    )
+
+
+class FakeDalHandler:
+    """Serves PAGES_PER_SEGMENT pages per segment, the scan key is the index of the last returned page"""
+
+    def __init__(self, fail_on_page: Optional[int] = None):
+        self.fail_on_page = fail_on_page
+        self.start_keys: list[Optional[dict]] = []
+
+    def scan_deployments(
+        self, segment: int, total_segments: int, exclusive_start_key: Optional[dict] = None, page_size: int = 100
+    ) -> Iterator[tuple[list[ProductEntry], Optional[dict]]]:
+        self.start_keys.append(exclusive_start_key)
+        first_page = 0 if exclusive_start_key is None else exclusive_start_key['page'] + 1
+        for page in range(first_page, PAGES_PER_SEGMENT):
+            if segment == 0 and page == self.fail_on_page:
+                raise ConnectionError('scan interrupted')
+            last_evaluated_key = {'page': page} if page < PAGES_PER_SEGMENT - 1 else None
+            yield [_entry(segment, page, index) for index in range(PAGE_SIZE)], last_evaluated_key
+
+
+@pytest.fixture
+def dal_handler(mocker) -> FakeDalHandler:
+    dal_handler = FakeDalHandler()
+    mocker.patch.object(inventory_export, 'get_dal_handler', return_value=dal_handler)
+    return dal_handler
+
+
+def _read_jsonl(output_dir) -> list[dict]:
+    rows: list[dict] = []
+    for path in sorted(output_dir.glob('*.jsonl.gz')):
+        with gzip.open(path, 'rt') as lines:
+            rows.extend(json.loads(line) for line in lines)
+    return rows
+
+
+def test_jsonl_export_writes_every_segment(dal_handler, tmp_path):
+    exported = export_inventory('table', tmp_path, total_segments=TOTAL_SEGMENTS, chunk_items=PAGE_SIZE * 2)
+
+    rows = _read_jsonl(tmp_path)
+    assert exported == len(rows) == TOTAL_SEGMENTS * PAGES_PER_SEGMENT * PAGE_SIZE
+    assert len({row['product_stack_id'] for row in rows}) == len(rows)
+    assert len(list(tmp_path.glob('*.jsonl.gz'))) == TOTAL_SEGMENTS
+
+
+def test_parquet_export(dal_handler, tmp_path):
+    export_inventory('table', tmp_path, export_format='parquet', total_segments=TOTAL_SEGMENTS, chunk_items=PAGE_SIZE * 2)
+
+    # one file per chunk of two pages
+    table = pq.read_table(tmp_path)
+    assert table.num_rows == TOTAL_SEGMENTS * PAGES_PER_SEGMENT * PAGE_SIZE
+    assert len(list(tmp_path.glob('*.parquet'))) == TOTAL_SEGMENTS * 2
+    assert table.schema.field('created_at').type == 'int64'
+
+
+def test_interrupted_export_resumes_from_checkpoint(mocker, tmp_path):
+    # Given: an export whose first segment fails after its first chunk of one page was written
+    failing = FakeDalHandler(fail_on_page=2)
+    mocker.patch.object(inventory_export, 'get_dal_handler', return_value=failing)
+    with pytest.raises(ConnectionError):
+        export_inventory('table', tmp_path, total_segments=TOTAL_SEGMENTS, chunk_items=PAGE_SIZE)
+
+    # When: running the same export again
+    resumed = FakeDalHandler()
+    mocker.patch.object(inventory_export, 'get_dal_handler', return_value=resumed)
+    exported = export_inventory('table', tmp_path, total_segments=TOTAL_SEGMENTS, chunk_items=PAGE_SIZE)
+
+    # Then: only the unfinished segment is scanned again, from its last checkpoint, and nothing is exported twice
+    assert resumed.start_keys == [{'page': 1}]
+    rows = _read_jsonl(tmp_path)
+    assert exported == len(rows) == len({row['product_stack_id'] for row in rows}) == TOTAL_SEGMENTS * PAGES_PER_SEGMENT * PAGE_SIZE
+
+
+def test_checkpoint_of_another_export_is_rejected(dal_handler, tmp_path):
+    export_inventory('table', tmp_path, total_segments=TOTAL_SEGMENTS)
+
+    with pytest.raises(CheckpointMismatchError):
+        export_inventory('table', tmp_path, export_format='parquet', total_segments=TOTAL_SEGMENTS)
@@ -0,0 +1,62 @@
+import json
+
+from catalog_backend.handlers.utils.observability import UNKNOWN_PRODUCT, LatencyRecorder
+
+
+def _emf_documents(output: str) -> list[dict]:
+    return [json.loads(line) for line in output.splitlines() if line.startswith('{')]
+
+
+def _values(document: dict, metric: str) -> list[float]:
+    # a metric with a single value may be serialized as a scalar
+    value = document[metric]
+    return value if isinstance(value, list) else [value]
+
+
+def test_flush_publishes_every_value_per_product(capsys):
+    # Given: latencies of two products and a request that couldn't be parsed
+    recorder = LatencyRecorder()
+    recorder.record('Parse', 0.001, 'product-a')
+    recorder.record('Parse', 0.003, 'product-a')
+    recorder.record('Dal', 0.02, 'product-a')
+    recorder.record('Parse', 0.002, 'product-b')
+    recorder.record('Parse', 0.004)
+
+    # When: they are flushed
+    recorder.flush()
+
+    # Then: each product is its own document with its raw values, so percentiles can be computed per product
+    documents = {document['product_name']: document for document in _emf_documents(capsys.readouterr().out)}
+    assert set(documents) == {'product-a', 'product-b', UNKNOWN_PRODUCT}
+    assert _values(documents['product-a'], 'ParseLatency') == [1.0, 3.0]
+    assert _values(documents['product-a'], 'DalLatency') == [20.0]
+    assert _values(documents['product-b'], 'ParseLatency') == [2.0]
+    metric_definitions = documents['product-a']['_aws']['CloudWatchMetrics'][0]
+    assert metric_definitions['Namespace'] == 'PlatformEngineering'
+    assert ['product_name', 'service'] in [sorted(dimensions) for dimensions in metric_definitions['Dimensions']]
+    assert {metric['Unit'] for metric in metric_definitions['Metrics']} == {'Milliseconds'}
+
+
+def test_flush_empties_recorder(capsys):
+    recorder = LatencyRecorder()
+    recorder.record('Callback', 0.05, 'product-a')
+    recorder.flush()
+    capsys.readouterr()
+
+    recorder.flush()
+
+    assert _emf_documents(capsys.readouterr().out) == []
+
+
+def test_flush_splits_documents_over_emf_value_limit(capsys):
+    # Given: more latencies of a stage than a single EMF metric holds
+    recorder = LatencyRecorder()
+    for _ in range(150):
+        recorder.record('Parse', 0.001, 'product-a')
+
+    recorder.flush()
+
+    # Then: no value is dropped
+    documents = _emf_documents(capsys.readouterr().out)
+    assert sum(len(_values(document, 'ParseLatency')) for document in documents) == 150
+    assert {document['product_name'] for document in documents} == {'product-a'}
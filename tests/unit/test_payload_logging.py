@@ -0,0 +1,85 @@
+import io
+import json
+import logging
+import uuid
+
+from aws_lambda_powertools.logging import Logger
+
+from catalog_backend.handlers.utils.observability import PayloadLogger, TruncatedPayload
+from tests.integration.utils import RESOURCE_PROPERTIES, create_product_body
+
+STACK_ID = 'arn:aws:cloudformation:us-east-1:123456789012:stack/SC-123456789012-pp-logging/1dbb0a20-14e8-11ef-a95c-0eaa9ec0a8b1'
+
+
+class _CountingPayload:
+    def __init__(self) -> None:
+        self.serialized = 0
+
+    def __str__(self) -> str:
+        self.serialized += 1
+        return 'payload'
+
+
+def _payload_logger(level: str) -> tuple[PayloadLogger, io.StringIO]:
+    stream = io.StringIO()
+    # a logger of its own per test, powertools loggers of the same service share their handlers
+    test_logger = Logger(service=f'payload-test-{uuid.uuid4()}', level=level, logger_handler=logging.StreamHandler(stream))
+    return PayloadLogger(test_logger), stream
+
+
+def _lines(stream: io.StringIO) -> list[dict]:
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_truncated_payload_redacts_presigned_urls():
+    body = create_product_body('Create', STACK_ID, RESOURCE_PROPERTIES)
+
+    # the body alone and embedded in an event, where its quotes are escaped
+    for payload in (body, {'Records': [{'body': body}]}):
+        text = str(TruncatedPayload(payload, max_chars=100_000))
+        assert 'X-Amz-Signature' not in text
+        assert 'X-Amz-Credential' not in text
+        assert 'cloudformation-custom-resource-response-useast1.s3.amazonaws.com/' in text
+        assert '?<redacted>' in text
+        assert 'PlatformGovernanceCustomResource' in text
+
+
+def test_truncated_payload_cuts_long_payloads():
+    text = str(TruncatedPayload('a' * 300, max_chars=256))
+
+    assert text == f'{"a" * 256}...<44 more chars>'
+    assert str(TruncatedPayload({'key': 'value'})) == '{"key":"value"}'
+
+
+def test_payloads_are_not_serialized_when_not_logged():
+    # Given: an invocation that isn't sampled with the logger at INFO
+    payload_logger, stream = _payload_logger('INFO')
+    payload_logger.start_invocation(sample_rate=0)
+    payload = _CountingPayload()
+
+    payload_logger.log('product SQS body', record_body=payload)
+
+    # Then: nothing is emitted or serialized
+    assert stream.getvalue() == ''
+    assert payload.serialized == 0
+
+
+def test_sampled_invocation_logs_payloads_at_info():
+    payload_logger, stream = _payload_logger('INFO')
+    payload_logger.start_invocation(sample_rate=1, max_chars=256)
+
+    payload_logger.log('product SQS body', record_body='b' * 1000)
+
+    [line] = _lines(stream)
+    assert line['level'] == 'INFO'
+    assert line['record_body'] == f'{"b" * 256}...<744 more chars>'
+
+
+def test_payloads_are_logged_at_debug():
+    payload_logger, stream = _payload_logger('DEBUG')
+    payload_logger.start_invocation(sample_rate=0)
+
+    payload_logger.log('product SQS event', event={'Records': []})
+
+    [line] = _lines(stream)
+    assert (line['level'], line['event']) == ('DEBUG', '{"Records":[]}')
@@ -0,0 +1,45 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from catalog_backend.logic import product_lifecycle
+from catalog_backend.logic.product_lifecycle import update_product
+from catalog_backend.models.input import ProductUpdateEventModel
+from tests.integration.utils import NEW_RESOURCE_PROPERTIES, RESOURCE_PROPERTIES, create_product_body
+
+
+@pytest.fixture
+def dal_handler(mocker) -> MagicMock:
+    dal_handler = MagicMock()
+    mocker.patch.object(product_lifecycle, 'get_dal_handler', return_value=dal_handler)
+    return dal_handler
+
+
+def _update_event(resource_properties: dict, old_resource_properties: dict) -> ProductUpdateEventModel:
+    body = create_product_body('Update', 'stack-1', resource_properties, old_resource_properties)
+    return ProductUpdateEventModel.model_validate_json(body)
+
+
+def test_unchanged_properties_are_not_written(dal_handler):
+    # Given: a stack update that didn't touch the product properties
+    event = _update_event(RESOURCE_PROPERTIES, RESOURCE_PROPERTIES)
+
+    # When/Then: nothing is written
+    assert update_product('table', 'portfolio', event) is False
+    dal_handler.update_product_deployment.assert_not_called()
+
+
+def test_only_changed_properties_are_written(dal_handler):
+    event = _update_event({**RESOURCE_PROPERTIES, 'product_version': '9.9.9'}, RESOURCE_PROPERTIES)
+
+    assert update_product('table', 'portfolio', event) is True
+    assert dal_handler.update_product_deployment.call_args.kwargs['changed_properties'] == ['product_version']
+
+
+def test_all_changed_properties_are_written(dal_handler):
+    event = _update_event(NEW_RESOURCE_PROPERTIES, RESOURCE_PROPERTIES)
+
+    update_product('table', 'portfolio', event)
+
+    changed = dal_handler.update_product_deployment.call_args.kwargs['changed_properties']
+    assert set(changed) == {name for name, value in NEW_RESOURCE_PROPERTIES.items() if RESOURCE_PROPERTIES[name] != value}
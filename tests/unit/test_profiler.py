@@ -0,0 +1,75 @@
+import time
+from collections import Counter
+
+from catalog_backend.handlers.utils import profiler
+from catalog_backend.handlers.utils.profiler import InvocationProfiler, SamplingProfiler, hot_functions, write_collapsed_stacks
+
+
+def _busy_loop(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_sampling_profiler_collects_collapsed_stacks():
+    # Given: a profiler sampling every millisecond
+    sampling_profiler = SamplingProfiler(interval_seconds=0.001)
+
+    # When: the profiled thread spins in a function
+    sampling_profiler.start()
+    _busy_loop(0.1)
+    stacks = sampling_profiler.stop()
+
+    # Then: the function shows up in the samples with its callers, root first
+    busy_stacks = [stack for stack in stacks if stack.endswith(f'{__name__}._busy_loop')]
+    assert busy_stacks
+    assert all(f'{__name__}.test_sampling_profiler_collects_collapsed_stacks;' in stack for stack in busy_stacks)
+
+
+def test_hot_functions_ranks_by_self_samples():
+    stacks = Counter({'main;handler;parse': 6, 'main;handler;write': 3, 'main;handler': 1})
+
+    hot = hot_functions(stacks, top_n=2)
+
+    assert hot == [
+        {'function': 'parse', 'self_percent': 60.0, 'total_percent': 60.0},
+        {'function': 'write', 'self_percent': 30.0, 'total_percent': 30.0},
+    ]
+    assert hot_functions(stacks, top_n=3)[2] == {'function': 'handler', 'self_percent': 10.0, 'total_percent': 100.0}
+
+
+def test_write_collapsed_stacks_keeps_latest_profiles(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, 'PROFILE_FILES_KEPT', 2)
+    for index in range(4):
+        write_collapsed_stacks(Counter({'main;handler': index + 1}), tmp_path / f'profile-{index}.folded')
+        time.sleep(0.01)  # distinct modification times
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['profile-2.folded', 'profile-3.folded']
+    assert (tmp_path / 'profile-3.folded').read_text() == 'main;handler 4\n'
+
+
+def test_invocation_profiler_profiles_every_nth_invocation(tmp_path, monkeypatch):
+    # Given: profiling of every second invocation
+    monkeypatch.setattr(profiler, 'PROFILE_DIR', tmp_path)
+    invocation_profiler = InvocationProfiler()
+
+    # When: three invocations run
+    for index in range(3):
+        with invocation_profiler.sampled(every_n=2, interval_ms=1, top_n=5, request_id=f'request-{index}'):
+            _busy_loop(0.05)
+
+    # Then: only the second one was profiled
+    assert [path.name for path in tmp_path.iterdir()] == ['profile-request-1.folded']
+    assert '_busy_loop' in (tmp_path / 'profile-request-1.folded').read_text()
+
+
+def test_invocation_profiler_off_by_default(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler, 'PROFILE_DIR', tmp_path)
+    invocation_profiler = InvocationProfiler()
+
+    for index in range(3):
+        with invocation_profiler.sampled(every_n=0, interval_ms=1, top_n=5, request_id=f'request-{index}'):
+            pass
+
+    assert list(tmp_path.iterdir()) == []
+    assert invocation_profiler.invocations == 0
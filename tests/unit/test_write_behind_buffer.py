@@ -0,0 +1,92 @@
+import threading
+from unittest.mock import MagicMock
+
+from catalog_backend.logic.product_lifecycle import WriteBehindBuffer
+from catalog_backend.models.input import ProductModel
+
+PORTFOLIO_ID = 'portfolio'
+PRODUCT = ProductModel(product_name='product', product_version='1.0.0', account_id='123456789012', consumer_name='consumer', region='us-east-1')
+NEW_PRODUCT = PRODUCT.model_copy(update={'product_version': '2.0.0'})
+
+
+def test_create_and_updates_are_a_single_create():
+    # Given: a create followed by two updates of the same product
+    dal_handler = MagicMock()
+    buffer = WriteBehindBuffer()
+    buffer.add(dal_handler, PORTFOLIO_ID, 'stack-1', PRODUCT, 'request-1')
+    buffer.update(dal_handler, PORTFOLIO_ID, 'stack-1', NEW_PRODUCT, ['product_version'], 'request-2')
+    buffer.update(dal_handler, PORTFOLIO_ID, 'stack-1', NEW_PRODUCT.model_copy(update={'region': 'eu-west-1'}), ['region'], 'request-3')
+
+    # When: flushing the batch
+    assert buffer.flush() == {}
+
+    # Then: the product is created once with its latest properties by the last request
+    dal_handler.add_product_deployment.assert_called_once()
+    kwargs = dal_handler.add_product_deployment.call_args.kwargs
+    assert (kwargs['product_version'], kwargs['region'], kwargs['request_id']) == ('2.0.0', 'eu-west-1', 'request-3')
+    dal_handler.update_product_deployment.assert_not_called()
+
+
+def test_updates_merge_changed_properties():
+    dal_handler = MagicMock()
+    buffer = WriteBehindBuffer()
+    buffer.update(dal_handler, PORTFOLIO_ID, 'stack-1', NEW_PRODUCT, ['product_version'], 'request-1')
+    buffer.update(dal_handler, PORTFOLIO_ID, 'stack-1', NEW_PRODUCT, ['account_id'], 'request-2')
+
+    buffer.flush()
+
+    kwargs = dal_handler.update_product_deployment.call_args.kwargs
+    assert kwargs['changed_properties'] == ['account_id', 'product_version']
+    assert kwargs['request_id'] == 'request-2'
+
+
+def test_delete_replaces_earlier_requests_and_later_update_recreates():
+    dal_handler = MagicMock()
+    buffer = WriteBehindBuffer()
+    buffer.add(dal_handler, PORTFOLIO_ID, 'stack-1', PRODUCT, 'request-1', 1000)
+    buffer.delete(dal_handler, PORTFOLIO_ID, 'stack-1', PRODUCT, 'request-2', 2000)
+    buffer.update(dal_handler, PORTFOLIO_ID, 'stack-2', NEW_PRODUCT, ['product_version'], 'request-3', 3000)
+    buffer.delete(dal_handler, PORTFOLIO_ID, 'stack-2', PRODUCT, 'request-4', 4000)
+    buffer.delete(dal_handler, PORTFOLIO_ID, 'stack-3', PRODUCT, 'request-5', 5000)
+    buffer.update(dal_handler, PORTFOLIO_ID, 'stack-3', NEW_PRODUCT, ['product_version'], 'request-6', 6000)
+
+    buffer.flush()
+
+    # a deleted product is deleted once, an update after a delete writes the whole product again, with the time of the last request
+    assert [call.args for call in dal_handler.delete_product_deployment.call_args_list] == [
+        (PORTFOLIO_ID, 'stack-1', 'request-2', 2000),
+        (PORTFOLIO_ID, 'stack-2', 'request-4', 4000),
+    ]
+    kwargs = dal_handler.add_product_deployment.call_args.kwargs
+    assert (kwargs['product_stack_id'], kwargs['event_time']) == ('stack-3', 6000)
+    dal_handler.update_product_deployment.assert_not_called()
+
+
+def test_failed_write_fails_every_coalesced_request():
+    # Given: two requests of a product whose write fails and a product whose write succeeds
+    dal_handler = MagicMock()
+    dal_handler.delete_product_deployment.side_effect = RuntimeError('throttled')
+    buffer = WriteBehindBuffer(max_workers=2)
+    buffer.add(dal_handler, PORTFOLIO_ID, 'stack-1', PRODUCT, 'request-1')
+    buffer.delete(dal_handler, PORTFOLIO_ID, 'stack-1', PRODUCT, 'request-2')
+    buffer.add(dal_handler, PORTFOLIO_ID, 'stack-2', PRODUCT, 'request-3')
+
+    # When: flushing the batch
+    failed_writes = buffer.flush()
+
+    # Then: only the requests of the failed product are reported, the buffer is empty afterwards
+    assert set(failed_writes) == {'request-1', 'request-2'}
+    assert buffer.flush() == {}
+
+
+def test_products_are_written_concurrently():
+    # every write waits for the other one, the flush only finishes if both run at the same time
+    barrier = threading.Barrier(2, timeout=5)
+    dal_handler = MagicMock()
+    dal_handler.add_product_deployment.side_effect = lambda **_: barrier.wait()
+    buffer = WriteBehindBuffer(max_workers=2)
+    buffer.add(dal_handler, PORTFOLIO_ID, 'stack-1', PRODUCT, 'request-1')
+    buffer.add(dal_handler, PORTFOLIO_ID, 'stack-2', PRODUCT, 'request-2')
+
+    assert buffer.flush() == {}
+    assert dal_handler.add_product_deployment.call_count == 2